@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app.core"
+
+    def ready(self):
+        # Registers the system checks and the signal receivers that keep the
+        # embedding matrix, the per-user exclusion cache and the job list
+        # cache fresh.
+        from . import checks, exclusions, listing_cache, similarity  # noqa: F401
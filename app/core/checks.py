@@ -0,0 +1,52 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Cache backends that aren't shared between processes.
+PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The embedding matrix, the job list cache and the exclusion cache are
+    invalidated across web and Celery processes through the default cache,
+    which therefore has to be shared (Redis in production).
+    """
+    if settings.CACHES["default"]["BACKEND"] not in PER_PROCESS_CACHES:
+        return []
+    return [
+        Warning(
+            "The default cache is local to each process, so changes made by "
+            "Celery workers won't reach the web workers' caches.",
+            hint="Point CACHES['default'] at Redis (REDIS_CACHE_URL).",
+            id="core.W001",
+        )
+    ]
+
+
+@register()
+def check_ann_index_path(app_configs, **kwargs):
+    """
+    The ANN index is rebuilt and updated in place, so the process has to be
+    able to create files next to ANN_INDEX_PATH.
+    """
+    directory = os.path.dirname(os.path.abspath(settings.ANN_INDEX_PATH))
+    existing = directory
+    while not os.path.exists(existing):
+        existing = os.path.dirname(existing)
+    if os.access(existing, os.W_OK | os.X_OK):
+        return []
+    return [
+        Warning(
+            f"The ANN index directory {directory} can't be written, so the "
+            "index can't be built or updated and similar-job searches scan "
+            "every embedding.",
+            hint="Set ANN_INDEX_PATH to a writable location.",
+            id="core.W002",
+        )
+    ]
@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+import numpy as np
+
+from shared.near_duplicates import band_hashes, find_near_duplicate
+
+from .models import JobPosting, JobPostingAlias, JobPostingBand
+
+# Buckets per `bucket__in` lookup, well under SQLite's parameter limit.
+BUCKET_LOOKUP_SIZE = 500
+
+
+def known_links(links):
+    """
+    Returns the links among `links` that are stored postings or aliases of
+    one.
+    """
+    links = list(links)
+    return set(
+        JobPosting.objects.filter(link__in=links).values_list("link", flat=True)
+    ) | set(
+        JobPostingAlias.objects.filter(link__in=links).values_list("link", flat=True)
+    )
+
+
+def add_aliases(aliases):
+    """
+    Records links found to be near-duplicates of stored postings.
+
+    Args:
+        aliases (dict): The PK of the canonical posting of each link.
+    """
+    JobPostingAlias.objects.bulk_create(
+        [JobPostingAlias(link=link, job_posting_id=pk) for link, pk in aliases.items()],
+        ignore_conflicts=True,
+    )
+
+
+def unpack_signature(data):
+    return np.frombuffer(bytes(data), dtype=np.uint32)
+
+
+def find_existing_duplicates(signatures):
+    """
+    Looks up near-duplicates of the given MinHash signatures among stored
+    postings, with one band lookup and one signature read for all of them.
+
+    Returns:
+        list: For each signature, the PK of its closest stored
+        near-duplicate, or None.
+    """
+    buckets = [band_hashes(signature) for signature in signatures]
+    all_buckets = list({bucket for row in buckets for bucket in row})
+    pks_by_bucket = defaultdict(set)
+    for start in range(0, len(all_buckets), BUCKET_LOOKUP_SIZE):
+        rows = JobPostingBand.objects.filter(
+            bucket__in=all_buckets[start : start + BUCKET_LOOKUP_SIZE]
+        ).values_list("bucket", "job_posting_id")
+        for bucket, pk in rows:
+            pks_by_bucket[bucket].add(pk)
+
+    candidate_pks = set().union(*pks_by_bucket.values())
+    stored = {
+        pk: unpack_signature(data)
+        for pk, data in JobPosting.objects.filter(
+            pk__in=candidate_pks, minhash__isnull=False
+        ).values_list("pk", "minhash")
+    }
+
+    duplicates = []
+    for signature, row in zip(signatures, buckets):
+        pks = set().union(*(pks_by_bucket.get(bucket, ()) for bucket in row))
+        candidates = {pk: stored[pk] for pk in pks if pk in stored}
+        duplicates.append(find_near_duplicate(signature, candidates))
+    return duplicates
+
+
+def index_postings(signatures_by_pk):
+    """
+    Adds the band buckets of postings (whose `minhash` is already saved) to
+    the near-duplicate index.
+    """
+    JobPostingBand.objects.bulk_create(
+        [
+            JobPostingBand(job_posting_id=pk, bucket=bucket)
+            for pk, signature in signatures_by_pk.items()
+            for bucket in band_hashes(signature)
+        ],
+        batch_size=1000,
+    )
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import HiddenCompany, UserJobInteraction
+
+# Per-user hidden jobs, hidden companies and pinned jobs, as read by the job
+# list on every request. Entries are dropped whenever one of them changes.
+EXCLUSIONS_KEY = "job_exclusions:{}"
+EXCLUSIONS_TIMEOUT = 60 * 15
+# Longer lists are excluded with an anti-join (NOT EXISTS) on the source
+# table rather than a NOT IN over inlined literals.
+INLINE_EXCLUSION_LIMIT = 200
+
+
+def get_exclusions(user):
+    """
+    Returns the user's hidden and pinned postings, from the cache if possible.
+
+    Returns:
+        dict: "hidden" (list of job links), "companies" (list of company
+        names) and "pinned" (list of job links).
+    """
+    key = EXCLUSIONS_KEY.format(user.pk)
+    exclusions = cache.get(key)
+    if exclusions is None:
+        hidden, pinned = [], []
+        for link, is_hidden, is_pinned in UserJobInteraction.objects.filter(
+            user=user
+        ).values_list("job_posting_id", "hidden", "pinned"):
+            if is_hidden:
+                hidden.append(link)
+            if is_pinned:
+                pinned.append(link)
+        exclusions = {
+            "hidden": hidden,
+            "companies": list(
+                HiddenCompany.objects.filter(user=user).values_list("name", flat=True)
+            ),
+            "pinned": pinned,
+        }
+        cache.set(key, exclusions, EXCLUSIONS_TIMEOUT)
+    return exclusions
+
+
+def invalidate_exclusions(user_id):
+    cache.delete(EXCLUSIONS_KEY.format(user_id))
+
+
+def exclude_hidden(queryset, user, exclusions=None):
+    """
+    Removes the postings and companies `user` has hidden from a JobPosting
+    queryset.
+    """
+    if exclusions is None:
+        exclusions = get_exclusions(user)
+
+    hidden = exclusions["hidden"]
+    if len(hidden) > INLINE_EXCLUSION_LIMIT:
+        queryset = queryset.exclude(
+            Exists(
+                UserJobInteraction.objects.filter(
+                    user=user, hidden=True, job_posting=OuterRef("pk")
+                )
+            )
+        )
+    elif hidden:
+        queryset = queryset.exclude(link__in=hidden)
+
+    companies = exclusions["companies"]
+    if len(companies) > INLINE_EXCLUSION_LIMIT:
+        queryset = queryset.exclude(
+            Exists(HiddenCompany.objects.filter(user=user, name=OuterRef("company")))
+        )
+    elif companies:
+        queryset = queryset.exclude(company__in=companies)
+    return queryset
+
+
+@receiver(post_save, sender=UserJobInteraction)
+@receiver(post_delete, sender=UserJobInteraction)
+@receiver(post_save, sender=HiddenCompany)
+@receiver(post_delete, sender=HiddenCompany)
+def _exclusions_changed(sender, instance, **kwargs):
+    invalidate_exclusions(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def _user_saved(sender, instance, created=False, **kwargs):
+    # A new account must never see an entry left behind under a reused id.
+    if created:
+        invalidate_exclusions(instance.pk)
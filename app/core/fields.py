@@ -0,0 +1,102 @@
+import base64
+import struct
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import models
+
+# Little-endian storage dtypes. int8 vectors are prefixed with a float32 scale.
+PACKED_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+    "int8": np.dtype("i1"),
+}
+INT8_SCALE = struct.Struct("<f")
+
+
+def pack_vector(vector, dtype="float32"):
+    """
+    Packs a vector into bytes in the given storage dtype.
+
+    int8 vectors are symmetrically quantized: the values are divided by
+    max(|v|) / 127 and rounded, and that scale is stored in front.
+    """
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    if dtype == "int8":
+        peak = float(np.max(np.abs(vector))) if len(vector) else 0.0
+        scale = peak / 127 if peak > 0 else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127)
+        return (
+            INT8_SCALE.pack(scale) + quantized.astype(PACKED_DTYPES["int8"]).tobytes()
+        )
+    return vector.astype(PACKED_DTYPES[dtype], copy=False).tobytes()
+
+
+def unpack_vector(data, dtype="float32"):
+    """
+    Decodes bytes written by `pack_vector` into a float32 array.
+
+    float32 data is decoded without copying, so the array is read-only.
+    """
+    if dtype == "int8":
+        (scale,) = INT8_SCALE.unpack_from(data)
+        quantized = np.frombuffer(data, dtype=PACKED_DTYPES["int8"], offset=4)
+        return quantized.astype(np.float32) * np.float32(scale)
+    vector = np.frombuffer(data, dtype=PACKED_DTYPES[dtype])
+    if dtype != "float32":
+        vector = vector.astype(np.float32)
+    return vector
+
+
+class PackedVectorField(models.BinaryField):
+    """
+    Stores a dense vector as packed binary (bytea on Postgres) and loads it
+    as a NumPy float32 array.
+
+    Assign lists or arrays; read back `np.ndarray`. `dtype` picks the
+    storage precision: "float32" (exact), "float16" (half the size) or
+    "int8" (a quarter, quantized).
+    """
+
+    description = "A packed vector of floats"
+
+    def __init__(self, *args, dtype="float32", **kwargs):
+        if dtype not in PACKED_DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.dtype = dtype
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dtype != "float32":
+            kwargs["dtype"] = self.dtype
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return unpack_vector(value, self.dtype)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, np.ndarray):
+            return value
+        if isinstance(value, str):
+            # Serialized form (dumpdata/loaddata), see value_to_string().
+            value = base64.b64decode(value.encode("ascii"))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return unpack_vector(value, self.dtype)
+        try:
+            return np.asarray(value, dtype=np.float32)
+        except (TypeError, ValueError):
+            raise ValidationError(f"{value!r} is not a vector.")
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, (bytes, bytearray, memoryview)):
+            return value
+        return pack_vector(value, self.dtype)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        if value is None:
+            return None
+        return base64.b64encode(pack_vector(value, self.dtype)).decode("ascii")
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import HiddenCompany, JobPosting, UserJobInteraction
+
+# Job list responses are cached per (corpus version, user, user version,
+# URL). Writes bump a version instead of deleting entries; the orphaned
+# entries expire after JOB_LIST_CACHE_TIMEOUT or are evicted by Redis's LRU
+# policy first.
+JOB_LIST_CACHE_TIMEOUT = int(os.environ.get("JOB_LIST_CACHE_TIMEOUT", "300"))
+CORPUS_VERSION_KEY = "job_list:corpus_version"
+USER_VERSION_KEY = "job_list:user_version:{}"
+RESPONSE_KEY = "job_list:response:{}:{}:{}:{}"
+HITS_KEY = "job_list:hits"
+MISSES_KEY = "job_list:misses"
+
+
+def _get_versions(*keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start evicted versions at an unused value, so that entries
+            # built on the old value can't be served again.
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def bump_corpus_version():
+    """
+    Invalidates every cached job list. Must be called after bulk writes to
+    JobPosting, which bypass model signals.
+    """
+    _bump(CORPUS_VERSION_KEY)
+
+
+def bump_user_version(user_id):
+    """
+    Invalidates the cached job lists of one user.
+    """
+    _bump(USER_VERSION_KEY.format(user_id))
+
+
+def response_key(request):
+    """
+    Returns the cache key of the job list response for `request`.
+    """
+    corpus_version, user_version = _get_versions(
+        CORPUS_VERSION_KEY, USER_VERSION_KEY.format(request.user.pk)
+    )
+    url = hashlib.sha1(request.build_absolute_uri().encode("utf-8")).hexdigest()
+    return RESPONSE_KEY.format(corpus_version, request.user.pk, user_version, url)
+
+
+def get_response(key):
+    data = cache.get(key)
+    _count(MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+def set_response(key, data):
+    cache.set(key, data, JOB_LIST_CACHE_TIMEOUT)
+
+
+def stats():
+    """
+    Returns the hit/miss counters of the job list cache.
+    """
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / lookups if lookups else 0.0,
+    }
+
+
+@receiver(post_save, sender=JobPosting)
+@receiver(post_delete, sender=JobPosting)
+def _job_posting_changed(sender, **kwargs):
+    bump_corpus_version()
+
+
+@receiver(post_save, sender=UserJobInteraction)
+@receiver(post_delete, sender=UserJobInteraction)
+@receiver(post_save, sender=HiddenCompany)
+@receiver(post_delete, sender=HiddenCompany)
+def _interaction_changed(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_init, sender=get_user_model())
+def _user_loaded(sender, instance, **kwargs):
+    # Remembered so that saves which don't touch the preferences (such as
+    # the last_login update on every login) keep the cached listings.
+    if "preferred_work_arrangement" not in instance.get_deferred_fields():
+        instance._saved_work_arrangement = list(instance.preferred_work_arrangement)
+
+
+@receiver(post_save, sender=get_user_model())
+def _user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and "preferred_work_arrangement" not in update_fields:
+        return
+    preferences = instance.preferred_work_arrangement
+    changed = created or preferences != getattr(
+        instance, "_saved_work_arrangement", None
+    )
+    instance._saved_work_arrangement = list(preferences)
+    if changed:
+        bump_user_version(instance.pk)
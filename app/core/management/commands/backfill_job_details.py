@@ -1,76 +1,180 @@
+import functools
 import logging
+import time
 
+import requests
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from app.core.listing_cache import bump_corpus_version
 from app.core.models import JobPosting
-from app.core.scraping_logic import scrape_job_details
+from app.core.scraping_logic import parse_job_details
+from shared.concurrency import (
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_PER_HOST_LIMIT,
+    HostRateLimiter,
+    fetch_all,
+)
+from shared.http_client import conditional_get
 
 logger = logging.getLogger(__name__)
 
+# Returned by the fetch function for pages that no longer exist.
+GONE = "gone"
+
+
+def fetch_details(url, validators):
+    """
+    Fetches and parses the page at `url` if it changed since `validators[url]`.
+
+    Returns:
+        GONE, or a (details, validators) tuple whose details are None when
+        the page is unchanged.
+    """
+    try:
+        result = conditional_get(url, validators[url])
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code in (404, 410):
+            return GONE
+        raise
+    if not result.changed:
+        return None, result.validators
+    return parse_job_details(result.response.content), result.validators
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
 
 class Command(BaseCommand):
     help = "Backfills job details for existing job postings."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=DEFAULT_MAX_WORKERS,
+            help="Pages fetched at once across all hosts.",
+        )
+        parser.add_argument(
+            "--per-host-limit",
+            type=int,
+            default=DEFAULT_PER_HOST_LIMIT,
+            help="Pages fetched at once from a single host.",
+        )
+        parser.add_argument(
+            "--per-host-rate",
+            type=float,
+            default=0,
+            help="Maximum requests per second to a single host (0 for no limit).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Postings fetched and written back per batch.",
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("Starting backfill process..."))
 
-        job_postings = JobPosting.objects.filter(details_updated_at__isnull=True)
-        total_jobs = job_postings.count()
-        updated_count = 0
-        deleted_count = 0
-        error_count = 0
-
+        pks = list(
+            JobPosting.objects.filter(details_updated_at__isnull=True)
+            .exclude(link="")
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        total_jobs = len(pks)
         self.stdout.write(f"Found {total_jobs} jobs to process.")
 
-        for i, job in enumerate(job_postings):
-            self.stdout.write(f"Processing job {i + 1}/{total_jobs}: {job.link}")
+        rate_limiter = None
+        if options["per_host_rate"] > 0:
+            rate_limiter = HostRateLimiter(options["per_host_rate"])
 
-            if not job.link:
-                self.stdout.write(
-                    self.style.WARNING(f"Skipping job with no link: {job.title}")
+        self.updated_count = 0
+        self.deleted_count = 0
+        self.error_count = 0
+        start = time.monotonic()
+        done = 0
+        for offset in range(0, total_jobs, options["batch_size"]):
+            batch = list(
+                JobPosting.objects.filter(
+                    pk__in=pks[offset : offset + options["batch_size"]]
+                ).only(
+                    "pk", "link", "description", "http_validators", "details_updated_at"
                 )
-                continue
+            )
+            validators = {job.link: job.http_validators for job in batch}
+
+            results = fetch_all(
+                functools.partial(fetch_details, validators=validators),
+                validators,
+                max_workers=options["concurrency"],
+                per_host_limit=options["per_host_limit"],
+                rate_limiter=rate_limiter,
+            )
+            self.apply_results(batch, results)
 
-            try:
-                details = scrape_job_details(job.link)
-
-                if details:
-                    # Update description if it's different
-                    if (
-                        details.get("description")
-                        and details["description"] != job.description
-                    ):
-                        job.description = details["description"]
-                        job.details_updated_at = timezone.now()
-                        job.save()
-                        updated_count += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"Successfully updated description for job: {job.link}"
-                            )
-                        )
-                    else:
-                        self.stdout.write("No new details found to update.")
-
-            except Exception as e:
-                if "404" in str(e):
-                    self.stdout.write(
-                        self.style.WARNING(f"Job not found (404), deleting: {job.link}")
-                    )
-                    job.delete()
-                    deleted_count += 1
-                else:
-                    self.stderr.write(
-                        self.style.ERROR(
-                            f"An unexpected error occurred for job {job.link}: {e}"
-                        )
-                    )
-                    error_count += 1
+            done += len(batch)
+            elapsed = time.monotonic() - start
+            rate = done / max(elapsed, 1e-9)
+            eta = (total_jobs - done) / rate if rate else 0
+            self.stdout.write(
+                f"\rProcessed {done}/{total_jobs} ({rate:.1f} jobs/sec, "
+                f"ETA {format_duration(eta)})",
+                ending="",
+            )
+            self.stdout.flush()
+        if total_jobs:
+            self.stdout.write("")
 
         summary_message = (
             "Backfill process finished. "
-            f"Updated: {updated_count}, Deleted: {deleted_count}, "
-            f"Errors: {error_count}"
+            f"Updated: {self.updated_count}, Deleted: {self.deleted_count}, "
+            f"Errors: {self.error_count}"
         )
         self.stdout.write(self.style.SUCCESS(summary_message))
+
+    def apply_results(self, batch, results):
+        """
+        Writes one batch of fetch results back: fetched rows with a single
+        bulk_update and vanished postings with a single delete. Every fetched
+        row gets `details_updated_at`, including unchanged (304) pages, so
+        the next run doesn't fetch it again.
+        """
+        fetched_jobs = []
+        gone_pks = []
+        now = timezone.now()
+        for job in batch:
+            result = results.get(job.link)
+            if result is None:
+                # The fetch raised; fetch_all already logged why.
+                self.error_count += 1
+                continue
+            if result == GONE:
+                logger.info(f"Job not found (404), deleting: {job.link}")
+                gone_pks.append(job.pk)
+                continue
+
+            details, validators = result
+            job.http_validators = validators
+            job.details_updated_at = now
+            if (
+                details
+                and details.get("description")
+                and details["description"] != job.description
+            ):
+                job.description = details["description"]
+                self.updated_count += 1
+            fetched_jobs.append(job)
+
+        if fetched_jobs:
+            JobPosting.objects.bulk_update(
+                fetched_jobs, ["http_validators", "description", "details_updated_at"]
+            )
+            bump_corpus_version()
+        if gone_pks:
+            JobPosting.objects.filter(pk__in=gone_pks).delete()
+            self.deleted_count += len(gone_pks)
@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.core.models import JobPosting
+from shared import ann_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the approximate nearest-neighbour index over job embeddings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=settings.ANN_INDEX_PATH,
+            help="Where to write the index.",
+        )
+        parser.add_argument(
+            "--nlist",
+            type=int,
+            default=None,
+            help="Number of clusters. Defaults to ANN_NLIST, or sqrt(N).",
+        )
+        parser.add_argument(
+            "--nprobe",
+            type=int,
+            default=ann_index.ANN_NPROBE,
+            help="Clusters scanned per query; trades latency for recall.",
+        )
+        parser.add_argument(
+            "--evaluate",
+            type=int,
+            default=0,
+            help="Measure recall@5 against exact search on this many samples.",
+        )
+
+    def handle(self, *args, **options):
+        # Updates logged from here on may be missing from the rows read below,
+        # so they are kept and replayed onto the new index.
+        since = ann_index.delta_position(options["path"])
+        ids, vectors = [], []
+        rows = JobPosting.objects.exclude(embedding__isnull=True).values_list(
+            "pk", "embedding"
+        )
+        for pk, embedding in rows.iterator(chunk_size=2000):
+            if len(embedding) == 0 or (vectors and len(embedding) != len(vectors[0])):
+                continue
+            ids.append(pk)
+            vectors.append(embedding)
+
+        if not ids:
+            raise CommandError("No job postings have embeddings yet.")
+
+        start = time.monotonic()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = ann_index.IVFIndex.build(
+            ids, vectors, nlist=options["nlist"], nprobe=options["nprobe"]
+        )
+        ann_index.replace_index(index, options["path"], since=since)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {len(index)} embeddings in {index.nlist} lists "
+                f"({time.monotonic() - start:.1f}s) at {options['path']}."
+            )
+        )
+
+        if options["evaluate"]:
+            self.evaluate(index, ids, vectors, options["evaluate"])
+
+    def evaluate(self, index, ids, vectors, samples, k=5):
+        normalized = vectors / np.maximum(
+            np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12
+        )
+        rng = np.random.default_rng(0)
+        queries = rng.choice(len(ids), min(samples, len(ids)), replace=False)
+
+        hits = 0
+        total = 0
+        elapsed = 0.0
+        for row in queries:
+            exact = np.argsort(-(normalized @ normalized[row]))[: k + 1]
+            expected = set([ids[i] for i in exact if i != row][:k])
+
+            start = time.monotonic()
+            found = index.search(vectors[row], k=k, exclude={ids[row]})
+            elapsed += time.monotonic() - start
+
+            hits += len(expected & {pk for pk, score in found})
+            total += len(expected)
+
+        self.stdout.write(
+            f"Recall@{k}: {hits / max(total, 1):.3f} over {len(queries)} queries "
+            f"(nprobe={index.nprobe}, {1000 * elapsed / len(queries):.2f} ms/query)."
+        )
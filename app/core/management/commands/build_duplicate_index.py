@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from app.core.duplicates import index_postings
+from app.core.models import JobPosting
+from shared.near_duplicates import document_text, minhash
+
+
+class Command(BaseCommand):
+    help = (
+        "Computes MinHash signatures for job postings saved before "
+        "near-duplicate detection and adds them to the LSH band index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Postings read and indexed per chunk.",
+        )
+
+    def handle(self, *args, **options):
+        indexed = 0
+        last_pk = None
+        while True:
+            queryset = JobPosting.objects.filter(minhash__isnull=True).order_by("pk")
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            chunk = list(
+                queryset.only("pk", "title", "company", "description")[
+                    : options["chunk_size"]
+                ]
+            )
+            if not chunk:
+                break
+
+            signatures = {}
+            for job in chunk:
+                signature = minhash(
+                    document_text(job.title, job.company, job.description)
+                )
+                job.minhash = signature.tobytes()
+                signatures[job.pk] = signature
+            JobPosting.objects.bulk_update(chunk, ["minhash"])
+            index_postings(signatures)
+            indexed += len(chunk)
+            last_pk = chunk[-1].pk
+            self.stdout.write(f"Indexed {indexed} postings...")
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} postings."))
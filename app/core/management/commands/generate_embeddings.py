@@ -1,52 +1,116 @@
-import torch
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 from django.core.management.base import BaseCommand
-from transformers import AutoModel, AutoTokenizer
 
+from app.core import ml_utils
+from app.core.listing_cache import bump_corpus_version
 from app.core.models import JobPosting
+from app.core.scraping_logic import add_to_ann_index
+from app.core.similarity import embeddings_changed
 
 
 class Command(BaseCommand):
-    help = "Generates embeddings for all job postings"
+    help = "Generates embeddings for job postings that don't have one yet"
 
-    def handle(self, *args, **options):
-        self.stdout.write("Loading model...")
-        model_name = "sentence-transformers/all-MiniLM-L6-v2"
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModel.from_pretrained(model_name)
-        self.stdout.write("Model loaded.")
-
-        job_postings = JobPosting.objects.all()
-        for job_posting in job_postings:
-            if job_posting.embedding is not None:
-                self.stdout.write(
-                    f"Embedding for job: {job_posting.title} exists, skipping."
-                )
-                continue
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=ml_utils.EMBEDDING_BATCH_SIZE,
+            help="Texts per model forward pass.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Postings loaded and written back per database round trip.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=None,
+            help="Torch intra-op threads (per worker process).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Shard each chunk across this many model processes.",
+        )
 
-            self.stdout.write(f"Generating embedding for job: {job_posting.title}")
-            text = f"{job_posting.title} {job_posting.description}"
-            inputs = tokenizer(
-                text, return_tensors="pt", truncation=True, max_length=512
+    def handle(self, *args, **options):
+        pks = list(
+            JobPosting.objects.filter(embedding__isnull=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        total = len(pks)
+        if not total:
+            self.stdout.write(
+                self.style.SUCCESS("All job postings already have embeddings.")
             )
-            with torch.no_grad():
-                outputs = model(**inputs)
+            return
+        self.stdout.write(f"Generating embeddings for {total} job postings...")
 
-            # Mean pooling
-            embeddings = outputs.last_hidden_state
-            mask = (
-                inputs["attention_mask"].unsqueeze(-1).expand(embeddings.size()).float()
+        executor = None
+        if options["workers"] > 1:
+            # Spawned (not forked) so each worker gets a clean torch runtime.
+            executor = ProcessPoolExecutor(
+                max_workers=options["workers"],
+                mp_context=multiprocessing.get_context("spawn"),
             )
-            masked_embeddings = embeddings * mask
-            summed = torch.sum(masked_embeddings, 1)
-            counted = torch.clamp(mask.sum(1), min=1e-9)
-            mean_pooled = summed / counted
 
-            # Normalize
-            mean_pooled = torch.nn.functional.normalize(mean_pooled, p=2, dim=1)
+        start = time.monotonic()
+        done = 0
+        try:
+            for offset in range(0, total, options["chunk_size"]):
+                chunk = pks[offset : offset + options["chunk_size"]]
+                jobs = list(
+                    JobPosting.objects.filter(pk__in=chunk).only(
+                        "pk", "title", "description"
+                    )
+                )
+                texts = [f"{job.title} {job.description or ''}" for job in jobs]
+                embeddings = self.embed(texts, executor, options)
+                for job, embedding in zip(jobs, embeddings):
+                    job.embedding = embedding
+
+                JobPosting.objects.bulk_update(jobs, ["embedding"])
+                embeddings_changed([job.pk for job in jobs])
+                bump_corpus_version()
+                add_to_ann_index(jobs)
 
-            job_posting.embedding = mean_pooled.tolist()[0]
-            job_posting.save()
+                done += len(jobs)
+                rate = done / max(time.monotonic() - start, 1e-9)
+                self.stdout.write(f"Embedded {done}/{total} ({rate:.1f} docs/sec)")
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
+        elapsed = time.monotonic() - start
         self.stdout.write(
-            self.style.SUCCESS("Successfully generated all job embeddings.")
+            self.style.SUCCESS(
+                f"Generated {done} embeddings in {elapsed:.1f}s "
+                f"({done / max(elapsed, 1e-9):.1f} docs/sec)."
+            )
         )
+
+    def embed(self, texts, executor, options):
+        if executor is None:
+            return ml_utils.generate_embeddings(
+                texts, batch_size=options["batch_size"], num_threads=options["threads"]
+            )
+
+        shard_size = -(-len(texts) // options["workers"])
+        futures = [
+            executor.submit(
+                ml_utils.generate_embeddings,
+                texts[i : i + shard_size],
+                options["batch_size"],
+                options["threads"],
+            )
+            for i in range(0, len(texts), shard_size)
+        ]
+        return [embedding for future in futures for embedding in future.result()]
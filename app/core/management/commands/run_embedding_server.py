@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.core import ml_utils
+
+
+class Command(BaseCommand):
+    help = "Serves job embeddings from one shared model over a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=ml_utils.EMBEDDING_SERVER_SOCKET,
+            help="Socket path. Defaults to EMBEDDING_SERVER_SOCKET.",
+        )
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"]
+        if not socket_path:
+            raise CommandError("Pass --socket or set EMBEDDING_SERVER_SOCKET.")
+
+        # Load up front so the first request doesn't pay for it.
+        ml_utils.get_model().load()
+        server = ml_utils.EmbeddingServer(socket_path)
+        self.stdout.write(
+            self.style.SUCCESS(f"Embedding server listening on {socket_path}")
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
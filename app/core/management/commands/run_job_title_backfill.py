@@ -6,9 +6,32 @@ from app.core.tasks import backfill_job_titles_task
 class Command(BaseCommand):
     help = "Triggers a Celery task to backfill job titles with parsed data."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=1,
+            help="Split the postings into this many primary key ranges, one task each.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Postings read and written back per chunk.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore checkpoints left by an interrupted run.",
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("Queueing job title backfill task..."))
-        backfill_job_titles_task.delay()
+        backfill_job_titles_task.delay(
+            shards=options["shards"],
+            chunk_size=options["chunk_size"],
+            restart=options["restart"],
+        )
         self.stdout.write(
             self.style.SUCCESS("Task queued. See Celery worker for progress.")
         )
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0017_scrapeschedule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobposting",
+            name="http_validators",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+import app.core.fields
+
+BATCH_SIZE = 1000
+
+
+def pack_embeddings(apps, schema_editor):
+    JobPosting = apps.get_model("core", "JobPosting")
+    batch = []
+    jobs = JobPosting.objects.exclude(embedding__isnull=True).only("pk", "embedding")
+    for job in jobs.iterator(chunk_size=BATCH_SIZE):
+        if not job.embedding:
+            continue
+        job.embedding_packed = job.embedding
+        batch.append(job)
+        if len(batch) >= BATCH_SIZE:
+            JobPosting.objects.bulk_update(batch, ["embedding_packed"])
+            batch = []
+    if batch:
+        JobPosting.objects.bulk_update(batch, ["embedding_packed"])
+
+
+def unpack_embeddings(apps, schema_editor):
+    JobPosting = apps.get_model("core", "JobPosting")
+    batch = []
+    jobs = JobPosting.objects.exclude(embedding_packed__isnull=True).only(
+        "pk", "embedding_packed"
+    )
+    for job in jobs.iterator(chunk_size=BATCH_SIZE):
+        job.embedding = job.embedding_packed.tolist()
+        batch.append(job)
+        if len(batch) >= BATCH_SIZE:
+            JobPosting.objects.bulk_update(batch, ["embedding"])
+            batch = []
+    if batch:
+        JobPosting.objects.bulk_update(batch, ["embedding"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0018_jobposting_http_validators"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobposting",
+            name="embedding_packed",
+            field=app.core.fields.PackedVectorField(blank=True, null=True),
+        ),
+        migrations.RunPython(pack_embeddings, reverse_code=unpack_embeddings),
+        migrations.RemoveField(
+            model_name="jobposting",
+            name="embedding",
+        ),
+        migrations.RenameField(
+            model_name="jobposting",
+            old_name="embedding_packed",
+            new_name="embedding",
+        ),
+    ]
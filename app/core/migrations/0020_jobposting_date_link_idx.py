@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0019_pack_jobposting_embedding"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="jobposting",
+            index=models.Index(
+                fields=["-posting_date", "-link"], name="jobposting_date_link_idx"
+            ),
+        ),
+    ]
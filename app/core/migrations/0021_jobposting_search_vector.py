@@ -0,0 +1,78 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Postgres-only objects: the trigger keeping search_vector up to date, the GIN
+# index over it and trigram indexes serving icontains filters (which compile
+# to UPPER(col::text) LIKE UPPER(...)). Other backends keep using LIKE scans.
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION core_jobposting_search_vector_update()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.company, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_jobposting_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, company, description
+    ON core_jobposting
+    FOR EACH ROW EXECUTE FUNCTION core_jobposting_search_vector_update()
+    """,
+    # Fires the trigger for existing rows.
+    "UPDATE core_jobposting SET title = title",
+    """
+    CREATE INDEX IF NOT EXISTS jobposting_search_vector_idx
+    ON core_jobposting USING gin (search_vector)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS jobposting_title_trgm_idx
+    ON core_jobposting USING gin (UPPER(title::text) gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS jobposting_company_trgm_idx
+    ON core_jobposting USING gin (UPPER(company::text) gin_trgm_ops)
+    """,
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS jobposting_company_trgm_idx",
+    "DROP INDEX IF EXISTS jobposting_title_trgm_idx",
+    "DROP INDEX IF EXISTS jobposting_search_vector_idx",
+    "DROP TRIGGER IF EXISTS core_jobposting_search_vector_trigger ON core_jobposting",
+    "DROP FUNCTION IF EXISTS core_jobposting_search_vector_update()",
+]
+
+
+def run_postgres_sql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0020_jobposting_date_link_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobposting",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            run_postgres_sql(FORWARD_SQL), reverse_code=run_postgres_sql(REVERSE_SQL)
+        ),
+    ]
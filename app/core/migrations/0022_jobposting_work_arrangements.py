@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+# Copy of app.core.models.WORK_ARRANGEMENT_BITS at the time of this migration.
+WORK_ARRANGEMENT_BITS = {"remote": 1, "hybrid": 2, "onsite": 4}
+
+
+def work_arrangement_mask(locations):
+    mask = 0
+    for loc in locations or []:
+        if isinstance(loc, dict):
+            mask |= WORK_ARRANGEMENT_BITS.get(loc.get("type"), 0)
+    return mask
+
+
+def backfill_work_arrangements(apps, schema_editor):
+    JobPosting = apps.get_model("core", "JobPosting")
+    batch = []
+    jobs = JobPosting.objects.only("pk", "locations")
+    for job in jobs.iterator(chunk_size=BATCH_SIZE):
+        mask = work_arrangement_mask(job.locations)
+        if not mask:
+            continue
+        job.work_arrangements = mask
+        batch.append(job)
+        if len(batch) >= BATCH_SIZE:
+            JobPosting.objects.bulk_update(batch, ["work_arrangements"])
+            batch = []
+    if batch:
+        JobPosting.objects.bulk_update(batch, ["work_arrangements"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0021_jobposting_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobposting",
+            name="work_arrangements",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            backfill_work_arrangements, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name="jobposting",
+            index=models.Index(
+                fields=["work_arrangements", "-posting_date", "-link"],
+                name="jobposting_arrangement_idx",
+            ),
+        ),
+    ]
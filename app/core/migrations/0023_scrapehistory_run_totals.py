@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0022_jobposting_work_arrangements"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scrapehistory",
+            name="jobs_added",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scrapehistory",
+            name="duration_seconds",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="scrapehistory",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("success", "Success"),
+                    ("partial", "Partial failure"),
+                    ("failure", "Failure"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
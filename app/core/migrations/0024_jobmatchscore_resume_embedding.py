@@ -0,0 +1,52 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import app.core.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0023_scrapehistory_run_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resume",
+            name="embedding",
+            field=app.core.fields.PackedVectorField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="JobMatchScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("scored_at", models.DateTimeField(auto_now=True)),
+                (
+                    "job_posting",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="core.jobposting",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "job_posting")},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0024_jobmatchscore_resume_embedding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resume",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="resume",
+            name="text",
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0026_jobposting_minhash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobPostingAlias",
+            fields=[
+                ("link", models.URLField(primary_key=True, serialize=False)),
+                (
+                    "job_posting",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="aliases",
+                        to="core.jobposting",
+                    ),
+                ),
+            ],
+        ),
+    ]
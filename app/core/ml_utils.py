@@ -1,34 +1,260 @@
-import torch
-from transformers import AutoModel, AutoTokenizer
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
 
-# Load model and tokenizer
-tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
-model = AutoModel.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+logger = logging.getLogger(__name__)
 
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Number of texts run through the model at once.
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "32"))
+# Unix socket of a shared model server (see the `run_embedding_server`
+# command). When unset, each process loads its own copy of the model.
+EMBEDDING_SERVER_SOCKET = os.environ.get("EMBEDDING_SERVER_SOCKET", "")
+EMBEDDING_SERVER_TIMEOUT = 60
 
-def generate_embedding(text):
-    """
-    Generates a sentence embedding for the given text using a pre-trained
-    transformer model.
 
-    Args:
-        text (str): The input text to embed.
+class EmbeddingModel:
+    """
+    The sentence-transformer model, loaded on first use.
 
-    Returns:
-        list: A list of floats representing the embedding.
+    torch and transformers are imported lazily as well, so processes that
+    never embed anything (migrations, most web requests) don't pay for them.
     """
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-    with torch.no_grad():
-        outputs = model(**inputs)
+
+    def __init__(self, model_name=MODEL_NAME):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._tokenizer = None
+        self._model = None
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from transformers import AutoModel, AutoTokenizer
+
+                    logger.info(f"Loading embedding model {self.model_name}...")
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    model = AutoModel.from_pretrained(self.model_name)
+                    model.eval()
+                    self._model = model
+        return self._tokenizer, self._model
+
+    def embed(self, texts, batch_size=None, num_threads=None):
+        """
+        Generates sentence embeddings for many texts at once.
+
+        Texts are sorted by length before batching so that each batch is only
+        padded to its own longest text, which keeps padding (and wasted
+        compute) to a minimum. The results are returned in the input order.
+        """
+        import torch
+
+        tokenizer, model = self.load()
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        batch_size = batch_size or EMBEDDING_BATCH_SIZE
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start : start + batch_size]
+            inputs = tokenizer(
+                [texts[i] for i in batch],
+                return_tensors="pt",
+                truncation=True,
+                max_length=512,
+                padding="longest",
+            )
+            with torch.inference_mode():
+                outputs = model(**inputs)
+            pooled = _mean_pool(outputs, inputs["attention_mask"]).tolist()
+            for i, embedding in zip(batch, pooled):
+                results[i] = embedding
+        return results
+
+
+def _mean_pool(outputs, attention_mask):
+    import torch
 
     # Mean pooling
     embeddings = outputs.last_hidden_state
-    mask = inputs["attention_mask"].unsqueeze(-1).expand(embeddings.size()).float()
+    mask = attention_mask.unsqueeze(-1).expand(embeddings.size()).float()
     masked_embeddings = embeddings * mask
     summed = torch.sum(masked_embeddings, 1)
     counted = torch.clamp(mask.sum(1), min=1e-9)
     mean_pooled = summed / counted
 
     # Normalize
-    mean_pooled = torch.nn.functional.normalize(mean_pooled, p=2, dim=1)
-    return mean_pooled.tolist()[0]
+    return torch.nn.functional.normalize(mean_pooled, p=2, dim=1)
+
+
+_model = EmbeddingModel()
+
+
+def get_model():
+    """
+    Returns the process-wide embedding model.
+    """
+    return _model
+
+
+# --- Model server -----------------------------------------------------------
+#
+# Messages are JSON documents prefixed with their length as a 4-byte
+# big-endian integer. A request is {"texts": [...], "batch_size": n} and the
+# reply is {"embeddings": [...]} or {"error": "..."}.
+
+
+def _send_message(sock, payload):
+    data = json.dumps(payload).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-message.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_message(sock):
+    (size,) = struct.unpack(">I", _recv_exactly(sock, 4))
+    return json.loads(_recv_exactly(sock, size))
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = _recv_message(self.request)
+            except (ConnectionError, struct.error):
+                return
+            try:
+                # One forward pass at a time; torch already uses every core.
+                with self.server.inference_lock:
+                    embeddings = self.server.model.embed(
+                        request["texts"], batch_size=request.get("batch_size")
+                    )
+                _send_message(self.request, {"embeddings": embeddings})
+            except Exception as e:
+                logger.error(f"Embedding request failed: {e}")
+                _send_message(self.request, {"error": str(e)})
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Serves embeddings from a single model copy over a Unix socket, so web and
+    Celery workers on the same host can share it.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, model=None):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.model = model or get_model()
+        self.inference_lock = threading.Lock()
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+
+
+class EmbeddingClient:
+    """
+    Client for `EmbeddingServer`. Keeps one connection per thread.
+    """
+
+    def __init__(self, socket_path, timeout=EMBEDDING_SERVER_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def embed(self, texts, batch_size=None):
+        try:
+            sock = self._connection()
+            _send_message(sock, {"texts": list(texts), "batch_size": batch_size})
+            reply = _recv_message(sock)
+        except (OSError, struct.error):
+            self.close()
+            raise
+        if "error" in reply:
+            raise RuntimeError(f"Embedding server error: {reply['error']}")
+        return reply["embeddings"]
+
+
+_client = None
+
+
+def _get_client():
+    global _client
+    if _client is None and EMBEDDING_SERVER_SOCKET:
+        _client = EmbeddingClient(EMBEDDING_SERVER_SOCKET)
+    return _client
+
+
+def generate_embeddings(texts, batch_size=None, num_threads=None):
+    """
+    Generates sentence embeddings for many texts at once.
+
+    Uses the shared model server when EMBEDDING_SERVER_SOCKET is set and
+    reachable, and the in-process model otherwise.
+
+    Args:
+        texts (list): The input texts to embed.
+        batch_size (int, optional): Texts per forward pass. Defaults to
+            EMBEDDING_BATCH_SIZE.
+        num_threads (int, optional): Intra-op threads for torch (in-process
+            model only).
+
+    Returns:
+        list: One embedding (a list of floats) per input text.
+    """
+    client = _get_client()
+    if client is not None:
+        try:
+            return client.embed(texts, batch_size=batch_size)
+        except OSError as e:
+            logger.warning(
+                f"Embedding server unavailable ({e}); using the local model."
+            )
+    return get_model().embed(texts, batch_size=batch_size, num_threads=num_threads)
+
+
+def generate_embedding(text):
+    """
+    Generates a sentence embedding for the given text using a pre-trained
+    transformer model.
+
+    Args:
+        text (str): The input text to embed.
+
+    Returns:
+        list: A list of floats representing the embedding.
+    """
+    return generate_embeddings([text])[0]
@@ -1,8 +1,11 @@
 import datetime
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+from .fields import PackedVectorField
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -52,27 +55,139 @@ class User(AbstractUser):
         return self.email
 
 
+# Bits of JobPosting.work_arrangements. A posting with none set is "unspecified".
+WORK_ARRANGEMENT_BITS = {"remote": 1, "hybrid": 2, "onsite": 4}
+
+
+def work_arrangement_mask(locations):
+    """
+    Returns the work-arrangement bitmask for a `locations` list.
+    """
+    mask = 0
+    for loc in locations or []:
+        if isinstance(loc, dict):
+            mask |= WORK_ARRANGEMENT_BITS.get(loc.get("type"), 0)
+    return mask
+
+
+def work_arrangement_masks(preferences):
+    """
+    Returns every bitmask value matching at least one of the given
+    preferences ("remote", "hybrid", "onsite" or "unspecified"), so a
+    preference filter becomes an indexable `work_arrangements__in` lookup.
+    """
+    wanted = 0
+    for preference in preferences:
+        wanted |= WORK_ARRANGEMENT_BITS.get(preference, 0)
+    masks = []
+    for mask in range(1 << len(WORK_ARRANGEMENT_BITS)):
+        if mask & wanted or (mask == 0 and "unspecified" in preferences):
+            masks.append(mask)
+    return masks
+
+
 class JobPosting(models.Model):
     link = models.URLField(primary_key=True)
     company = models.CharField(max_length=255)
     title = models.CharField(max_length=255)
     description = models.TextField(default="")
+    # Deprecated: no longer written. Match scores are per user, in
+    # JobMatchScore.
     confidence_score = models.FloatField(default=0)
     posting_date = models.DateField(null=True, blank=True)
     locations = models.JSONField(default=list)
     days_in_office = models.IntegerField(blank=True, null=True)
-    embedding = models.JSONField(null=True, blank=True)
+    embedding = PackedVectorField(null=True, blank=True)
     details_updated_at = models.DateTimeField(null=True, blank=True)
+    # ETag / Last-Modified / content hash of the last fetch of `link`.
+    http_validators = models.JSONField(default=dict, blank=True)
+    # Weighted title/company/description document, kept up to date by a
+    # database trigger on Postgres (see migration 0021). Unused elsewhere.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # WORK_ARRANGEMENT_BITS of the types in `locations`, set on save.
+    work_arrangements = models.PositiveSmallIntegerField(default=0, editable=False)
+    # MinHash signature (uint32 bytes) of the title, company and description,
+    # used to spot near-duplicates at ingest (see JobPostingBand).
+    minhash = models.BinaryField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order of the job list.
+            models.Index(
+                fields=["-posting_date", "-link"], name="jobposting_date_link_idx"
+            ),
+            # Work-arrangement preference filter of the job list.
+            models.Index(
+                fields=["work_arrangements", "-posting_date", "-link"],
+                name="jobposting_arrangement_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} at {self.company}"
 
+    def save(self, *args, **kwargs):
+        """
+        Keeps `work_arrangements` in sync with `locations`. Code that writes
+        `locations` with bulk_update() must call this logic itself.
+        """
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "locations" in update_fields:
+            self.work_arrangements = work_arrangement_mask(self.locations)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "work_arrangements"}
+        super().save(*args, **kwargs)
+
+    @property
+    def is_remote(self):
+        return bool(self.work_arrangements & WORK_ARRANGEMENT_BITS["remote"])
+
+    @property
+    def is_hybrid(self):
+        return bool(self.work_arrangements & WORK_ARRANGEMENT_BITS["hybrid"])
+
+    @property
+    def is_onsite(self):
+        return bool(self.work_arrangements & WORK_ARRANGEMENT_BITS["onsite"])
+
+
+class JobPostingBand(models.Model):
+    """
+    One LSH band bucket of a posting's MinHash signature. Postings sharing a
+    bucket are near-duplicate candidates.
+    """
+
+    job_posting = models.ForeignKey(
+        JobPosting, on_delete=models.CASCADE, related_name="bands"
+    )
+    bucket = models.BigIntegerField(db_index=True)
+
+
+class JobPostingAlias(models.Model):
+    """
+    Another URL of a posting, dropped at ingest as a near-duplicate of it.
+    Scrapes treat aliases as known links and don't fetch them again.
+    """
+
+    link = models.URLField(primary_key=True)
+    job_posting = models.ForeignKey(
+        JobPosting, on_delete=models.CASCADE, related_name="aliases"
+    )
+
 
 class Resume(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=255, default="default_resume_name")
     file = models.FileField(upload_to="resumes/")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # SHA-256 of the file, and the normalized text and embedding extracted
+    # from it. Filled once by process_resume; reused by every Resume with
+    # the same content.
+    content_hash = models.CharField(
+        max_length=64, blank=True, db_index=True, editable=False
+    )
+    text = models.TextField(blank=True, editable=False)
+    embedding = PackedVectorField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -98,6 +213,7 @@ class ScrapableDomain(models.Model):
 class ScrapeHistory(models.Model):
     STATUS_CHOICES = [
         ("success", "Success"),
+        ("partial", "Partial failure"),
         ("failure", "Failure"),
     ]
     timestamp = models.DateTimeField(auto_now_add=True)
@@ -106,6 +222,8 @@ class ScrapeHistory(models.Model):
     )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     jobs_found = models.IntegerField(default=0)
+    jobs_added = models.IntegerField(default=0)
+    duration_seconds = models.FloatField(null=True, blank=True)
     details = models.TextField(blank=True)
 
     def __str__(self):
@@ -122,6 +240,20 @@ class UserJobInteraction(models.Model):
         unique_together = ("user", "job_posting")
 
 
+class JobMatchScore(models.Model):
+    """
+    How well a user's latest resume matches a job posting.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    job_posting = models.ForeignKey(JobPosting, on_delete=models.CASCADE)
+    score = models.FloatField()
+    scored_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "job_posting")
+
+
 class HiddenCompany(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
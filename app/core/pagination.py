@@ -0,0 +1,179 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(position):
+    data = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise NotFound("Invalid cursor.")
+    if not isinstance(position, dict):
+        raise NotFound("Invalid cursor.")
+    return position
+
+
+class JobPostingKeysetPagination(BasePagination):
+    """
+    Keyset pagination for job postings, newest first.
+
+    Rows are ordered by (posting_date DESC, link DESC), which the composite
+    index on JobPosting covers, with undated rows last. A page resumes with a
+    WHERE clause on the last row's values instead of an OFFSET, so page N
+    costs the same as page 1.
+
+    Views may split their queryset into ordered segments (for example pinned
+    jobs first) by defining `get_pagination_segments(queryset)`, returning a
+    list of (key, queryset) pairs. Views that annotate a relevance score can
+    name it in `pagination_rank_field` to order by (score DESC, link DESC)
+    instead.
+
+    Cursors are opaque, URL-safe strings.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ranges(self, segments):
+        """
+        Returns the (segment key, range kind, queryset) triples to read in
+        order. By date, every segment is split into its dated and undated
+        rows; keeping NULL dates in a separate range lets both use the same
+        index order on any database, without NULLS FIRST/LAST clauses.
+        """
+        if self.rank_field:
+            return [(key, "ranked", queryset) for key, queryset in segments]
+        ranges = []
+        for key, queryset in segments:
+            ranges.append((key, "dated", queryset.filter(posting_date__isnull=False)))
+            ranges.append((key, "undated", queryset.filter(posting_date__isnull=True)))
+        return ranges
+
+    def order(self, rows):
+        if self.rank_field:
+            return rows.order_by(f"-{self.rank_field}", "-link")
+        return rows.order_by("-posting_date", "-link")
+
+    def after(self, position):
+        """
+        Returns the filter selecting the rows that sort after `position`
+        within its range.
+        """
+        link = position["link"]
+        if position["range"] == "undated":
+            return Q(link__lt=link)
+        if position["range"] == "ranked":
+            field, value = self.rank_field, float(position["value"])
+        else:
+            field = "posting_date"
+            value = datetime.date.fromisoformat(position["value"])
+        # The first condition bounds the index scan; the second only has to
+        # be checked against rows sharing the cursor's value.
+        return Q(**{f"{field}__lte": value}) & (
+            Q(**{f"{field}__lt": value}) | Q(link__lt=link)
+        )
+
+    def position_of(self, row, key, kind):
+        if kind == "ranked":
+            value = float(getattr(row, self.rank_field))
+        elif kind == "dated":
+            value = row.posting_date.isoformat()
+        else:
+            value = None
+        return {"segment": key, "range": kind, "value": value, "link": row.link}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.rank_field = getattr(view, "pagination_rank_field", None)
+        page_size = self.get_page_size(request)
+
+        segments = [(0, queryset)]
+        if view is not None and hasattr(view, "get_pagination_segments"):
+            segments = view.get_pagination_segments(queryset)
+        ranges = self.get_ranges(segments)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        position = decode_cursor(cursor) if cursor else None
+        start = 0
+        if position is not None:
+            try:
+                start = next(
+                    i
+                    for i, (key, kind, _) in enumerate(ranges)
+                    if key == position["segment"] and kind == position["range"]
+                )
+                resume_filter = self.after(position)
+            except (KeyError, StopIteration, TypeError, ValueError):
+                raise NotFound("Invalid cursor.")
+
+        page = []
+        last_range = None
+        has_more = False
+        for i in range(start, len(ranges)):
+            key, kind, rows = ranges[i]
+            rows = self.order(rows)
+            if position is not None and i == start:
+                rows = rows.filter(resume_filter)
+
+            remaining = page_size - len(page)
+            fetched = list(rows[: remaining + 1])
+            page.extend(fetched[:remaining])
+            last_range = (key, kind)
+            if len(fetched) > remaining:
+                has_more = True
+                break
+            if len(page) == page_size:
+                # Full page; more rows may follow in later ranges.
+                has_more = i < len(ranges) - 1
+                break
+
+        self.next_position = None
+        if has_more and page:
+            self.next_position = self.position_of(page[-1], *last_range)
+        return page
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
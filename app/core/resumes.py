@@ -0,0 +1,45 @@
+import logging
+
+from shared.resume_text import content_hash, extract_text
+
+from .ml_utils import generate_embedding
+from .models import Resume
+
+logger = logging.getLogger(__name__)
+
+
+def process_resume(resume):
+    """
+    Makes sure `resume` has its text and embedding.
+
+    Files are only read when the resume hasn't been processed yet, and text
+    extraction and embedding only run for content (by SHA-256) that no
+    other resume has already been processed for.
+
+    Returns:
+        Resume: The same resume, with `text` and `embedding` set.
+
+    Raises:
+        FileNotFoundError: If the resume file is missing.
+        ValueError: If the file can't be read as text.
+    """
+    if resume.embedding is not None:
+        return resume
+
+    with resume.file.open("rb") as f:
+        data = f.read()
+    digest = content_hash(data)
+    known = (
+        Resume.objects.filter(content_hash=digest, embedding__isnull=False)
+        .only("text", "embedding")
+        .first()
+    )
+    if known is not None:
+        logger.info(f"Reusing the processed text of resume {known.pk}.")
+        resume.text, resume.embedding = known.text, known.embedding
+    else:
+        resume.text = extract_text(data, resume.file.name)
+        resume.embedding = generate_embedding(resume.text)
+    resume.content_hash = digest
+    resume.save(update_fields=["content_hash", "text", "embedding"])
+    return resume
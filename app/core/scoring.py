@@ -0,0 +1,133 @@
+import logging
+
+import numpy as np
+from django.utils import timezone
+
+from .listing_cache import bump_user_version
+from .models import JobMatchScore, JobPosting, Resume
+from .similarity import embedding_matrix, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+# Score rows written per INSERT ... ON CONFLICT statement.
+SCORE_BATCH_SIZE = 2000
+
+
+def _upsert_scores(rows):
+    JobMatchScore.objects.bulk_create(
+        rows,
+        batch_size=SCORE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["user", "job_posting"],
+        update_fields=["score", "scored_at"],
+    )
+
+
+def save_scores(user_id, pks, scores):
+    """
+    Upserts the match scores of one user.
+
+    Args:
+        user_id (int): The user the scores belong to.
+        pks (list): Job posting PKs.
+        scores (iterable): One score per PK.
+
+    Returns:
+        int: The number of scores written.
+    """
+    now = timezone.now()
+    rows = [
+        JobMatchScore(
+            user_id=user_id, job_posting_id=pk, score=float(score), scored_at=now
+        )
+        for pk, score in zip(pks, scores)
+    ]
+    if not rows:
+        return 0
+    _upsert_scores(rows)
+    bump_user_version(user_id)
+    return len(rows)
+
+
+def score_resume(user_id, embedding):
+    """
+    Scores a resume embedding against every job posting embedding in one
+    vectorized pass and stores the results as the user's match scores.
+    Postings without an embedding are left unscored.
+
+    Returns:
+        int: The number of postings scored.
+    """
+    pks, scores = embedding_matrix.score_all(embedding)
+    return save_scores(user_id, pks, scores)
+
+
+def resume_embeddings():
+    """
+    Returns the embedding of every active user's latest resume. Users whose
+    latest resume hasn't been embedded yet are left out; the full scoring
+    pass that embeds it will score them against every posting.
+
+    Returns:
+        tuple: (list of user ids, float32 matrix with one row per user).
+    """
+    resumes = (
+        Resume.objects.filter(user__is_active=True)
+        .order_by("user_id", "-uploaded_at", "-pk")
+        .values_list("user_id", "embedding")
+    )
+    user_ids, vectors = [], []
+    last_user_id = None
+    for user_id, embedding in resumes.iterator(chunk_size=2000):
+        if user_id == last_user_id:
+            continue
+        last_user_id = user_id
+        if embedding is None or len(embedding) == 0:
+            continue
+        if vectors and len(embedding) != len(vectors[0]):
+            logger.warning(f"Skipping resume of user {user_id}: wrong dimension.")
+            continue
+        user_ids.append(user_id)
+        vectors.append(embedding)
+    if not vectors:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    return user_ids, normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+
+def score_new_jobs(pks):
+    """
+    Scores newly added postings against every active user's resume with a
+    single (users x dim) @ (dim x jobs) product, so a scrape costs
+    O(users x new jobs) rather than a full rescore.
+
+    Returns:
+        int: The number of scores written.
+    """
+    rows = JobPosting.objects.filter(pk__in=list(pks), embedding__isnull=False)
+    job_pks, job_vectors = [], []
+    for pk, embedding in rows.values_list("pk", "embedding"):
+        if len(embedding):
+            job_pks.append(pk)
+            job_vectors.append(embedding)
+    user_ids, resumes = resume_embeddings()
+    if not job_pks or not user_ids:
+        return 0
+
+    jobs = normalize_rows(np.asarray(job_vectors, dtype=np.float32))
+    if jobs.shape[1] != resumes.shape[1]:
+        logger.warning("Job and resume embeddings differ in dimension; not scoring.")
+        return 0
+    scores = resumes @ jobs.T
+
+    now = timezone.now()
+    rows = [
+        JobMatchScore(
+            user_id=user_id, job_posting_id=pk, score=float(score), scored_at=now
+        )
+        for user_id, user_scores in zip(user_ids, scores)
+        for pk, score in zip(job_pks, user_scores)
+    ]
+    _upsert_scores(rows)
+    for user_id in user_ids:
+        bump_user_version(user_id)
+    return len(rows)
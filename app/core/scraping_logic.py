@@ -4,10 +4,23 @@ from datetime import datetime
 
 import requests
 from bs4 import BeautifulSoup
+from django.conf import settings
 from googleapiclient.discovery import build
 
-from .ml_utils import generate_embedding
+from shared import ann_index
+from shared.http_client import conditional_get, get_session
+from shared.near_duplicates import LSHIndex, document_text, minhash
+
+from .duplicates import (
+    add_aliases,
+    find_existing_duplicates,
+    index_postings,
+    known_links,
+)
+from .listing_cache import bump_corpus_version
+from .ml_utils import generate_embeddings
 from .models import JobPosting, ScrapableDomain
+from .similarity import embeddings_changed
 
 logger = logging.getLogger(__name__)
 
@@ -22,31 +35,58 @@ def scrape_job_details(url):
     Returns a dictionary with the scraped data.
     """
     try:
-        response = requests.get(url, timeout=10)
+        response = get_session().get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        details = {}
-        # Title
-        details["title"] = soup.title.string if soup.title else ""
-        # Description
-        # This is a generic attempt to get the main content.
-        # A more robust solution would have parsers for specific site structures.
-        main_content = soup.find("main") or soup.find("article") or soup.find("body")
-        if main_content:
-            details["description"] = " ".join(main_content.get_text().split())
-        else:
-            details["description"] = ""
-
-        return details
+        return parse_job_details(response.content)
     except requests.RequestException as e:
         logger.warning(f"Could not fetch URL {url}: {e}")
         return None
 
 
-def scrape_jobs(query, domain, days=None):
+def scrape_job_details_if_changed(url, validators=None):
     """
-    Scrapes job postings from a given domain using the Google Custom Search API.
+    Scrapes a job posting only if its page changed since it was last fetched,
+    using the HTTP validators stored on the job (see `conditional_get`).
+
+    Returns:
+        tuple: (details, validators, changed). `details` is None when the page
+        is unchanged. None is returned instead if the fetch failed.
+    """
+    try:
+        result = conditional_get(url, validators)
+    except requests.RequestException as e:
+        logger.warning(f"Could not fetch URL {url}: {e}")
+        return None
+    if not result.changed:
+        return None, result.validators, False
+    return parse_job_details(result.response.content), result.validators, True
+
+
+def parse_job_details(content):
+    """
+    Parses the details of a job posting from the HTML of its page.
+    """
+    soup = BeautifulSoup(content, "html.parser")
+
+    details = {}
+    # Title
+    details["title"] = soup.title.string if soup.title else ""
+    # Description
+    # This is a generic attempt to get the main content.
+    # A more robust solution would have parsers for specific site structures.
+    main_content = soup.find("main") or soup.find("article") or soup.find("body")
+    if main_content:
+        details["description"] = " ".join(main_content.get_text().split())
+    else:
+        details["description"] = ""
+
+    return details
+
+
+def search_jobs(query, domain, days=None):
+    """
+    Finds job postings on a given domain using the Google Custom Search API,
+    without fetching the job pages themselves.
 
     Args:
         query (str): The search query for job titles.
@@ -54,7 +94,8 @@ def scrape_jobs(query, domain, days=None):
         days (int, optional): The number of past days to restrict the search to.
 
     Returns:
-        list: A list of dictionaries, where each dictionary represents a job posting.
+        list: A list of dictionaries, where each dictionary represents a job
+        posting as described by its search result.
     """
     api_key = os.environ.get("GOOGLE_API_KEY")
     search_engine_id = os.environ.get("CUSTOM_SEARCH_ENGINE_ID")
@@ -136,23 +177,136 @@ def scrape_jobs(query, domain, days=None):
                 "locations": locations,
                 "posting_date": posting_date,
             }
+            jobs.append(job_data)
+    return jobs
 
-            # Scrape the actual job page for more details
-            if job_data["link"]:
-                scraped_details = scrape_job_details(job_data["link"])
-                if scraped_details:
-                    # Override the initial data with more accurate scraped data
-                    job_data["title"] = (
-                        scraped_details.get("title") or job_data["title"]
-                    )
-                    job_data["description"] = (
-                        scraped_details.get("description") or job_data["description"]
-                    )
 
-            jobs.append(job_data)
+def merge_job_details(job_data, scraped_details):
+    """
+    Overrides the search result data of a job with the more accurate data
+    scraped from its page, where there is any.
+    """
+    if scraped_details:
+        job_data["title"] = scraped_details.get("title") or job_data["title"]
+        job_data["description"] = (
+            scraped_details.get("description") or job_data["description"]
+        )
+    return job_data
+
+
+def scrape_jobs(query, domain, days=None):
+    """
+    Scrapes job postings from a given domain using the Google Custom Search API.
+
+    Args:
+        query (str): The search query for job titles.
+        domain (str): The domain to search within (e.g., "lever.co").
+        days (int, optional): The number of past days to restrict the search to.
+
+    Returns:
+        list: A list of dictionaries, where each dictionary represents a job posting.
+    """
+    jobs = search_jobs(query, domain, days=days)
+    for job_data in jobs:
+        # Scrape the actual job page for more details
+        if job_data["link"]:
+            merge_job_details(job_data, scrape_job_details(job_data["link"]))
     return jobs
 
 
+def save_scraped_jobs(jobs):
+    """
+    Saves scraped jobs that aren't in the database yet and embeds them in
+    one batch.
+
+    Jobs whose title, company and description are near-duplicates (by
+    MinHash/LSH) of a stored posting or of an earlier job in the batch,
+    e.g. the same posting under another URL, aren't saved or embedded;
+    their link is recorded as an alias of that posting instead.
+
+    Args:
+        jobs (list): Job dictionaries as returned by `scrape_jobs`.
+
+    Returns:
+        list: The JobPosting objects that were created.
+    """
+    existing_links = known_links(job_data["link"] for job_data in jobs)
+    new_jobs = []
+    for job_data in jobs:
+        if job_data["link"] in existing_links:
+            continue
+        title = job_data["title"]
+        if "Job Application for" in title:
+            title = title.replace("Job Application for", "").strip()
+        signature = minhash(
+            document_text(title, job_data["company"], job_data["description"])
+        )
+        new_jobs.append((job_data, title, signature))
+
+    existing_duplicates = find_existing_duplicates(
+        [signature for _, _, signature in new_jobs]
+    )
+    batch_index = LSHIndex()
+    created_jobs = []
+    signatures = {}
+    aliases = {}
+    for (job_data, title, signature), duplicate_of in zip(
+        new_jobs, existing_duplicates
+    ):
+        duplicate_of = duplicate_of or batch_index.find(signature)
+        if duplicate_of is not None:
+            logger.info(
+                f"Skipping {job_data['link']}: near-duplicate of {duplicate_of}."
+            )
+            if job_data["link"] != duplicate_of:
+                aliases[job_data["link"]] = duplicate_of
+            continue
+
+        obj, created = JobPosting.objects.get_or_create(
+            link=job_data["link"],
+            defaults={
+                "title": title,
+                "company": job_data["company"],
+                "description": job_data["description"],
+                "posting_date": job_data["posting_date"],
+                "locations": job_data["locations"],
+                "minhash": signature.tobytes(),
+            },
+        )
+        if created:
+            created_jobs.append(obj)
+            signatures[obj.pk] = signature
+            batch_index.add(obj.pk, signature)
+    index_postings(signatures)
+    add_aliases(aliases)
+
+    if created_jobs:
+        embeddings = generate_embeddings(
+            [f"{obj.title} {obj.description}" for obj in created_jobs]
+        )
+        for obj, embedding in zip(created_jobs, embeddings):
+            obj.embedding = embedding
+        JobPosting.objects.bulk_update(created_jobs, ["embedding"])
+        embeddings_changed([obj.pk for obj in created_jobs])
+        bump_corpus_version()
+    return created_jobs
+
+
+def add_to_ann_index(jobs):
+    """
+    Adds the embeddings of new jobs to the ANN index, if one was built.
+    """
+    try:
+        items = {job.pk: job.embedding for job in jobs}
+        if not ann_index.add_to_index(items, settings.ANN_INDEX_PATH):
+            logger.warning(
+                f"No ANN index at {settings.ANN_INDEX_PATH}; run "
+                "`python manage.py build_ann_index` to build one."
+            )
+    except Exception as e:
+        logger.error(f"Failed to update the ANN index: {e}")
+
+
 def scrape_and_save_jobs(query, domains, days=None):
     """
     Scrapes jobs from a list of domains and saves new jobs to the database.
@@ -165,38 +319,20 @@ def scrape_and_save_jobs(query, domains, days=None):
     Returns:
         int: The number of new jobs that were scraped and saved.
     """
-    scraped_count = 0
+    new_jobs = []
     for domain_obj in domains:
         domain_name = (
             domain_obj.domain if isinstance(domain_obj, ScrapableDomain) else domain_obj
         )
         try:
             jobs = scrape_jobs(query, domain_name, days=days)
-            for job_data in jobs:
-                title = job_data["title"]
-                if "Job Application for" in title:
-                    title = title.replace("Job Application for", "").strip()
-
-                obj, created = JobPosting.objects.get_or_create(
-                    link=job_data["link"],
-                    defaults={
-                        "title": title,
-                        "company": job_data["company"],
-                        "description": job_data["description"],
-                        "posting_date": job_data["posting_date"],
-                        "locations": job_data["locations"],
-                    },
-                )
-                if created:
-                    text = f"{obj.title} {obj.description}"
-                    obj.embedding = generate_embedding(text)
-                    obj.save()
-                    scraped_count += 1
+            new_jobs.extend(save_scraped_jobs(jobs))
         except Exception as e:
             # In a real app, you'd want to log this properly
             print(f"Error scraping {domain_name}: {e}")
 
-    return scraped_count
+    add_to_ann_index(new_jobs)
+    return len(new_jobs)
 
 
 def parse_job_title(title):
@@ -39,8 +39,45 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class JobPostingSerializer(serializers.ModelSerializer):
+class VectorField(serializers.Field):
+    """
+    Renders a packed vector (a NumPy array) as a list of floats.
+    """
+
+    def to_representation(self, value):
+        return value.tolist()
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError("Expected a list of numbers.")
+        return data
+
+
+class SparseFieldsetMixin:
+    """
+    Lets callers pick which fields a serializer renders.
+
+    Pass `fields` to keep only the named fields, and/or `omit` to drop some.
+    Unknown names are ignored.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+
+class JobPostingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     is_pinned = serializers.BooleanField(read_only=True)
+    # The requesting user's match score (see annotate_match_score); 0 when
+    # the posting hasn't been scored against their resume.
+    confidence_score = serializers.FloatField(
+        source="match_score", read_only=True, default=0.0
+    )
+    embedding = VectorField(read_only=True)
 
     class Meta:
         model = JobPosting
@@ -62,7 +99,7 @@ class JobPostingSerializer(serializers.ModelSerializer):
 class ResumeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Resume
-        fields = "__all__"
+        exclude = ("content_hash", "text", "embedding")
 
 
 class CoverLetterSerializer(serializers.ModelSerializer):
@@ -136,13 +173,13 @@ class AdminJobPostingSerializer(serializers.ModelSerializer):
         return None
 
     def get_remote(self, obj):
-        return any(loc.get("type") == "remote" for loc in obj.locations)
+        return obj.is_remote
 
     def get_hybrid(self, obj):
-        return any(loc.get("type") == "hybrid" for loc in obj.locations)
+        return obj.is_hybrid
 
     def get_onsite(self, obj):
-        return any(loc.get("type") == "onsite" for loc in obj.locations)
+        return obj.is_onsite
 
 
 class ScrapeScheduleSerializer(serializers.ModelSerializer):
@@ -0,0 +1,343 @@
+import logging
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from shared import ann_index
+
+from .models import JobPosting
+
+logger = logging.getLogger(__name__)
+
+# Shared (cross-process) version of the embedding corpus, and the log of
+# which posting changed at each version, so that other processes can apply
+# the same changes incrementally instead of reloading everything.
+EMBEDDINGS_VERSION_KEY = "job_embeddings:version"
+EMBEDDINGS_CHANGE_KEY = "job_embeddings:change:{}"
+# Beyond this many unseen changes a full reload is cheaper.
+MAX_INCREMENTAL_CHANGES = 1000
+CHANGE_LOG_TIMEOUT = 60 * 60 * 24
+
+
+def normalize_rows(vectors):
+    """
+    Returns the rows scaled to unit length. Zero rows are left as zeros.
+    """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(
+        vectors, norms, out=np.zeros_like(vectors), where=norms > 0
+    ).astype(np.float32, copy=False)
+
+
+class EmbeddingMatrix:
+    """
+    An in-process cache of every job posting embedding as one contiguous,
+    pre-normalized float32 matrix with a parallel array of job PKs, so that a
+    similarity query is a single matrix-vector product.
+
+    Rows live in a buffer that grows by doubling; removals swap the last row
+    into the freed slot. The cache loads lazily on first use and follows the
+    shared version in Django's cache to pick up changes made elsewhere.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buffer = np.zeros((0, 0), dtype=np.float32)
+        self._pks = []
+        self._row_of = {}
+        self._version = None
+
+    def __len__(self):
+        return len(self._pks)
+
+    @property
+    def dimension(self):
+        return self._buffer.shape[1]
+
+    @property
+    def matrix(self):
+        return self._buffer[: len(self._pks)]
+
+    @property
+    def pks(self):
+        return np.array(self._pks, dtype=object)
+
+    def load(self):
+        """
+        Rebuilds the matrix from the database.
+        """
+        with self._lock:
+            version = cache.get(EMBEDDINGS_VERSION_KEY, 0)
+            rows = JobPosting.objects.exclude(embedding__isnull=True).values_list(
+                "pk", "embedding"
+            )
+            pks, vectors = [], []
+            for pk, embedding in rows.iterator(chunk_size=2000):
+                if len(embedding) == 0:
+                    continue
+                if vectors and len(embedding) != len(vectors[0]):
+                    logger.warning(f"Skipping embedding of {pk}: wrong dimension.")
+                    continue
+                pks.append(pk)
+                vectors.append(embedding)
+
+            if vectors:
+                self._buffer = normalize_rows(np.asarray(vectors, dtype=np.float32))
+            else:
+                self._buffer = np.zeros((0, 0), dtype=np.float32)
+            self._pks = pks
+            self._row_of = {pk: row for row, pk in enumerate(pks)}
+            self._version = version
+            logger.info(f"Loaded {len(pks)} job embeddings (version {version}).")
+
+    def reset(self):
+        """
+        Drops the matrix; it is reloaded on next use.
+        """
+        with self._lock:
+            self._buffer = np.zeros((0, 0), dtype=np.float32)
+            self._pks = []
+            self._row_of = {}
+            self._version = None
+
+    def refresh(self):
+        """
+        Brings the matrix up to date with the shared version, applying the
+        logged changes incrementally when possible.
+        """
+        with self._lock:
+            if self._version is None:
+                self.load()
+                return
+
+            version = cache.get(EMBEDDINGS_VERSION_KEY, 0)
+            if version == self._version:
+                return
+            if version < self._version or version - self._version > (
+                MAX_INCREMENTAL_CHANGES
+            ):
+                self.load()
+                return
+
+            keys = [
+                EMBEDDINGS_CHANGE_KEY.format(v)
+                for v in range(self._version + 1, version + 1)
+            ]
+            changes = cache.get_many(keys)
+            if len(changes) != len(keys):
+                # Part of the change log expired.
+                self.load()
+                return
+
+            changed_pks = set(changes.values())
+            embeddings = dict(
+                JobPosting.objects.filter(pk__in=changed_pks).values_list(
+                    "pk", "embedding"
+                )
+            )
+            for pk in changed_pks:
+                self.upsert(pk, embeddings.get(pk))
+            self._version = version
+
+    def upsert(self, pk, embedding):
+        """
+        Adds, replaces or (if `embedding` is empty) removes the row of a posting.
+        """
+        with self._lock:
+            if self._version is None:
+                # Not loaded yet; the eventual load will see the change.
+                return
+            if embedding is None or len(embedding) == 0:
+                self.remove(pk)
+                return
+
+            vector = normalize_rows(np.asarray(embedding, dtype=np.float32))
+            if not self._pks:
+                self._buffer = np.zeros((16, vector.shape[0]), dtype=np.float32)
+            elif vector.shape[0] != self.dimension:
+                logger.warning(f"Skipping embedding of {pk}: wrong dimension.")
+                self.remove(pk)
+                return
+
+            row = self._row_of.get(pk)
+            if row is None:
+                row = len(self._pks)
+                if row == self._buffer.shape[0]:
+                    grown = np.zeros(
+                        (max(16, row * 2), self.dimension), dtype=np.float32
+                    )
+                    grown[:row] = self._buffer[:row]
+                    self._buffer = grown
+                self._pks.append(pk)
+                self._row_of[pk] = row
+            self._buffer[row] = vector
+
+    def remove(self, pk):
+        with self._lock:
+            row = self._row_of.pop(pk, None)
+            if row is None:
+                return
+            last = len(self._pks) - 1
+            if row != last:
+                last_pk = self._pks[last]
+                self._buffer[row] = self._buffer[last]
+                self._pks[row] = last_pk
+                self._row_of[last_pk] = row
+            self._pks.pop()
+
+    def score_all(self, embedding):
+        """
+        Scores `embedding` against every row in one matrix-vector product.
+
+        Returns:
+            tuple: (list of pks, float32 array of cosine similarities).
+        """
+        self.refresh()
+        with self._lock:
+            query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+            if not self._pks or query.shape[0] != self.dimension:
+                return [], np.zeros(0, dtype=np.float32)
+            return list(self._pks), self.matrix @ query
+
+    def top_k(self, embedding, k=5, min_score=None, exclude=()):
+        """
+        Finds the rows most similar to `embedding` by cosine similarity.
+
+        Args:
+            embedding (list): The query vector.
+            k (int): The maximum number of results.
+            min_score (float, optional): Drop results scoring at or below this.
+            exclude (iterable, optional): PKs to leave out of the results.
+
+        Returns:
+            list: (pk, score) tuples, best first.
+        """
+        self.refresh()
+        with self._lock:
+            query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+            if not self._pks or query.shape[0] != self.dimension:
+                return []
+
+            scores = self.matrix @ query
+            for pk in exclude:
+                row = self._row_of.get(pk)
+                if row is not None:
+                    scores[row] = -np.inf
+
+            k = min(k, len(scores))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (self._pks[row], float(scores[row]))
+                for row in top
+                if np.isfinite(scores[row])
+                and (min_score is None or scores[row] > min_score)
+            ]
+
+
+embedding_matrix = EmbeddingMatrix()
+
+
+def find_similar_jobs(embedding, k=5, min_score=None, exclude=()):
+    """
+    Finds the postings most similar to `embedding`.
+
+    Uses the persisted ANN index when one has been built (see the
+    `build_ann_index` command) and the exact embedding matrix otherwise.
+
+    Returns:
+        list: (pk, score) tuples, best first.
+    """
+    index = ann_index.get_index(settings.ANN_INDEX_PATH)
+    if index is not None:
+        return index.search(embedding, k=k, min_score=min_score, exclude=exclude)
+    return embedding_matrix.top_k(embedding, k=k, min_score=min_score, exclude=exclude)
+
+
+def embeddings_changed(pks):
+    """
+    Records that the embeddings of the given postings were added, changed or
+    deleted. Must be called after bulk writes, which bypass model signals.
+    """
+    pks = list(pks)
+    if len(pks) > MAX_INCREMENTAL_CHANGES:
+        # Too many to replay; skipping past the change log forces a reload.
+        cache.add(EMBEDDINGS_VERSION_KEY, 0)
+        try:
+            cache.incr(EMBEDDINGS_VERSION_KEY, MAX_INCREMENTAL_CHANGES + 1)
+        except ValueError:
+            cache.set(EMBEDDINGS_VERSION_KEY, MAX_INCREMENTAL_CHANGES + 1)
+        return
+
+    for pk in pks:
+        cache.add(EMBEDDINGS_VERSION_KEY, 0)
+        try:
+            version = cache.incr(EMBEDDINGS_VERSION_KEY)
+        except ValueError:
+            # The key was evicted between add() and incr().
+            cache.set(EMBEDDINGS_VERSION_KEY, 1)
+            version = 1
+        cache.set(EMBEDDINGS_CHANGE_KEY.format(version), pk, CHANGE_LOG_TIMEOUT)
+
+
+def _same_embedding(a, b):
+    if a is None or b is None:
+        return a is b
+    return np.array_equal(np.asarray(a), np.asarray(b))
+
+
+@receiver(post_init, sender=JobPosting)
+def _job_posting_loaded(sender, instance, **kwargs):
+    # Remembered to tell saves that change the embedding from other saves.
+    if "embedding" not in instance.get_deferred_fields():
+        instance._saved_embedding = instance.embedding
+
+
+@receiver(post_save, sender=JobPosting)
+def _job_posting_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and "embedding" not in update_fields:
+        return
+    if created:
+        changed = instance.embedding is not None
+    else:
+        changed = not hasattr(instance, "_saved_embedding") or not _same_embedding(
+            instance._saved_embedding, instance.embedding
+        )
+    instance._saved_embedding = instance.embedding
+    if changed:
+        embeddings_changed([instance.pk])
+
+
+# Postings deleted in this thread, removed from the ANN index in one write
+# once their transaction commits.
+_deleted = threading.local()
+
+
+def _remove_deleted_from_ann_index():
+    pks = getattr(_deleted, "pks", set())
+    _deleted.pks = set()
+    if not pks:
+        # Already removed by an earlier callback of the same transaction.
+        return
+    # Rows whose delete was rolled back are still there.
+    pks -= set(JobPosting.objects.filter(pk__in=pks).values_list("pk", flat=True))
+    try:
+        ann_index.remove_from_index(pks, settings.ANN_INDEX_PATH)
+    except Exception as e:
+        logger.error(f"Failed to remove deleted postings from the ANN index: {e}")
+
+
+@receiver(post_delete, sender=JobPosting)
+def _job_posting_deleted(sender, instance, **kwargs):
+    embeddings_changed([instance.pk])
+    if not hasattr(_deleted, "pks"):
+        _deleted.pks = set()
+    _deleted.pks.add(instance.pk)
+    transaction.on_commit(_remove_deleted_from_ann_index)
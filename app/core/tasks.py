@@ -1,10 +1,17 @@
 import datetime
 import logging
+import os
+import time
 
-from celery import shared_task
+from celery import chord, group, shared_task
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
 
+from shared.concurrency import fetch_all
+
+from .duplicates import known_links
+from .listing_cache import bump_corpus_version
 from .models import (
     JobPosting,
     Resume,
@@ -12,11 +19,42 @@ from .models import (
     ScrapeHistory,
     ScrapeSchedule,
     SearchableJobTitle,
+    work_arrangement_mask,
+)
+from .resumes import process_resume
+from .scoring import score_new_jobs, score_resume
+from .scraping_logic import (
+    add_to_ann_index,
+    merge_job_details,
+    parse_job_title,
+    save_scraped_jobs,
+    scrape_job_details,
+    scrape_job_details_if_changed,
+    scrape_jobs,
+    search_jobs,
 )
-from .scraping_logic import parse_job_title, scrape_job_details, scrape_jobs
 
 logger = logging.getLogger(__name__)
 
+# Postings read and written per chunk by backfill_job_titles_task.
+BACKFILL_CHUNK_SIZE = 1000
+# Last primary key processed by a backfill_job_titles_task shard.
+BACKFILL_CHECKPOINT_KEY = "backfill_job_titles:checkpoint:{}:{}"
+# Job pages fetched (and saved) per detail subtask of the scrape pipeline.
+SCRAPE_DETAIL_CHUNK_SIZE = int(os.environ.get("SCRAPE_DETAIL_CHUNK_SIZE", "25"))
+
+
+def build_scrape_query():
+    """
+    Returns the search query matching every searchable job title, or None if
+    there are none.
+    """
+    titles = SearchableJobTitle.objects.values_list("title", flat=True)
+    query_parts = [f'"{title}"' for title in titles]
+    if not query_parts:
+        return None
+    return f"({' OR '.join(query_parts)})"
+
 
 @shared_task
 def scrape_and_save_jobs_task(domain_id):
@@ -33,30 +71,22 @@ def scrape_and_save_jobs_task(domain_id):
             ScrapeHistory.objects.create(status="success", details=details)
             return details
 
+        started_at = time.monotonic()
         total_jobs_found = 0
         total_jobs_added = 0
         errors = []
 
-        query_parts = [f'"{title.title}"' for title in job_titles]
-        query = f"({' OR '.join(query_parts)})"
+        query = build_scrape_query()
 
         try:
             scraped_jobs = scrape_jobs(query=query, domain=domain.domain)
             total_jobs_found += len(scraped_jobs)
 
-            for job_data in scraped_jobs:
-                obj, created = JobPosting.objects.get_or_create(
-                    link=job_data["link"],
-                    defaults={
-                        "title": job_data["title"],
-                        "company": job_data["company"],
-                        "description": job_data["description"],
-                        "posting_date": job_data.get("posting_date"),
-                        "locations": job_data.get("locations", []),
-                    },
-                )
-                if created:
-                    total_jobs_added += 1
+            created = save_scraped_jobs(scraped_jobs)
+            total_jobs_added += len(created)
+            if created:
+                add_to_ann_index(created)
+                score_new_jobs_task.delay([job.pk for job in created])
         except Exception as e:
             errors.append(str(e))
 
@@ -64,8 +94,10 @@ def scrape_and_save_jobs_task(domain_id):
         if errors:
             details += f" Errors: {', '.join(errors)}"
         ScrapeHistory.objects.create(
-            status="success" if not errors else "partial_failure",
+            status="success" if not errors else "partial",
             jobs_found=total_jobs_found,
+            jobs_added=total_jobs_added,
+            duration_seconds=time.monotonic() - started_at,
             details=details,
         )
         return f"Scraping finished for {domain.domain}. Found: {total_jobs_found}, Added: {total_jobs_added}."
@@ -80,49 +112,272 @@ def scrape_and_save_jobs_task(domain_id):
         return f"An unexpected error occurred: {str(e)}"
 
 
+# --- Scrape pipeline ----------------------------------------------------------
+#
+# search_domain_task (one per domain, in parallel)
+#   -> fan_out_job_details_task (drops known links, splits the rest in chunks)
+#   -> scrape_job_details_chunk_task (one per chunk, in parallel)
+#   -> record_scrape_run_task (one ScrapeHistory entry for the whole run)
+#
+# Every stage catches its own errors and passes them on, so one failing
+# domain or page never prevents the run from being recorded.
+
+
+def start_scrape_pipeline(domain_ids, user_id=None, days=None):
+    """
+    Scrapes the given domains in parallel and records one ScrapeHistory
+    entry for the whole run.
+
+    Returns:
+        AsyncResult: The result of the search stage, or None if there are no
+        searchable job titles (the skipped run is still recorded).
+    """
+    query = build_scrape_query()
+    if query is None:
+        ScrapeHistory.objects.create(
+            user_id=user_id,
+            status="success",
+            details="No searchable job titles found. Skipping scrape.",
+        )
+        return None
+
+    run = {"started_at": time.time(), "user_id": user_id}
+    searches = [
+        search_domain_task.s(domain_id, query, days) for domain_id in domain_ids
+    ]
+    return chord(searches)(fan_out_job_details_task.s(run))
+
+
 @shared_task
-def backfill_job_titles_task():
+def search_domain_task(domain_id, query, days=None):
     """
-    Goes through all existing job postings and applies the new title parsing logic
-    to backfill company and work type information.
+    Runs the job search of one domain for the scrape pipeline.
     """
-    total_jobs = JobPosting.objects.count()
-    updated_count = 0
+    try:
+        domain = ScrapableDomain.objects.get(id=domain_id).domain
+    except ScrapableDomain.DoesNotExist:
+        return {"jobs": [], "errors": [f"ScrapableDomain id={domain_id} not found."]}
+    try:
+        jobs = search_jobs(query, domain, days=days)
+    except Exception as e:
+        logger.error(f"Search failed for {domain}: {e}")
+        return {"jobs": [], "errors": [f"{domain}: {e}"]}
+    for job_data in jobs:
+        # Task arguments and results are JSON.
+        if job_data["posting_date"] is not None:
+            job_data["posting_date"] = job_data["posting_date"].isoformat()
+    return {"jobs": jobs, "errors": []}
 
-    for job in JobPosting.objects.all():
-        parsed_data = parse_job_title(job.title)
 
-        cleaned_title = parsed_data["cleaned_title"]
-        extracted_company = parsed_data["company"]
-        extracted_work_types = parsed_data["work_types"]
+@shared_task
+def fan_out_job_details_task(search_results, run):
+    """
+    Splits the new jobs found by the search stage into chunks and fetches
+    their pages in parallel.
+    """
+    jobs_by_link = {}
+    errors = []
+    for result in search_results:
+        errors.extend(result["errors"])
+        for job_data in result["jobs"]:
+            if job_data["link"]:
+                jobs_by_link.setdefault(job_data["link"], job_data)
+    run = {**run, "jobs_found": len(jobs_by_link), "errors": errors}
+
+    # Known postings and their aliases are never updated by a scrape; don't
+    # fetch their pages.
+    known = known_links(jobs_by_link)
+    new_jobs = [job for link, job in jobs_by_link.items() if link not in known]
+    chunks = [
+        new_jobs[i : i + SCRAPE_DETAIL_CHUNK_SIZE]
+        for i in range(0, len(new_jobs), SCRAPE_DETAIL_CHUNK_SIZE)
+    ]
+    if not chunks:
+        return record_scrape_run_task.delay([], run).id
+    details = [scrape_job_details_chunk_task.s(chunk) for chunk in chunks]
+    return chord(details)(record_scrape_run_task.s(run)).id
 
-        updated = False
 
-        if job.title != cleaned_title:
-            job.title = cleaned_title
-            updated = True
+@shared_task
+def scrape_job_details_chunk_task(jobs):
+    """
+    Fetches the pages of a chunk of new jobs concurrently and saves them.
+    """
+    try:
+        details = fetch_all(scrape_job_details, [job["link"] for job in jobs])
+        for job_data in jobs:
+            merge_job_details(job_data, details.get(job_data["link"]))
+            if isinstance(job_data["posting_date"], str):
+                job_data["posting_date"] = datetime.date.fromisoformat(
+                    job_data["posting_date"]
+                )
+        created = save_scraped_jobs(jobs)
+    except Exception as e:
+        logger.error(f"Failed to scrape a chunk of {len(jobs)} jobs: {e}")
+        return {"added": [], "errors": [str(e)]}
+    added = [job.pk for job in created]
+    if added:
+        score_new_jobs_task.delay(added)
+    return {"added": added, "errors": []}
+
+
+@shared_task
+def record_scrape_run_task(chunk_results, run):
+    """
+    Records the totals of a scrape pipeline run as one ScrapeHistory entry.
+    """
+    added = [pk for result in chunk_results for pk in result["added"]]
+    errors = run["errors"] + [
+        error for result in chunk_results for error in result["errors"]
+    ]
+    add_to_ann_index(JobPosting.objects.filter(pk__in=added).only("pk", "embedding"))
+
+    details = f"Found: {run['jobs_found']}, Added: {len(added)}."
+    if errors:
+        details += f" Errors: {', '.join(errors)}"
+    if not errors:
+        status = "success"
+    elif added or run["jobs_found"]:
+        status = "partial"
+    else:
+        status = "failure"
+    ScrapeHistory.objects.create(
+        user_id=run["user_id"],
+        status=status,
+        jobs_found=run["jobs_found"],
+        jobs_added=len(added),
+        duration_seconds=time.time() - run["started_at"],
+        details=details,
+    )
+    return f"Scrape run finished. {details}"
 
-        if (not job.company or job.company.startswith("http")) and extracted_company:
-            job.company = extracted_company
+
+def apply_parsed_title(job):
+    """
+    Applies the title parsing logic to a job posting in place.
+
+    Returns:
+        bool: Whether the title, company or locations changed.
+    """
+    parsed_data = parse_job_title(job.title)
+
+    cleaned_title = parsed_data["cleaned_title"]
+    extracted_company = parsed_data["company"]
+    extracted_work_types = parsed_data["work_types"]
+
+    updated = False
+
+    if job.title != cleaned_title:
+        job.title = cleaned_title
+        updated = True
+
+    if (not job.company or job.company.startswith("http")) and extracted_company:
+        job.company = extracted_company
+        updated = True
+
+    if job.locations is None:
+        job.locations = []
+
+    existing_work_types = {
+        loc.get("type") for loc in job.locations if isinstance(loc, dict)
+    }
+    for work_type in extracted_work_types:
+        if work_type not in existing_work_types:
+            job.locations.append({"type": work_type})
             updated = True
 
-        if job.locations is None:
-            job.locations = []
+    return updated
 
-        existing_work_types = {
-            loc.get("type") for loc in job.locations if isinstance(loc, dict)
-        }
-        for work_type in extracted_work_types:
-            if work_type not in existing_work_types:
-                job.locations.append({"type": work_type})
-                updated = True
 
+def job_pk_ranges(shards):
+    """
+    Splits the JobPosting primary keys into `shards` contiguous ranges.
+
+    Returns:
+        list: (start, end) pairs; `start` is inclusive and `end` exclusive,
+        and None means unbounded.
+    """
+    total = JobPosting.objects.count()
+    pks = JobPosting.objects.order_by("pk").values_list("pk", flat=True)
+    bounds = [pks[total * i // shards] for i in range(1, shards) if total]
+    bounds = sorted(set(bounds))
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+@shared_task
+def backfill_job_titles_task(
+    start_pk=None, end_pk=None, shards=1, chunk_size=None, restart=False
+):
+    """
+    Goes through all existing job postings and applies the new title parsing logic
+    to backfill company and work type information.
+
+    Postings are read in primary key order, `chunk_size` at a time with only
+    the columns the parser needs, and written back with one bulk_update per
+    chunk. The last primary key of each chunk is checkpointed in the cache,
+    so a task restarted after a worker crash resumes where it stopped
+    (unless `restart` is set).
+
+    Args:
+        start_pk (str, optional): First primary key to process (inclusive).
+        end_pk (str, optional): Primary key to stop at (exclusive).
+        shards (int): When above 1, split the table into this many primary
+            key ranges and process each in its own task.
+        chunk_size (int, optional): Postings per chunk. Defaults to
+            BACKFILL_CHUNK_SIZE.
+        restart (bool): Ignore any checkpoint and start from `start_pk`.
+    """
+    if shards > 1:
+        ranges = job_pk_ranges(shards)
+        group(
+            backfill_job_titles_task.s(start, end, 1, chunk_size, restart)
+            for start, end in ranges
+        ).delay()
+        return f"Backfill started in {len(ranges)} shards."
+
+    chunk_size = chunk_size or BACKFILL_CHUNK_SIZE
+    checkpoint_key = BACKFILL_CHECKPOINT_KEY.format(start_pk, end_pk)
+    last_pk = None if restart else cache.get(checkpoint_key)
+    if last_pk is not None:
+        logger.info(f"Resuming job title backfill after {last_pk}.")
+
+    queryset = JobPosting.objects.order_by("pk").only(
+        "pk", "title", "company", "locations"
+    )
+    if start_pk is not None:
+        queryset = queryset.filter(pk__gte=start_pk)
+    if end_pk is not None:
+        queryset = queryset.filter(pk__lt=end_pk)
+
+    processed_count = 0
+    updated_count = 0
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        jobs = list(chunk[:chunk_size])
+        if not jobs:
+            break
+
+        updated = [job for job in jobs if apply_parsed_title(job)]
         if updated:
-            job.save()
-            updated_count += 1
+            for job in updated:
+                # bulk_update() bypasses JobPosting.save().
+                job.work_arrangements = work_arrangement_mask(job.locations)
+            JobPosting.objects.bulk_update(
+                updated, ["title", "company", "locations", "work_arrangements"]
+            )
+
+        processed_count += len(jobs)
+        updated_count += len(updated)
+        last_pk = jobs[-1].pk
+        cache.set(checkpoint_key, last_pk, None)
+
+    cache.delete(checkpoint_key)
+    if updated_count:
+        bump_corpus_version()
 
     return (
-        f"Backfill complete. Processed {total_jobs} jobs. Updated {updated_count} jobs."
+        f"Backfill complete. Processed {processed_count} jobs. "
+        f"Updated {updated_count} jobs."
     )
 
 
@@ -137,25 +392,34 @@ def rescrape_job_details_task(job_posting_pk):
         return f"Job posting with pk={job_posting_pk} not found."
 
     try:
-        description = scrape_job_details(job.link)
-        job.description = description
+        fetch = scrape_job_details_if_changed(job.link, job.http_validators)
+        if fetch is None:
+            return f"Could not fetch job: {job.link}"
+
+        details, validators, changed = fetch
+        job.http_validators = validators
         job.details_updated_at = timezone.now()
+        if not changed:
+            job.save(update_fields=["http_validators", "details_updated_at"])
+            return f"Job unchanged since last scrape: {job.link}"
+
+        job.description = details["description"] or job.description
         job.save()
         return f"Successfully rescraped job: {job.link}"
     except Exception as e:
         return f"An unexpected error occurred for job {job.link}: {e}"
 
 
-def placeholder_match_resume(resume_text, job_description):
-    """A placeholder function to simulate resume matching."""
-    return {"scores": [0.5]}
-
-
 @shared_task
 def analyze_resume_against_jobs(user_id):
     """
-    Analyzes a user's resume against all job postings and updates the
-    confidence scores.
+    Scores a user's latest resume against every job posting and stores the
+    results as the user's match scores.
+
+    The resume text is extracted and embedded once per file (see
+    process_resume); the scores come from a single product with the cached
+    embedding matrix. This is the only full scoring pass: postings added
+    later are scored incrementally by score_new_jobs_task.
     """
     User = get_user_model()
     try:
@@ -169,26 +433,29 @@ def analyze_resume_against_jobs(user_id):
         return
 
     try:
-        with open(resume.file.path, "r") as f:
-            resume_text = f.read()
+        resume = process_resume(resume)
     except FileNotFoundError:
         logger.error(
-            f"Resume file not found for user {user_id} at path {resume.file.path}"
+            f"Resume file not found for user {user_id} at path {resume.file.name}"
         )
         return
+    except ValueError as e:
+        logger.error(f"Could not read the resume of user {user_id}: {e}")
+        return
 
-    job_postings = JobPosting.objects.all()
-    updated_postings = []
-    for job in job_postings:
-        score = placeholder_match_resume(resume_text, job.description)["scores"][0]
-        job.confidence_score = score
-        updated_postings.append(job)
-
-    if updated_postings:
-        JobPosting.objects.bulk_update(updated_postings, ["confidence_score"])
-        logger.info(
-            f"Updated confidence scores for {len(updated_postings)} jobs against resume of user {user_id}."
-        )
+    scored = score_resume(user_id, resume.embedding)
+    logger.info(
+        f"Updated confidence scores for {scored} jobs against resume of user {user_id}."
+    )
+
+
+@shared_task
+def score_new_jobs_task(job_pks):
+    """
+    Scores newly scraped job postings against every active user's resume.
+    """
+    scored = score_new_jobs(job_pks)
+    return f"Scored {len(job_pks)} new jobs. Wrote {scored} scores."
 
 
 @shared_task
@@ -201,6 +468,6 @@ def trigger_daily_scrape():
 
     # Check if the current time is within a minute of the scheduled time
     if now.hour == schedule.time.hour and now.minute == schedule.time.minute:
-        domains = ScrapableDomain.objects.all()
-        for domain in domains:
-            scrape_and_save_jobs_task.delay(domain.id)
+        domain_ids = list(ScrapableDomain.objects.values_list("id", flat=True))
+        if domain_ids:
+            start_scrape_pipeline(domain_ids)
@@ -1,21 +1,64 @@
+import csv
+import datetime
+import gzip
+import io
+import json
 import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import skipUnless
 from unittest.mock import MagicMock, patch
 
+import numpy as np
+import requests
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from app.core.scraping_logic import ScraperException, scrape_jobs
+from app.core import listing_cache, ml_utils
+from app.core.checks import check_ann_index_path, check_shared_cache
+from app.core.duplicates import known_links
+from app.core.exclusions import EXCLUSIONS_KEY, exclude_hidden
+from app.core.fields import pack_vector, unpack_vector
+from app.core.scraping_logic import ScraperException, save_scraped_jobs, scrape_jobs
+from app.core.similarity import (
+    EMBEDDINGS_VERSION_KEY,
+    embedding_matrix,
+    find_similar_jobs,
+)
+from app.core.tasks import (
+    BACKFILL_CHECKPOINT_KEY,
+    analyze_resume_against_jobs,
+    backfill_job_titles_task,
+    job_pk_ranges,
+    rescrape_job_details_task,
+    score_new_jobs_task,
+    start_scrape_pipeline,
+)
+from shared.ann_index import IVFIndex
+from shared.http_client import ConditionalResponse
 
 from .models import (
     HiddenCompany,
+    JobMatchScore,
     JobPosting,
+    JobPostingAlias,
+    JobPostingBand,
+    Resume,
     ScrapableDomain,
+    ScrapeHistory,
     SearchableJobTitle,
     UserJobInteraction,
 )
+from .serializers import JobPostingSerializer
 
 User = get_user_model()
 
@@ -57,7 +100,7 @@ class HideJobPostingViewTest(APITestCase):
         url = reverse("job_postings")
         response = self.client.get(url, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data["results"]), 0)
 
 
 class HideCompanyViewTest(APITestCase):
@@ -96,7 +139,126 @@ class HideCompanyViewTest(APITestCase):
         url = reverse("job_postings")
         response = self.client.get(url, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data["results"]), 0)
+
+
+class JobExclusionCacheTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.user)
+        for i in range(3):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Job {i}",
+                company=f"Company {i}",
+            )
+
+    def listed_links(self):
+        response = self.client.get(reverse("job_postings"))
+        return [job["link"] for job in response.data["results"]]
+
+    def test_hide_and_pin_invalidate_cached_exclusions(self):
+        self.assertEqual(len(self.listed_links()), 3)
+        self.assertIsNotNone(cache.get(EXCLUSIONS_KEY.format(self.user.pk)))
+
+        self.client.post(
+            reverse("hide_job_posting"),
+            {"job_posting_link": "http://example.com/job/0"},
+            format="json",
+        )
+        self.client.post(reverse("hide_company"), {"name": "Company 1"}, format="json")
+        self.assertEqual(self.listed_links(), ["http://example.com/job/2"])
+
+        JobPosting.objects.create(
+            link="http://example.com/job/3", title="Job 3", company="Company 3"
+        )
+        self.client.post(
+            reverse("pin_job_posting"),
+            {"job_posting_link": "http://example.com/job/2", "pinned": True},
+            format="json",
+        )
+        self.assertEqual(
+            self.listed_links(),
+            ["http://example.com/job/2", "http://example.com/job/3"],
+        )
+
+    def test_long_hidden_lists_use_anti_join(self):
+        UserJobInteraction.objects.create(
+            user=self.user,
+            job_posting_id="http://example.com/job/0",
+            hidden=True,
+        )
+        HiddenCompany.objects.create(user=self.user, name="Company 1")
+        with patch("app.core.exclusions.INLINE_EXCLUSION_LIMIT", 0):
+            queryset = exclude_hidden(JobPosting.objects.all(), self.user)
+            self.assertIn("EXISTS", str(queryset.query))
+            self.assertEqual(
+                [job.link for job in queryset], ["http://example.com/job/2"]
+            )
+
+
+class JobListCacheTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.job = JobPosting.objects.create(
+            link="http://example.com/job/1", title="Job 1", company="Tech Corp"
+        )
+
+    def listed_titles(self):
+        response = self.client.get(reverse("job_postings"))
+        return [job["title"] for job in response.data["results"]]
+
+    def test_responses_are_cached_until_a_version_changes(self):
+        before = listing_cache.stats()
+        self.assertEqual(self.listed_titles(), ["Job 1"])
+        # Bulk writes bypass signals, so the cached response is served...
+        JobPosting.objects.filter(pk=self.job.pk).update(title="Renamed")
+        self.assertEqual(self.listed_titles(), ["Job 1"])
+        after = listing_cache.stats()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+
+        # ...until the corpus version is bumped.
+        listing_cache.bump_corpus_version()
+        self.assertEqual(self.listed_titles(), ["Renamed"])
+
+        # Hiding a job bumps the user's version.
+        self.client.post(
+            reverse("hide_job_posting"),
+            {"job_posting_link": self.job.link},
+            format="json",
+        )
+        self.assertEqual(self.listed_titles(), [])
+
+    def test_user_version_changes_only_with_work_arrangement_preferences(self):
+        key = listing_cache.USER_VERSION_KEY.format(self.user.pk)
+        version = cache.get(key)
+        user = User.objects.get(pk=self.user.pk)
+        user.last_login = timezone.now()
+        user.save(update_fields=["last_login"])
+        user.save()
+        self.assertEqual(cache.get(key), version)
+
+        user.preferred_work_arrangement = ["remote"]
+        user.save()
+        self.assertNotEqual(cache.get(key), version)
+
+    def test_stats_require_admin(self):
+        url = reverse("job_list_cache_stats")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_superuser(
+            email="admin@example.com", password="password"
+        )
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {"hits", "misses", "hit_ratio"})
 
 
 class PinJobPostingViewTest(APITestCase):
@@ -159,8 +321,8 @@ class PinJobPostingViewTest(APITestCase):
         url = reverse("job_postings")
         response = self.client.get(url, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["link"], self.job_posting2.link)
-        self.assertEqual(response.data[1]["link"], self.job_posting1.link)
+        self.assertEqual(response.data["results"][0]["link"], self.job_posting2.link)
+        self.assertEqual(response.data["results"][1]["link"], self.job_posting1.link)
 
 
 class SearchableJobTitleViewSetTest(APITestCase):
@@ -212,20 +374,154 @@ class ScrapeViewTest(APITestCase):
         self.client.force_authenticate(user=self.admin_user)
 
     @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
-    @patch("app.core.views.scrape_and_save_jobs_task.delay")
-    def test_scrape_view_starts_celery_task(self, mock_delay):
-        mock_delay.return_value = MagicMock(id="test_task_id")
-        ScrapableDomain.objects.create(domain="example.com")
+    @patch("app.core.views.start_scrape_pipeline")
+    def test_scrape_view_starts_celery_task(self, mock_pipeline):
+        mock_pipeline.return_value = MagicMock(id="test_task_id")
+        domain = ScrapableDomain.objects.create(domain="example.com")
         url = reverse("scrape")
         response = self.client.post(url)
         self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
-        self.assertTrue(mock_delay.called)
+        self.assertEqual(response.data["task_ids"], ["test_task_id"])
+        mock_pipeline.assert_called_once_with([domain.id], user_id=self.admin_user.pk)
+
+
+class ScrapePipelineTest(TestCase):
+    def setUp(self):
+        SearchableJobTitle.objects.create(title="Engineer")
+        self.domains = [
+            ScrapableDomain.objects.create(domain="a.example.com"),
+            ScrapableDomain.objects.create(domain="b.example.com"),
+        ]
+        JobPosting.objects.create(
+            link="http://a.example.com/known", title="Known", company="A"
+        )
+
+    def search(self, query, domain, days=None):
+        if domain == "b.example.com":
+            raise ScraperException("quota exceeded")
+        return [
+            {
+                "title": f"Job {i}",
+                "link": f"http://{domain}/{i}",
+                "company": "A",
+                "description": "snippet",
+                "locations": [{"type": "remote"}],
+                "posting_date": datetime.date(2024, 1, 1),
+            }
+            for i in range(3)
+        ] + [
+            {
+                "title": "Known",
+                "link": "http://a.example.com/known",
+                "company": "A",
+                "description": "",
+                "locations": [],
+                "posting_date": None,
+            }
+        ]
+
+    @patch("app.core.tasks.SCRAPE_DETAIL_CHUNK_SIZE", 2)
+    @patch("app.core.scraping_logic.generate_embeddings")
+    @patch("app.core.tasks.scrape_job_details")
+    @patch("app.core.tasks.search_jobs")
+    def test_pipeline_records_one_aggregated_run(
+        self, mock_search, mock_details, mock_embed
+    ):
+        mock_search.side_effect = self.search
+        mock_details.return_value = {"title": "", "description": "Full text"}
+        mock_embed.side_effect = lambda texts: [[1.0, 0.0]] * len(texts)
+
+        start_scrape_pipeline([domain.id for domain in self.domains])
+
+        fetched = sorted(call.args[0] for call in mock_details.call_args_list)
+        self.assertEqual(fetched, [f"http://a.example.com/{i}" for i in range(3)])
+        job = JobPosting.objects.get(link="http://a.example.com/0")
+        self.assertEqual(job.description, "Full text")
+        self.assertEqual(job.posting_date, datetime.date(2024, 1, 1))
+        self.assertEqual(len(job.embedding), 2)
+
+        history = ScrapeHistory.objects.get()
+        self.assertEqual(history.status, "partial")
+        self.assertEqual((history.jobs_found, history.jobs_added), (4, 3))
+        self.assertIsNotNone(history.duration_seconds)
+        self.assertIn("quota exceeded", history.details)
+
+
+class NearDuplicateIngestTest(TestCase):
+    description = (
+        "We are hiring a senior backend engineer to design and build the APIs "
+        "behind our scheduling product, working with Python, Postgres and "
+        "Kubernetes in a small remote team."
+    )
+
+    def job(self, link, title="Senior Backend Engineer", description=None):
+        return {
+            "title": title,
+            "link": link,
+            "company": "Acme",
+            "description": description or self.description,
+            "locations": [],
+            "posting_date": None,
+        }
+
+    @patch("app.core.scraping_logic.generate_embeddings")
+    def test_skips_near_duplicates_before_embedding(self, mock_generate):
+        mock_generate.side_effect = lambda texts: [[1.0, 0.0] for _ in texts]
+        JobPosting.objects.create(
+            link="https://acme.com/jobs/old",
+            title="Data Analyst",
+            company="Acme",
+            description="Own our dashboards and reporting across finance.",
+        )
+        call_command("build_duplicate_index", stdout=StringIO())
+
+        created = save_scraped_jobs(
+            [
+                self.job("https://boards.greenhouse.io/acme/jobs/1"),
+                # The same posting under another URL.
+                self.job("https://acme.com/careers/1?utm_source=google"),
+                self.job(
+                    "https://acme.com/careers/2",
+                    title="Data Analyst",
+                    description="Own our dashboards and reporting across finance!",
+                ),
+            ]
+        )
+
+        self.assertEqual(
+            [job.link for job in created], ["https://boards.greenhouse.io/acme/jobs/1"]
+        )
+        self.assertEqual(len(mock_generate.call_args.args[0]), 1)
+        self.assertEqual(JobPosting.objects.count(), 2)
+        self.assertEqual(JobPostingBand.objects.count(), 2 * 16)
+        self.assertEqual(
+            dict(JobPostingAlias.objects.values_list("link", "job_posting_id")),
+            {
+                "https://acme.com/careers/1?utm_source=google": (
+                    "https://boards.greenhouse.io/acme/jobs/1"
+                ),
+                "https://acme.com/careers/2": "https://acme.com/jobs/old",
+            },
+        )
+
+        # Later scrapes find the stored posting through its bands, and treat
+        # aliases as known links.
+        self.assertEqual(
+            save_scraped_jobs([self.job("https://acme.com/careers/1?ref=x")]), []
+        )
+        self.assertEqual(
+            known_links(
+                ["https://acme.com/careers/1?ref=x", "https://acme.com/careers/3"]
+            ),
+            {"https://acme.com/careers/1?ref=x"},
+        )
 
 
 class ScraperTests(TestCase):
-    @patch("app.core.scraping_logic.requests.get")
+    @patch("app.core.scraping_logic.get_session")
     @patch("app.core.scraping_logic.build")
-    def test_scrape_jobs_success(self, mock_build, mock_get):
+    def test_scrape_jobs_success(self, mock_build, mock_get_session):
+        mock_get = mock_get_session.return_value.get
         # Setup mock for Google API
         mock_service = MagicMock()
         mock_cse = MagicMock()
@@ -305,6 +601,7 @@ class FindSimilarJobsViewTest(APITestCase):
         )
         self.client.force_authenticate(user=self.user)
         ScrapableDomain.objects.create(domain="example.com")
+        embedding_matrix.reset()
 
     @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
     @patch("app.core.scraping_logic.requests.get")
@@ -358,3 +655,694 @@ class FindSimilarJobsViewTest(APITestCase):
         self.assertIn(existing_similar_job.link, response_links)
         # It should NOT contain the dissimilar job
         self.assertNotIn(dissimilar_job.link, response_links)
+
+
+class EmbeddingMatrixTest(TestCase):
+    def setUp(self):
+        embedding_matrix.reset()
+        for i, embedding in enumerate([[1.0, 0.0], [0.8, 0.6], [0.0, 1.0]]):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Job {i}",
+                company="Tech Corp",
+                embedding=embedding,
+            )
+
+    def test_top_k_ranks_by_cosine_similarity(self):
+        matches = embedding_matrix.top_k([2.0, 0.0], k=2)
+        self.assertEqual(
+            [pk for pk, score in matches],
+            ["http://example.com/job/0", "http://example.com/job/1"],
+        )
+        self.assertAlmostEqual(matches[0][1], 1.0, places=5)
+        self.assertAlmostEqual(matches[1][1], 0.8, places=5)
+
+    def test_top_k_applies_exclusions_and_threshold(self):
+        matches = embedding_matrix.top_k(
+            [1.0, 0.0], k=5, min_score=0.7, exclude={"http://example.com/job/0"}
+        )
+        self.assertEqual([pk for pk, score in matches], ["http://example.com/job/1"])
+
+    def test_changes_are_applied_incrementally(self):
+        embedding_matrix.top_k([1.0, 0.0])
+        self.assertEqual(len(embedding_matrix), 3)
+
+        job = JobPosting.objects.get(link="http://example.com/job/2")
+        job.embedding = [1.0, 0.1]
+        job.save()
+        JobPosting.objects.get(link="http://example.com/job/0").delete()
+
+        with patch.object(embedding_matrix, "load") as mock_load:
+            matches = embedding_matrix.top_k([1.0, 0.0], k=1)
+        mock_load.assert_not_called()
+        self.assertEqual(len(embedding_matrix), 2)
+        self.assertEqual(matches[0][0], "http://example.com/job/2")
+
+    def test_saves_that_keep_the_embedding_dont_bump_the_version(self):
+        version = cache.get(EMBEDDINGS_VERSION_KEY, 0)
+        job = JobPosting.objects.get(link="http://example.com/job/1")
+        job.title = "Renamed"
+        job.save()
+        self.assertEqual(cache.get(EMBEDDINGS_VERSION_KEY, 0), version)
+
+        job.embedding = [0.6, 0.8]
+        job.save()
+        self.assertEqual(cache.get(EMBEDDINGS_VERSION_KEY, 0), version + 1)
+
+    def test_warns_when_the_cache_is_per_process(self):
+        self.assertEqual([w.id for w in check_shared_cache(None)], ["core.W001"])
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class ResumeScoringTest(APITestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        embedding_matrix.reset()
+        for i, embedding in enumerate([[1.0, 0.0], [0.0, 1.0]]):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Job {i}",
+                company="Tech Corp",
+                embedding=embedding,
+            )
+        self.users = []
+        for name in ("a", "b"):
+            user = User.objects.create_user(email=f"{name}@example.com")
+            Resume.objects.create(
+                user=user,
+                file=SimpleUploadedFile(f"{name}.txt", f"Resume {name}".encode()),
+            )
+            self.users.append(user)
+
+    def listed_scores(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse("job_postings"))
+        return {
+            job["link"]: job["confidence_score"] for job in response.data["results"]
+        }
+
+    @patch("app.core.resumes.generate_embedding")
+    def test_scores_are_stored_per_user(self, mock_embed):
+        mock_embed.side_effect = [[1.0, 0.0], [0.0, 1.0]]
+        self.assertEqual(
+            self.listed_scores(self.users[0]),
+            {"http://example.com/job/0": 0.0, "http://example.com/job/1": 0.0},
+        )
+
+        for user in self.users:
+            analyze_resume_against_jobs(user.id)
+        # Rescoring reuses the stored resume embedding.
+        analyze_resume_against_jobs(self.users[0].id)
+
+        self.assertEqual(mock_embed.call_count, 2)
+        self.assertEqual(JobMatchScore.objects.count(), 4)
+        self.assertEqual(
+            self.listed_scores(self.users[0]),
+            {"http://example.com/job/0": 1.0, "http://example.com/job/1": 0.0},
+        )
+        self.assertEqual(
+            self.listed_scores(self.users[1]),
+            {"http://example.com/job/0": 0.0, "http://example.com/job/1": 1.0},
+        )
+        self.assertFalse(JobPosting.objects.exclude(confidence_score=0).exists())
+
+    @patch("app.core.resumes.generate_embedding")
+    def test_resume_content_is_processed_once(self, mock_embed):
+        mock_embed.return_value = [1.0, 0.0]
+        analyze_resume_against_jobs(self.users[0].id)
+        Resume.objects.create(
+            user=self.users[1],
+            file=SimpleUploadedFile("copy.txt", b"Resume a"),
+        )
+        analyze_resume_against_jobs(self.users[1].id)
+
+        mock_embed.assert_called_once_with("Resume a")
+        resume = Resume.objects.filter(user=self.users[1]).latest("uploaded_at")
+        self.assertEqual(resume.text, "Resume a")
+        self.assertEqual(resume.embedding.tolist(), [1.0, 0.0])
+        self.assertEqual(
+            resume.content_hash,
+            Resume.objects.filter(user=self.users[0]).get().content_hash,
+        )
+
+    @patch("app.core.resumes.generate_embedding")
+    def test_new_jobs_are_scored_incrementally(self, mock_embed):
+        mock_embed.return_value = [1.0, 0.0]
+        analyze_resume_against_jobs(self.users[0].id)
+        new_job = JobPosting.objects.create(
+            link="http://example.com/job/new",
+            title="New Job",
+            company="Tech Corp",
+            embedding=[0.6, 0.8],
+        )
+
+        with patch("app.core.scoring.embedding_matrix.score_all") as mock_full:
+            result = score_new_jobs_task([new_job.pk])
+
+        mock_full.assert_not_called()
+        self.assertIn("Wrote 1 scores", result)
+        score = JobMatchScore.objects.get(user=self.users[0], job_posting=new_job)
+        self.assertAlmostEqual(score.score, 0.6, places=5)
+        # The other user's resume hasn't been embedded yet.
+        self.assertFalse(JobMatchScore.objects.filter(user=self.users[1]).exists())
+        self.assertAlmostEqual(
+            self.listed_scores(self.users[0])["http://example.com/job/new"],
+            0.6,
+            places=5,
+        )
+
+
+class BuildAnnIndexCommandTest(TestCase):
+    def test_builds_index_used_for_similar_jobs(self):
+        for i, embedding in enumerate([[1.0, 0.0], [0.8, 0.6], [0.0, 1.0]]):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Job {i}",
+                company="Tech Corp",
+                embedding=embedding,
+            )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "index.npz")
+            call_command("build_ann_index", path=path, nlist=2, stdout=StringIO())
+            index = IVFIndex.load(path)
+
+        self.assertEqual(len(index), 3)
+        with patch("app.core.similarity.ann_index.get_index", return_value=index):
+            matches = find_similar_jobs(
+                [1.0, 0.0], k=5, exclude={"http://example.com/job/0"}
+            )
+        self.assertEqual(matches[0][0], "http://example.com/job/1")
+
+    def test_warns_when_the_index_directory_is_not_writable(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "missing", "index.npz")
+            with override_settings(ANN_INDEX_PATH=path):
+                self.assertEqual(check_ann_index_path(None), [])
+                with patch("app.core.checks.os.access", return_value=False):
+                    warnings = check_ann_index_path(None)
+        self.assertEqual([w.id for w in warnings], ["core.W002"])
+
+    @patch("app.core.similarity.ann_index.remove_from_index")
+    def test_deleted_postings_are_removed_from_index(self, mock_remove):
+        for i in range(3):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}", title=f"Job {i}", company="Acme"
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobPosting.objects.exclude(link="http://example.com/job/2").delete()
+
+        mock_remove.assert_called_once()
+        removed = mock_remove.call_args.args[0]
+        self.assertIn("http://example.com/job/0", removed)
+        self.assertIn("http://example.com/job/1", removed)
+        self.assertNotIn("http://example.com/job/2", removed)
+
+
+class GenerateEmbeddingsCommandTest(TestCase):
+    @patch("app.core.management.commands.generate_embeddings.add_to_ann_index")
+    @patch("app.core.ml_utils.generate_embeddings")
+    def test_embeds_only_missing_rows_in_chunks(self, mock_generate, mock_ann):
+        mock_generate.side_effect = lambda texts, **kwargs: [[1.0, 0.0] for _ in texts]
+        JobPosting.objects.create(
+            link="http://example.com/job/done",
+            title="Done",
+            company="Tech Corp",
+            embedding=[0.0, 1.0],
+        )
+        for i in range(3):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Job {i}",
+                company="Tech Corp",
+                description="Python",
+            )
+
+        out = StringIO()
+        call_command("generate_embeddings", chunk_size=2, batch_size=8, stdout=out)
+
+        self.assertEqual(mock_generate.call_count, 2)
+        self.assertEqual(mock_generate.call_args_list[0].args[0][0], "Job 0 Python")
+        self.assertEqual(mock_generate.call_args.kwargs["batch_size"], 8)
+        self.assertFalse(JobPosting.objects.filter(embedding__isnull=True).exists())
+        self.assertEqual(
+            JobPosting.objects.get(
+                link="http://example.com/job/done"
+            ).embedding.tolist(),
+            [0.0, 1.0],
+        )
+        self.assertIn("docs/sec", out.getvalue())
+
+
+class BackfillJobDetailsCommandTest(TestCase):
+    @patch("app.core.management.commands.backfill_job_details.parse_job_details")
+    @patch("app.core.management.commands.backfill_job_details.conditional_get")
+    def test_updates_deletes_and_counts_errors_in_batches(self, mock_get, mock_parse):
+        for name in ("changed", "unchanged", "gone", "broken"):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{name}",
+                title=name,
+                company="Tech Corp",
+                description="Old description.",
+            )
+
+        def conditional_get(url, validators):
+            name = url.rsplit("/", 1)[-1]
+            if name == "gone":
+                raise requests.HTTPError(response=MagicMock(status_code=404))
+            if name == "broken":
+                raise requests.ConnectionError("reset")
+            if name == "unchanged":
+                return ConditionalResponse(None, {"etag": '"v1"'}, False)
+            return ConditionalResponse(
+                MagicMock(content=b"<html></html>"), {"etag": '"v2"'}, True
+            )
+
+        mock_get.side_effect = conditional_get
+        mock_parse.return_value = {"description": "New description."}
+
+        out = StringIO()
+        call_command(
+            "backfill_job_details",
+            concurrency=4,
+            per_host_rate=1000,
+            batch_size=3,
+            stdout=out,
+        )
+
+        self.assertIn("Updated: 1, Deleted: 1, Errors: 1", out.getvalue())
+        self.assertIn("ETA", out.getvalue())
+        self.assertFalse(
+            JobPosting.objects.filter(link="http://example.com/job/gone").exists()
+        )
+        changed = JobPosting.objects.get(link="http://example.com/job/changed")
+        self.assertEqual(changed.description, "New description.")
+        self.assertEqual(changed.http_validators, {"etag": '"v2"'})
+        self.assertIsNotNone(changed.details_updated_at)
+        unchanged = JobPosting.objects.get(link="http://example.com/job/unchanged")
+        self.assertEqual(unchanged.description, "Old description.")
+        self.assertEqual(unchanged.http_validators, {"etag": '"v1"'})
+        self.assertIsNotNone(unchanged.details_updated_at)
+
+        # Only the posting whose fetch failed is left for the next run.
+        mock_get.reset_mock()
+        call_command("backfill_job_details", stdout=StringIO())
+        mock_get.assert_called_once_with("http://example.com/job/broken", {})
+
+
+class EmbeddingServerTest(TestCase):
+    def test_client_round_trip_through_shared_model(self):
+        model = MagicMock()
+        model.embed.side_effect = lambda texts, batch_size=None: [
+            [float(len(text))] for text in texts
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            socket_path = os.path.join(tmp_dir, "embeddings.sock")
+            server = ml_utils.EmbeddingServer(socket_path, model=model)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            client = ml_utils.EmbeddingClient(socket_path)
+            try:
+                self.assertEqual(client.embed(["a", "abc"]), [[1.0], [3.0]])
+                self.assertEqual(client.embed(["ab"], batch_size=4), [[2.0]])
+            finally:
+                client.close()
+                server.shutdown()
+                server.server_close()
+
+        model.embed.assert_called_with(["ab"], batch_size=4)
+
+    def test_falls_back_to_local_model_when_server_is_down(self):
+        client = ml_utils.EmbeddingClient("/nonexistent/embeddings.sock")
+        with (
+            patch("app.core.ml_utils._get_client", return_value=client),
+            patch.object(
+                ml_utils.get_model(), "embed", return_value=[[0.5]]
+            ) as mock_embed,
+        ):
+            self.assertEqual(ml_utils.generate_embedding("text"), [0.5])
+        mock_embed.assert_called_once()
+
+    def test_model_is_not_loaded_at_import(self):
+        self.assertIsInstance(ml_utils.get_model(), ml_utils.EmbeddingModel)
+        self.assertFalse(ml_utils.EmbeddingModel().loaded)
+
+
+class PackedVectorFieldTest(TestCase):
+    def test_round_trips_embedding_as_float32_array(self):
+        JobPosting.objects.create(
+            link="http://example.com/job/1",
+            title="Job",
+            company="Tech Corp",
+            embedding=[0.25, -1.5, 3.0],
+        )
+        embedding = JobPosting.objects.get(link="http://example.com/job/1").embedding
+        self.assertIsInstance(embedding, np.ndarray)
+        self.assertEqual(embedding.dtype, np.float32)
+        self.assertEqual(embedding.tolist(), [0.25, -1.5, 3.0])
+
+    def test_packed_dtypes(self):
+        vector = np.array([0.5, -1.0, 0.25], dtype=np.float32)
+        self.assertEqual(len(pack_vector(vector)), 12)
+        self.assertEqual(len(pack_vector(vector, "float16")), 6)
+        self.assertEqual(len(pack_vector(vector, "int8")), 7)
+        for dtype in ("float32", "float16", "int8"):
+            decoded = unpack_vector(pack_vector(vector, dtype), dtype)
+            np.testing.assert_allclose(decoded, vector, atol=0.01)
+
+    def test_serializer_renders_list(self):
+        job = JobPosting.objects.create(
+            link="http://example.com/job/1",
+            title="Job",
+            company="Tech Corp",
+            embedding=[0.5, 1.0],
+        )
+        job.refresh_from_db()
+        self.assertEqual(JobPostingSerializer(job).data["embedding"], [0.5, 1.0])
+
+
+class JobPostingFieldsetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.job = JobPosting.objects.create(
+            link="http://example.com/job/1",
+            title="Software Engineer",
+            company="Tech Corp",
+            description="A long description.",
+            embedding=[1.0, 0.0],
+        )
+
+    def test_list_omits_heavy_fields_by_default(self):
+        response = self.client.get(reverse("job_postings"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        job = response.data["results"][0]
+        self.assertEqual(job["title"], "Software Engineer")
+        self.assertNotIn("description", job)
+        self.assertNotIn("embedding", job)
+
+    def test_list_supports_fields_and_omit(self):
+        response = self.client.get(reverse("job_postings"), {"fields": "link,title"})
+        self.assertEqual(set(response.data["results"][0]), {"link", "title"})
+
+        response = self.client.get(reverse("job_postings"), {"omit": "embedding"})
+        job = response.data["results"][0]
+        self.assertEqual(job["description"], "A long description.")
+        self.assertNotIn("embedding", job)
+
+    def test_detail_returns_full_job(self):
+        url = reverse("job_posting_detail")
+        response = self.client.get(url, {"link": self.job.link})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["description"], "A long description.")
+        self.assertEqual(response.data["embedding"], [1.0, 0.0])
+        self.assertFalse(response.data["is_pinned"])
+
+        response = self.client.get(url, {"link": "http://example.com/missing"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class JobPostingPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.user)
+        dates = [
+            datetime.date(2024, 1, 3),
+            datetime.date(2024, 1, 2),
+            datetime.date(2024, 1, 2),
+            None,
+            datetime.date(2024, 1, 1),
+            None,
+        ]
+        self.jobs = [
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Job {i}",
+                company="Tech Corp",
+                posting_date=posting_date,
+            )
+            for i, posting_date in enumerate(dates)
+        ]
+        UserJobInteraction.objects.create(
+            user=self.user, job_posting=self.jobs[4], pinned=True
+        )
+
+    def fetch_all_pages(self, page_size):
+        links, pages = [], 0
+        url = reverse("job_postings")
+        params = {"page_size": page_size}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            links.extend(job["link"] for job in response.data["results"])
+            url, params = response.data["next"], None
+            pages += 1
+        return links, pages
+
+    def test_pages_follow_keyset_order(self):
+        expected = [
+            "http://example.com/job/4",  # pinned
+            "http://example.com/job/0",
+            "http://example.com/job/2",
+            "http://example.com/job/1",
+            "http://example.com/job/5",  # undated rows last
+            "http://example.com/job/3",
+        ]
+        for page_size in (1, 2, 4, 50):
+            links, pages = self.fetch_all_pages(page_size)
+            self.assertEqual(links, expected)
+
+        links, pages = self.fetch_all_pages(50)
+        self.assertEqual(pages, 1)
+
+    def test_search_filters_results(self):
+        JobPosting.objects.filter(link="http://example.com/job/2").update(
+            description="Python and Django"
+        )
+        response = self.client.get(reverse("job_postings"), {"search": "django"})
+        self.assertEqual(
+            [job["link"] for job in response.data["results"]],
+            ["http://example.com/job/2"],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("job_postings"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(
+    connection.vendor == "postgresql",
+    "Ranked search needs Postgres; run with TEST_DATABASE=postgres.",
+)
+class RankedSearchPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.user)
+        descriptions = [
+            "Django",
+            "Django and Django",
+            "Python, Django, Postgres and Celery",
+            "Django",
+            "Django and Django",
+            "Django",
+        ]
+        for i, description in enumerate(descriptions):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Job {i}",
+                company="Tech Corp",
+                description=description,
+            )
+
+    def test_pages_through_tied_ranks_once(self):
+        first_page = self.client.get(
+            reverse("job_postings"), {"search": "django", "page_size": 50}
+        )
+        expected = [job["link"] for job in first_page.data["results"]]
+        self.assertEqual(len(expected), 6)
+
+        links = []
+        url, params = reverse("job_postings"), {"search": "django", "page_size": 1}
+        while url and len(links) <= len(expected):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            links.extend(job["link"] for job in response.data["results"])
+            url, params = response.data["next"], None
+        self.assertEqual(links, expected)
+
+
+class WorkArrangementTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.user)
+        arrangements = {
+            "remote": [{"type": "remote"}],
+            "hybrid": [{"type": "hybrid", "location_string": "Berlin"}],
+            "both": [{"type": "remote"}, {"type": "onsite"}],
+            "none": [{"location_string": "Paris"}],
+        }
+        for name, locations in arrangements.items():
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{name}",
+                title=name,
+                company="Tech Corp",
+                locations=locations,
+            )
+
+    def listed_titles(self, preferences):
+        self.user.preferred_work_arrangement = preferences
+        self.user.save()
+        response = self.client.get(reverse("job_postings"))
+        return sorted(job["title"] for job in response.data["results"])
+
+    def test_flags_follow_locations_on_save(self):
+        job = JobPosting.objects.get(link="http://example.com/job/both")
+        self.assertTrue(job.is_remote)
+        self.assertTrue(job.is_onsite)
+        self.assertFalse(job.is_hybrid)
+
+        job.locations = [{"type": "hybrid"}]
+        job.save(update_fields=["locations"])
+        job.refresh_from_db()
+        self.assertEqual((job.is_remote, job.is_hybrid), (False, True))
+
+    def test_preferences_filter_list(self):
+        self.assertEqual(self.listed_titles(["remote"]), ["both", "remote"])
+        self.assertEqual(self.listed_titles(["hybrid", "onsite"]), ["both", "hybrid"])
+        self.assertEqual(self.listed_titles(["unspecified"]), ["none"])
+        self.assertEqual(self.listed_titles([]), ["both", "hybrid", "none", "remote"])
+
+
+class AdminJobPostingExportTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.admin)
+        for i in range(3):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Job {i}",
+                company="Tech, Inc.",
+                posting_date=datetime.date(2024, 1, i + 1),
+                locations=[{"type": "remote"}],
+            )
+        self.url = reverse("admin-job-export")
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content)
+
+    def test_export_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["posting_date"], "2024-01-01")
+        self.assertEqual(rows[0]["locations"], [{"type": "remote"}])
+        self.assertNotIn("confidence_score", rows[0])
+
+    def test_export_gzipped_csv(self):
+        response = self.client.get(self.url, {"output": "csv", "gzip": "true"})
+        self.assertIn('filename="jobs.csv.gz"', response["Content-Disposition"])
+        text = gzip.decompress(self.read(response)).decode("utf-8")
+        rows = list(csv.reader(io.StringIO(text)))
+        self.assertEqual(rows[0][:3], ["link", "title", "company"])
+        self.assertEqual(rows[1][2], "Tech, Inc.")
+        self.assertEqual(len(rows), 4)
+
+    def test_export_rejects_unknown_format(self):
+        response = self.client.get(self.url, {"output": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BackfillJobTitlesTaskTest(TestCase):
+    def setUp(self):
+        for i in range(5):
+            JobPosting.objects.create(
+                link=f"http://example.com/job/{i}",
+                title=f"Engineer {i} - Remote",
+                company="Tech Corp",
+            )
+
+    def test_resumes_after_checkpoint(self):
+        cache.set(
+            BACKFILL_CHECKPOINT_KEY.format(None, None), "http://example.com/job/2", None
+        )
+        result = backfill_job_titles_task(chunk_size=2)
+        self.assertEqual(result, "Backfill complete. Processed 2 jobs. Updated 2 jobs.")
+
+        jobs = JobPosting.objects.order_by("pk")
+        self.assertEqual(
+            [job.title for job in jobs],
+            ["Engineer 0 - Remote", "Engineer 1 - Remote", "Engineer 2 - Remote"]
+            + ["Engineer 3", "Engineer 4"],
+        )
+        self.assertTrue(jobs[4].is_remote)
+        self.assertIsNone(cache.get(BACKFILL_CHECKPOINT_KEY.format(None, None)))
+
+    def test_shards_cover_every_posting(self):
+        ranges = job_pk_ranges(3)
+        self.assertEqual(ranges[0][0], None)
+        self.assertEqual(ranges[-1][1], None)
+
+        backfill_job_titles_task(shards=3, chunk_size=2)
+        self.assertFalse(JobPosting.objects.filter(title__endswith="Remote").exists())
+
+
+class RescrapeJobDetailsTaskTest(TestCase):
+    def setUp(self):
+        self.job = JobPosting.objects.create(
+            title="Engineer",
+            link="http://example.com/job",
+            company="ACME",
+            description="Old description.",
+            http_validators={"etag": '"v1"'},
+        )
+
+    @patch("app.core.tasks.scrape_job_details_if_changed")
+    def test_unchanged_page_keeps_description(self, mock_fetch):
+        mock_fetch.return_value = (None, {"etag": '"v1"'}, False)
+
+        result = rescrape_job_details_task(self.job.pk)
+
+        mock_fetch.assert_called_once_with(self.job.link, {"etag": '"v1"'})
+        self.assertIn("unchanged", result)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.description, "Old description.")
+        self.assertIsNotNone(self.job.details_updated_at)
+
+    @patch("app.core.tasks.scrape_job_details_if_changed")
+    def test_changed_page_updates_description_and_validators(self, mock_fetch):
+        mock_fetch.return_value = (
+            {"title": "Engineer", "description": "New description."},
+            {"etag": '"v2"', "content_hash": "abc"},
+            True,
+        )
+
+        rescrape_job_details_task(self.job.pk)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.description, "New description.")
+        self.assertEqual(
+            self.job.http_validators, {"etag": '"v2"', "content_hash": "abc"}
+        )
@@ -12,6 +12,8 @@ from .views import (
     GenerateResumeView,
     HideCompanyView,
     HideJobPostingView,
+    JobListCacheStatsView,
+    JobPostingDetailView,
     JobPostingView,
     MeView,
     PinJobPostingView,
@@ -42,7 +44,13 @@ urlpatterns = [
     path("api/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/login/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/admin/menu/", AdminMenuView.as_view(), name="admin_menu"),
+    path(
+        "api/admin/job-list-cache-stats/",
+        JobListCacheStatsView.as_view(),
+        name="job_list_cache_stats",
+    ),
     path("api/jobs/", JobPostingView.as_view(), name="job_postings"),
+    path("api/jobs/detail/", JobPostingDetailView.as_view(), name="job_posting_detail"),
     path("api/jobs/hide/", HideJobPostingView.as_view(), name="hide_job_posting"),
     path("api/jobs/pin/", PinJobPostingView.as_view(), name="pin_job_posting"),
     path(
@@ -1,21 +1,28 @@
 import logging
 import datetime
-import numpy as np
 from celery.result import AsyncResult
 from django.contrib.auth import get_user_model
-from django.db.models import BooleanField, OuterRef, Q, Subquery, Value
-from django.db.models.functions import Coalesce
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+from django.http import StreamingHttpResponse
 from firebase_admin import firestore
-from numpy.linalg import norm
 from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from shared.export import EXPORT_CHUNK_SIZE, export_stream
+
+from . import listing_cache
 from .models import (
     CoverLetter,
     HiddenCompany,
+    JobMatchScore,
     JobPosting,
     Resume,
     ScrapableDomain,
@@ -23,7 +30,10 @@ from .models import (
     ScrapeSchedule,
     SearchableJobTitle,
     UserJobInteraction,
+    work_arrangement_masks,
 )
+from .exclusions import INLINE_EXCLUSION_LIMIT, exclude_hidden, get_exclusions
+from .pagination import JobPostingKeysetPagination
 from .permissions import IsAdmin
 from .serializers import (
     AdminJobPostingSerializer,
@@ -38,10 +48,12 @@ from .serializers import (
     UserJobInteractionSerializer,
     UserSerializer,
 )
+from .similarity import find_similar_jobs
 from .tasks import (
     analyze_resume_against_jobs,
     rescrape_job_details_task,
     scrape_and_save_jobs_task,
+    start_scrape_pipeline,
 )
 
 logger = logging.getLogger(__name__)
@@ -93,32 +105,125 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
-class JobPostingView(generics.ListAPIView):
+def annotate_is_pinned(queryset, user):
+    """
+    Annotates job postings with whether `user` pinned them.
+    """
+    pinned_status = UserJobInteraction.objects.filter(
+        user=user, job_posting=OuterRef("pk")
+    ).values("pinned")
+    return queryset.annotate(
+        is_pinned=Coalesce(
+            Subquery(pinned_status, output_field=BooleanField()), Value(False)
+        )
+    )
+
+
+def annotate_match_score(queryset, user):
+    """
+    Annotates job postings with how well they match `user`'s resume.
+    """
+    score = JobMatchScore.objects.filter(user=user, job_posting=OuterRef("pk")).values(
+        "score"
+    )
+    return queryset.annotate(
+        match_score=Coalesce(Subquery(score, output_field=FloatField()), Value(0.0))
+    )
+
+
+class SparseFieldsetViewMixin:
+    """
+    Supports `?fields=a,b` and `?omit=a,b` on views whose serializer uses
+    SparseFieldsetMixin, and defers the model columns nobody asked for.
+
+    `default_omit` applies when neither parameter is given; pass an empty
+    `?omit=` to get every field.
+    """
+
+    default_omit = ()
+    # Model fields to load even when they aren't rendered.
+    always_load = ()
+
+    def _query_list(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        return [field.strip() for field in value.split(",") if field.strip()]
+
+    def get_fieldset(self):
+        fields = self._query_list("fields")
+        omit = self._query_list("omit")
+        if fields is None and omit is None:
+            omit = list(self.default_omit)
+        return fields, omit
+
+    def get_serializer(self, *args, **kwargs):
+        fields, omit = self.get_fieldset()
+        kwargs.setdefault("fields", fields)
+        kwargs.setdefault("omit", omit)
+        return super().get_serializer(*args, **kwargs)
+
+    def defer_unused_fields(self, queryset):
+        rendered = {field.source for field in self.get_serializer().fields.values()}
+        unused = {
+            field.name
+            for field in queryset.model._meta.concrete_fields
+            if not field.primary_key
+        }
+        unused -= rendered | set(self.always_load)
+        return queryset.defer(*unused) if unused else queryset
+
+
+class JobPostingView(SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = JobPostingSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = JobPostingKeysetPagination
+    # Large columns are left out of listings; fetch them from the detail view.
+    default_omit = ("description", "embedding")
+    # Pagination keys.
+    always_load = ("posting_date",)
+    # Set when results are ordered by search relevance.
+    pagination_rank_field = None
+
+    def list(self, request, *args, **kwargs):
+        key = listing_cache.response_key(request)
+        data = listing_cache.get_response(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        listing_cache.set_response(key, response.data)
+        return response
+
+    def get_exclusions(self):
+        if not hasattr(self, "_exclusions"):
+            self._exclusions = get_exclusions(self.request.user)
+        return self._exclusions
+
+    def get_pagination_segments(self, queryset):
+        """
+        Pinned jobs are listed first. Splitting them out (rather than sorting
+        on the is_pinned annotation) keeps each segment index-ordered.
+        """
+        pinned_links = self.get_exclusions()["pinned"]
+        if not pinned_links:
+            return [("pinned", queryset.none()), ("unpinned", queryset)]
+        if len(pinned_links) > INLINE_EXCLUSION_LIMIT:
+            pinned_links = UserJobInteraction.objects.filter(
+                user=self.request.user, pinned=True
+            ).values("job_posting_id")
+        return [
+            ("pinned", queryset.filter(link__in=pinned_links)),
+            ("unpinned", queryset.exclude(link__in=pinned_links)),
+        ]
 
     def get_queryset(self):
         user = self.request.user
 
-        # Annotate with pinned status
-        pinned_status = UserJobInteraction.objects.filter(
-            user=user, job_posting=OuterRef("pk")
-        ).values("pinned")
-        queryset = JobPosting.objects.annotate(
-            is_pinned=Coalesce(
-                Subquery(pinned_status, output_field=BooleanField()), Value(False)
-            )
-        ).order_by("-is_pinned")
-
-        hidden_job_postings = UserJobInteraction.objects.filter(
-            user=user, hidden=True
-        ).values_list("job_posting_id", flat=True)
-        hidden_companies = HiddenCompany.objects.filter(user=user).values_list(
-            "name", flat=True
-        )
-        queryset = queryset.exclude(link__in=hidden_job_postings).exclude(
-            company__in=hidden_companies
-        )
+        # Annotate with pinned status and the user's match score
+        queryset = annotate_is_pinned(JobPosting.objects.all(), user)
+        queryset = annotate_match_score(queryset, user)
+        queryset = self.defer_unused_fields(queryset)
+        queryset = exclude_hidden(queryset, user, self.get_exclusions())
         title = self.request.query_params.get("title")
         if title is not None:
             queryset = queryset.filter(title__icontains=title)
@@ -126,38 +231,56 @@ class JobPostingView(generics.ListAPIView):
         if company is not None:
             queryset = queryset.filter(company__icontains=company)
         search = self.request.query_params.get("search")
-        if search is not None:
-            queryset = queryset.filter(description__icontains=search)
+        if search:
+            queryset = self.filter_search(queryset, search)
 
         preferences = user.preferred_work_arrangement
         if preferences:
-            q_objects = Q()
-            # Handle specific preferences
-            if "remote" in preferences:
-                q_objects |= Q(locations__contains=[{"type": "remote"}])
-            if "hybrid" in preferences:
-                q_objects |= Q(locations__contains=[{"type": "hybrid"}])
-            if "onsite" in preferences:
-                q_objects |= Q(locations__contains=[{"type": "onsite"}])
-
-            # Handle 'unspecified'
-            if "unspecified" in preferences:
-                # This logic finds jobs that are not explicitly remote, hybrid, or onsite
-                q_objects |= (
-                    ~Q(locations__contains=[{"type": "remote"}])
-                    & ~Q(locations__contains=[{"type": "hybrid"}])
-                    & ~Q(locations__contains=[{"type": "onsite"}])
-                )
-
-            if q_objects:
-                queryset = queryset.filter(q_objects)
-
-        # The confidence score is now calculated asynchronously by a Celery task
-        # triggered on resume upload. This view no longer needs to perform
-        # this calculation.
+            # work_arrangements is a bitmask derived from `locations`; match
+            # the mask values that have any preferred bit set (or none, for
+            # "unspecified").
+            queryset = queryset.filter(
+                work_arrangements__in=work_arrangement_masks(preferences)
+            )
 
         return queryset
 
+    def filter_search(self, queryset, search):
+        """
+        Full-text search over title, company and description, ranked by
+        relevance, on Postgres; a plain description substring match elsewhere.
+        """
+        if connections[queryset.db].vendor != "postgresql":
+            return queryset.filter(description__icontains=search)
+
+        query = SearchQuery(search, search_type="websearch", config="english")
+        self.pagination_rank_field = "search_rank"
+        # ts_rank returns a float4; cast it to the float8 that cursors hold
+        # so resuming after a rank compares equal values.
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+
+class JobPostingDetailView(SparseFieldsetViewMixin, generics.RetrieveAPIView):
+    """
+    Returns one job posting, including its description, by `?link=`.
+    """
+
+    serializer_class = JobPostingSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = annotate_is_pinned(JobPosting.objects.all(), user)
+        return self.defer_unused_fields(annotate_match_score(queryset, user))
+
+    def get_object(self):
+        link = self.request.query_params.get("link")
+        if not link:
+            raise ValidationError({"error": "Link not provided"})
+        return get_object_or_404(self.get_queryset(), pk=link)
+
 
 class ResumeView(generics.ListCreateAPIView):
     serializer_class = ResumeSerializer
@@ -179,7 +302,11 @@ class ResumeDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Resume.objects.filter(user=self.request.user)
 
     def perform_update(self, serializer):
-        serializer.save()
+        if "file" in serializer.validated_data:
+            # A new file needs to be processed again.
+            serializer.save(content_hash="", text="", embedding=None)
+        else:
+            serializer.save()
         analyze_resume_against_jobs.delay(self.request.user.id)
 
 
@@ -257,11 +384,10 @@ class ScrapeView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        task_ids = []
-        for domain in domains:
-            task = scrape_and_save_jobs_task.delay(domain.id)
-            task_ids.append(task.id)
-
+        result = start_scrape_pipeline(
+            list(domains.values_list("id", flat=True)), user_id=request.user.pk
+        )
+        task_ids = [result.id] if result is not None else []
         return Response(
             {"detail": "Scraping tasks initiated.", "task_ids": task_ids},
             status=status.HTTP_202_ACCEPTED,
@@ -288,6 +414,17 @@ class TaskStatusView(APIView):
         return Response(result, status=status.HTTP_200_OK)
 
 
+class JobListCacheStatsView(APIView):
+    """
+    Hit/miss statistics of the job list response cache.
+    """
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        return Response(listing_cache.stats())
+
+
 class UserCountView(APIView):
     permission_classes = [AllowAny]
 
@@ -336,6 +473,19 @@ class ScrapeScheduleView(generics.RetrieveUpdateAPIView):
         return ScrapeSchedule.load()
 
 
+# JobPosting columns included in admin exports.
+JOB_EXPORT_FIELDS = [
+    "link",
+    "title",
+    "company",
+    "description",
+    "posting_date",
+    "locations",
+    "days_in_office",
+    "details_updated_at",
+]
+
+
 class AdminJobPostingViewSet(viewsets.ModelViewSet):
     """
     API endpoint for admins to view and manage job postings.
@@ -351,6 +501,30 @@ class AdminJobPostingViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         return queryset
 
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Streams every job posting as NDJSON (default) or CSV with
+        `?output=csv`, gzipped with `?gzip=true`. Rows are read through a
+        server-side cursor, so memory use doesn't grow with the table.
+        """
+        output = request.query_params.get("output", "ndjson")
+        compress = request.query_params.get("gzip", "").lower() in ("1", "true")
+        rows = (
+            JobPosting.objects.order_by("pk")
+            .values(*JOB_EXPORT_FIELDS)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        try:
+            stream, content_type, filename = export_stream(
+                rows, JOB_EXPORT_FIELDS, output, compress, basename="jobs"
+            )
+        except ValueError as e:
+            raise ValidationError({"output": str(e)})
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=True, methods=["put"])
     def rescrape(self, request, pk=None):
         """
@@ -396,31 +570,19 @@ class FindSimilarJobsView(APIView):
             )
 
         # --- Part 1: Find and return similar jobs immediately ---
-        if not target_job.embedding:
+        if target_job.embedding is None or len(target_job.embedding) == 0:
             return Response(
                 {"error": "Target job has no embedding."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        all_jobs = JobPosting.objects.exclude(pk=target_job.pk).exclude(
-            embedding__isnull=True
+        matches = find_similar_jobs(
+            target_job.embedding, k=5, min_score=0.7, exclude={target_job.pk}
         )
-        target_embedding = np.array(target_job.embedding)
-        similar_jobs = []
-        for job in all_jobs:
-            if job.embedding and isinstance(job.embedding, (list, tuple)):
-                job_embedding = np.array(job.embedding)
-                target_norm = norm(target_embedding)
-                job_norm = norm(job_embedding)
-
-                if target_norm > 0 and job_norm > 0:
-                    cosine_similarity = np.dot(target_embedding, job_embedding) / (
-                        target_norm * job_norm
-                    )
-                    similar_jobs.append((job, cosine_similarity))
-
-        similar_jobs.sort(key=lambda x: x[1], reverse=True)
-        top_jobs = [job for job, score in similar_jobs if score > 0.7][:5]
+        jobs_by_pk = annotate_match_score(
+            JobPosting.objects.all(), request.user
+        ).in_bulk([pk for pk, score in matches])
+        top_jobs = [jobs_by_pk[pk] for pk, score in matches if pk in jobs_by_pk]
         serializer = JobPostingSerializer(top_jobs, many=True)
 
         # --- Part 2: Kick off background scraping ---
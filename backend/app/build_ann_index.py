@@ -0,0 +1,40 @@
+import logging
+
+import numpy as np
+
+from backend.app.dynamo_repo import DynamoRepo
+from backend.app.similarity import SIMILARITY_ANN_INDEX_PATH
+from shared import ann_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def build_ann_index(path: str = SIMILARITY_ANN_INDEX_PATH):
+    """
+    Rebuilds the similarity Lambda's ANN index over the embeddings of the
+    jobs in DynamoDB, keyed by job id.
+    """
+    if not path:
+        logger.error("SIMILARITY_ANN_INDEX_PATH is not set.")
+        return
+    since = ann_index.delta_position(path)
+    repo = DynamoRepo(table_name="NokariData")
+    ids, vectors = [], []
+    for job in repo.scan_jobs():
+        embedding = job.get("embedding")
+        if not embedding or (vectors and len(embedding) != len(vectors[0])):
+            continue
+        ids.append(job["PK"].split("#", 1)[1])
+        vectors.append(embedding)
+    if not ids:
+        logger.error("No jobs have embeddings yet.")
+        return
+
+    index = ann_index.IVFIndex.build(ids, np.asarray(vectors, dtype=np.float32))
+    ann_index.replace_index(index, path, since=since)
+    logger.info(f"Indexed {len(index)} embeddings in {index.nlist} lists at {path}.")
+
+
+if __name__ == "__main__":
+    build_ann_index()
@@ -1,8 +1,41 @@
-from typing import Any, Dict, List, Optional
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import boto3
 from botocore.exceptions import ClientError
 
+from backend.app.ml import STOPWORDS, tokenize
+
+# DynamoDB's limit on keys per BatchGetItem request.
+BATCH_GET_LIMIT = 100
+# Longer "words" (URLs, base64 blobs) are left out of the token index.
+MAX_TOKEN_LENGTH = 64
+# Words found in more jobs than this are too common to narrow a similarity
+# search, so they get no further postings.
+SIMILARITY_MAX_TERM_FREQUENCY = int(
+    os.environ.get("SIMILARITY_MAX_TERM_FREQUENCY", "1000")
+)
+# Tokens indexed per TransactWriteItems request: a posting and a `df`
+# increment each, within DynamoDB's limit of 100 actions.
+INDEX_TRANSACTION_TOKENS = 50
+
+
+def description_tokens(description: str) -> List[str]:
+    """
+    Returns the words of a job description stored with the job, which
+    similarity scores compare.
+    """
+    return sorted(
+        token for token in tokenize(description or "") if len(token) <= MAX_TOKEN_LENGTH
+    )
+
+
+def is_index_term(token: str) -> bool:
+    """
+    Whether a description word gets postings in the token index.
+    """
+    return token not in STOPWORDS and any(char.isalnum() for char in token)
+
 
 class DynamoRepo:
     """
@@ -26,6 +59,11 @@ class DynamoRepo:
     - Domain:
         - PK: DOMAIN#<domain_name>
         - SK: METADATA
+    - Token index (inverted index of job description words, other than
+      stopwords and words in more than SIMILARITY_MAX_TERM_FREQUENCY jobs):
+        - PK: TOKEN#<token>
+        - SK: JOB#<job_id> (one item per job containing the token)
+        - SK: STATS (`df`: the number of jobs containing the token)
 
     GSIs (Global Secondary Indexes):
     - GSI1 (for querying users by email):
@@ -105,6 +143,11 @@ class DynamoRepo:
             raise
 
     def put_job_posting(self, job_id: str, job_data: Dict[str, Any]):
+        """
+        Stores a new job and adds it to the token index. The job's `tokens`
+        are written once its postings are, so a job whose indexing failed is
+        stored again on retry; indexed jobs are left untouched.
+        """
         try:
             self.table.put_item(
                 Item={
@@ -112,15 +155,154 @@ class DynamoRepo:
                     "SK": "DETAILS",
                     **job_data,
                 },
-                ConditionExpression="attribute_not_exists(PK)",
+                ConditionExpression="attribute_not_exists(PK) OR attribute_not_exists(#tokens)",
+                ExpressionAttributeNames={"#tokens": "tokens"},
             )
-            return True  # Indicates success
         except ClientError as e:
             if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
                 # This is expected if the job already exists, so we can ignore it.
                 return False
             print(e.response["Error"]["Message"])
             raise
+        self.index_job_tokens(
+            job_id, description_tokens(job_data.get("description", ""))
+        )
+        return True  # Indicates success
+
+    def index_job_tokens(self, job_id: str, tokens: Iterable[str]):
+        """
+        Adds a job's postings to the token index, then stores its `tokens`,
+        which marks it as indexed.
+
+        Stopwords and words already past SIMILARITY_MAX_TERM_FREQUENCY get no
+        postings. Each posting is written in one transaction with its `df`
+        increment, and only if it is new, so retrying after a failure
+        doesn't count a job twice.
+        """
+        tokens = sorted(set(tokens))
+        terms = [token for token in tokens if is_index_term(token)]
+        frequencies = self.get_token_frequencies(terms)
+        terms = [
+            token
+            for token in terms
+            if frequencies.get(token, 0) <= SIMILARITY_MAX_TERM_FREQUENCY
+        ]
+        for start in range(0, len(terms), INDEX_TRANSACTION_TOKENS):
+            self._write_postings(
+                job_id, terms[start : start + INDEX_TRANSACTION_TOKENS]
+            )
+        try:
+            self.table.update_item(
+                Key={"PK": f"JOB#{job_id}", "SK": "DETAILS"},
+                UpdateExpression="SET #tokens = :tokens",
+                ExpressionAttributeNames={"#tokens": "tokens"},
+                ExpressionAttributeValues={":tokens": tokens},
+            )
+        except ClientError as e:
+            print(e.response["Error"]["Message"])
+            raise
+
+    def _write_postings(self, job_id: str, tokens: List[str]):
+        while tokens:
+            actions = []
+            for token in tokens:
+                actions.append(
+                    {
+                        "Put": {
+                            "TableName": self.table_name,
+                            "Item": {"PK": f"TOKEN#{token}", "SK": f"JOB#{job_id}"},
+                            "ConditionExpression": "attribute_not_exists(SK)",
+                        }
+                    }
+                )
+                actions.append(
+                    {
+                        "Update": {
+                            "TableName": self.table_name,
+                            "Key": {"PK": f"TOKEN#{token}", "SK": "STATS"},
+                            "UpdateExpression": "ADD df :one",
+                            "ExpressionAttributeValues": {":one": 1},
+                        }
+                    }
+                )
+            try:
+                self.dynamodb.meta.client.transact_write_items(TransactItems=actions)
+                return
+            except ClientError as e:
+                reasons = e.response.get("CancellationReasons", [])
+                # Postings left by an earlier attempt cancel the transaction;
+                # retry without them.
+                written = {
+                    tokens[i // 2]
+                    for i, reason in enumerate(reasons)
+                    if reason.get("Code") == "ConditionalCheckFailed"
+                }
+                if not written:
+                    print(e.response["Error"]["Message"])
+                    raise
+                tokens = [token for token in tokens if token not in written]
+
+    def _batch_get(self, keys: List[Dict[str, str]], attributes: List[str]):
+        # Attribute names are aliased in case they are reserved words.
+        names = {f"#a{i}": name for i, name in enumerate(attributes)}
+        items = []
+        try:
+            for start in range(0, len(keys), BATCH_GET_LIMIT):
+                request = {
+                    self.table_name: {
+                        "Keys": keys[start : start + BATCH_GET_LIMIT],
+                        "ProjectionExpression": ", ".join(names),
+                        "ExpressionAttributeNames": names,
+                    }
+                }
+                while request:
+                    response = self.dynamodb.batch_get_item(RequestItems=request)
+                    items.extend(response.get("Responses", {}).get(self.table_name, []))
+                    request = response.get("UnprocessedKeys")
+        except ClientError as e:
+            print(e.response["Error"]["Message"])
+            raise
+        return items
+
+    def get_token_frequencies(self, tokens: Iterable[str]) -> Dict[str, int]:
+        """
+        Returns the number of indexed jobs containing each token. Tokens no
+        job contains are left out.
+        """
+        keys = [{"PK": f"TOKEN#{token}", "SK": "STATS"} for token in tokens]
+        items = self._batch_get(keys, ["PK", "df"])
+        return {item["PK"].split("#", 1)[1]: int(item["df"]) for item in items}
+
+    def get_jobs_for_token(self, token: str) -> List[str]:
+        """
+        Returns the ids of the indexed jobs containing a token.
+        """
+        job_ids = []
+        query_params = {
+            "KeyConditionExpression": "PK = :pk AND begins_with(SK, :sk)",
+            "ExpressionAttributeValues": {":pk": f"TOKEN#{token}", ":sk": "JOB#"},
+            "ProjectionExpression": "SK",
+        }
+        try:
+            while True:
+                response = self.table.query(**query_params)
+                job_ids.extend(
+                    item["SK"].split("#", 1)[1] for item in response.get("Items", [])
+                )
+                if "LastEvaluatedKey" not in response:
+                    return job_ids
+                query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as e:
+            print(e.response["Error"]["Message"])
+            raise
+
+    def get_job_tokens(self, job_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Returns the stored description tokens of the given jobs.
+        """
+        keys = [{"PK": f"JOB#{job_id}", "SK": "DETAILS"} for job_id in job_ids]
+        items = self._batch_get(keys, ["PK", "tokens"])
+        return {item["PK"].split("#", 1)[1]: item.get("tokens", []) for item in items}
 
     def get_job_posting(self, job_id: str):
         try:
@@ -130,17 +312,37 @@ class DynamoRepo:
             print(e.response["Error"]["Message"])
             raise
 
+    def scan_jobs(self, unindexed_only: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Yields every stored job, or only those missing from the token index,
+        reading the whole table page by page.
+        """
+        filter_expression = "begins_with(PK, :pk) AND SK = :sk"
+        scan_params = {
+            "ExpressionAttributeValues": {":pk": "JOB#", ":sk": "DETAILS"},
+        }
+        if unindexed_only:
+            filter_expression += " AND attribute_not_exists(#tokens)"
+            scan_params["ExpressionAttributeNames"] = {"#tokens": "tokens"}
+        scan_params["FilterExpression"] = filter_expression
+        try:
+            while True:
+                response = self.table.scan(**scan_params)
+                yield from response.get("Items", [])
+                if "LastEvaluatedKey" not in response:
+                    return
+                scan_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as e:
+            print(e.response["Error"]["Message"])
+            raise
+
     def search_jobs(
         self, location: Optional[str] = None, title: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         try:
             if not location and not title:
                 # A full scan is generally not recommended for production use
-                response = self.table.scan(
-                    FilterExpression="begins_with(PK, :pk)",
-                    ExpressionAttributeValues={":pk": "JOB#"},
-                )
-                return response.get("Items", [])
+                return list(self.scan_jobs())
 
             query_params = {
                 "IndexName": "GSI2",
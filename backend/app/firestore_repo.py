@@ -1,8 +1,82 @@
-from typing import Any, Dict, List, Optional
+import base64
+import binascii
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from cachetools import TTLCache
 from firebase_admin import firestore
 from firebase_admin.firestore import Client
 from fastapi import HTTPException, status
 
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batched writes (and caps batched reads) above 500 documents.
+FIRESTORE_BATCH_LIMIT = 500
+# Firestore's limit on values in an array-contains-any filter.
+FIRESTORE_ARRAY_ANY_LIMIT = 30
+# Fetch the next page of job search results in the background by default.
+FIRESTORE_PREFETCH = os.environ.get("FIRESTORE_PREFETCH", "false").lower() == "true"
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+
+class PartialWriteError(HTTPException):
+    """
+    A write spanning several batches failed after `written` documents had
+    already been committed.
+    """
+
+    def __init__(self, written: int, detail: str):
+        super().__init__(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail
+        )
+        self.written = written
+
+
+class JobPage(NamedTuple):
+    jobs: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(posting_date: Any, doc_id: str) -> str:
+    """
+    Encodes the sort key of the last document of a page (its posting_date
+    and document id) as an opaque, URL-safe cursor.
+    """
+    if isinstance(posting_date, datetime):
+        value = {"t": "datetime", "v": posting_date.isoformat()}
+    else:
+        value = {"t": "value", "v": posting_date}
+    data = json.dumps({"d": value, "id": doc_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """
+    Decodes a cursor made by `encode_cursor` into (posting_date, doc_id).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = data["d"]
+        posting_date = value["v"]
+        if value["t"] == "datetime":
+            posting_date = datetime.fromisoformat(posting_date)
+        doc_id = data["id"]
+    except (binascii.Error, KeyError, TypeError, UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(doc_id, str) or not doc_id:
+        raise ValueError("Invalid cursor: missing document id")
+    return posting_date, doc_id
+
 
 class FirestoreRepo:
     """
@@ -10,8 +84,15 @@ class FirestoreRepo:
     This class abstracts the Firestore calls and provides a clean interface for the application logic.
     """
 
-    def __init__(self, db_client: Client):
+    def __init__(self, db_client: Client, prefetch: bool = FIRESTORE_PREFETCH):
         self.db = db_client
+        self.prefetch = prefetch
+        self._cache_lock = threading.Lock()
+        # posting_date of the last document of recently served pages, so that
+        # legacy `last_doc_id` requests don't need to fetch that document.
+        self._sort_keys: TTLCache = TTLCache(maxsize=10000, ttl=600)
+        # Pages being fetched ahead of time, keyed by query and cursor.
+        self._prefetched: TTLCache = TTLCache(maxsize=256, ttl=60)
 
     def put_user(self, user_id: str, user_data: Dict[str, Any]):
         try:
@@ -62,17 +143,45 @@ class FirestoreRepo:
                 detail=f"Failed to get users: {e}",
             )
 
-    def update_user_resume(self, user_id: str, s3_link: str):
+    def update_user_resume(
+        self, user_id: str, s3_link: str, content_hash: Optional[str] = None
+    ):
+        update = {"resume_s3_link": s3_link}
+        if content_hash is not None:
+            update["resume_content_hash"] = content_hash
         try:
-            self.db.collection("users").document(user_id).update(
-                {"resume_s3_link": s3_link}
-            )
+            self.db.collection("users").document(user_id).update(update)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to update user resume: {e}",
             )
 
+    def get_resume_text(self, content_hash: str) -> Optional[str]:
+        """
+        Returns the text extracted from the resume file with this SHA-256,
+        or None if that content hasn't been processed yet.
+        """
+        try:
+            doc = self.db.collection("resume_texts").document(content_hash).get()
+            return doc.to_dict().get("text") if doc.exists else None
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to get resume text: {e}",
+            )
+
+    def put_resume_text(self, content_hash: str, text: str):
+        try:
+            self.db.collection("resume_texts").document(content_hash).set(
+                {"text": text}
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to save resume text: {e}",
+            )
+
     def put_job_posting(self, job_id: str, job_data: Dict[str, Any]):
         try:
             self.db.collection("job_postings").document(job_id).set(
@@ -108,6 +217,157 @@ class FirestoreRepo:
                 detail=f"Failed to get job posting: {e}",
             )
 
+    def _get_documents(
+        self, collection: str, doc_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        doc_ids = list(dict.fromkeys(doc_ids))
+        docs = {}
+        for start in range(0, len(doc_ids), FIRESTORE_BATCH_LIMIT):
+            refs = [
+                self.db.collection(collection).document(doc_id)
+                for doc_id in doc_ids[start : start + FIRESTORE_BATCH_LIMIT]
+            ]
+            for doc in self.db.get_all(refs):
+                if doc.exists:
+                    docs[doc.id] = {**doc.to_dict(), "id": doc.id}
+        return docs
+
+    def _put_documents(self, collection: str, docs: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Upserts documents in order, one WriteBatch per 500.
+
+        Returns:
+            The number of documents written.
+
+        Raises:
+            PartialWriteError: A batch failed; earlier batches stay committed.
+        """
+        items = list(docs.items())
+        written = 0
+        try:
+            for start in range(0, len(items), FIRESTORE_BATCH_LIMIT):
+                chunk = items[start : start + FIRESTORE_BATCH_LIMIT]
+                batch = self.db.batch()
+                for doc_id, data in chunk:
+                    batch.set(
+                        self.db.collection(collection).document(doc_id),
+                        data,
+                        merge=True,
+                    )
+                batch.commit()
+                written += len(chunk)
+        except Exception as e:
+            raise PartialWriteError(
+                written,
+                f"Failed to put {collection} after committing {written} of "
+                f"{len(items)}: {e}",
+            )
+        return written
+
+    def get_corpus_version(self) -> int:
+        """
+        Returns the job corpus version shared by every process, which job
+        list caches embed in their keys.
+        """
+        try:
+            doc = self.db.collection("metadata").document("job_corpus").get()
+            return doc.to_dict().get("version", 0) if doc.exists else 0
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to get job corpus version: {e}",
+            )
+
+    def bump_corpus_version(self):
+        """
+        Invalidates every process's cached job lists, after jobs were written.
+        """
+        try:
+            self.db.collection("metadata").document("job_corpus").set(
+                {"version": firestore.Increment(1)}, merge=True
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to bump job corpus version: {e}",
+            )
+
+    def get_job_postings(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches many job postings in batched reads.
+        Returns a mapping of job ID to job data for the postings that exist.
+        """
+        try:
+            return self._get_documents("job_postings", job_ids)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to get job postings: {e}",
+            )
+
+    def put_job_postings(self, jobs: Dict[str, Dict[str, Any]]):
+        """
+        Upserts many job postings, committing one WriteBatch per 500 documents.
+
+        Returns:
+            The number of job postings written.
+
+        Raises:
+            PartialWriteError: With the number committed before the failure.
+        """
+        try:
+            return self._put_documents("job_postings", jobs)
+        except PartialWriteError as e:
+            logger.error(e.detail)
+            raise
+
+    def get_job_aliases(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the aliases among `job_ids`: links found to be near-duplicates
+        of a stored posting, as {"link", "job_id" (of that posting)}.
+        """
+        try:
+            return self._get_documents("job_aliases", job_ids)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to get job aliases: {e}",
+            )
+
+    def put_job_aliases(self, aliases: Dict[str, Dict[str, Any]]):
+        try:
+            return self._put_documents("job_aliases", aliases)
+        except PartialWriteError as e:
+            logger.error(e.detail)
+            raise
+
+    def get_jobs_by_minhash_bands(self, buckets: List[int]) -> Dict[str, List[int]]:
+        """
+        Returns the MinHash signatures of the postings sharing at least one
+        LSH band bucket with `buckets`, keyed by job ID.
+        """
+        try:
+            buckets = list(dict.fromkeys(buckets))
+            signatures = {}
+            for start in range(0, len(buckets), FIRESTORE_ARRAY_ANY_LIMIT):
+                query = (
+                    self.db.collection("job_postings")
+                    .where(
+                        "minhash_bands",
+                        "array_contains_any",
+                        buckets[start : start + FIRESTORE_ARRAY_ANY_LIMIT],
+                    )
+                    .select(["minhash"])
+                )
+                for doc in query.stream():
+                    signatures[doc.id] = doc.to_dict().get("minhash", [])
+            return signatures
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to look up near-duplicate jobs: {e}",
+            )
+
     def get_all_jobs(self) -> List[Dict[str, Any]]:
         try:
             docs = self.db.collection("job_postings").stream()
@@ -118,6 +378,36 @@ class FirestoreRepo:
                 detail=f"Failed to get all jobs: {e}",
             )
 
+    def iter_all_jobs(
+        self, fields: Optional[List[str]] = None, page_size: int = FIRESTORE_BATCH_LIMIT
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields every job posting without holding the collection in memory.
+
+        Reads pages of `page_size` documents in document id order, each from
+        a short-lived stream, so long exports don't run into the deadline of
+        a single streaming query.
+
+        Args:
+            fields (list, optional): Only fetch these fields.
+            page_size (int): Documents per read.
+        """
+        last_doc = None
+        while True:
+            query = self.db.collection("job_postings")
+            if fields:
+                query = query.select(fields)
+            query = query.order_by("__name__").limit(page_size)
+            if last_doc is not None:
+                query = query.start_after(last_doc)
+            count = 0
+            for doc in query.stream():
+                count += 1
+                last_doc = doc
+                yield {"id": doc.id, **(doc.to_dict() or {})}
+            if count < page_size:
+                return
+
     def search_jobs(
         self,
         locations: Optional[List[str]] = None,
@@ -126,38 +416,130 @@ class FirestoreRepo:
         limit: int = 20,
         last_doc_id: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
+        return self.search_jobs_page(
+            locations=locations,
+            title=title,
+            company=company,
+            limit=limit,
+            last_doc_id=last_doc_id,
+        ).jobs
+
+    def search_jobs_page(
+        self,
+        locations: Optional[List[str]] = None,
+        title: Optional[str] = None,
+        company: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        last_doc_id: Optional[str] = None,
+        prefetch: Optional[bool] = None,
+    ) -> JobPage:
+        """
+        Returns one page of jobs, newest first, and the cursor of the next.
+
+        Args:
+            cursor (str, optional): A `next_cursor` from a previous page.
+            last_doc_id (str, optional): The id of the last job of the
+                previous page. Prefer `cursor`: resolving an id may need an
+                extra read.
+            prefetch (bool, optional): Fetch the following page in the
+                background. Defaults to the repository setting.
+        """
+        if cursor:
+            try:
+                start = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+                )
+        else:
+            start = None
+
+        filters = (tuple(locations or ()), title, company, limit)
+        with self._cache_lock:
+            future = self._prefetched.pop((filters, cursor), None) if cursor else None
+        if future is not None:
+            try:
+                page = future.result()
+            except Exception as e:
+                logger.warning(f"Prefetched job page failed, refetching: {e}")
+            else:
+                self._prefetch_next(filters, page, prefetch)
+                return page
+
         try:
-            query = self.db.collection("job_postings")
+            if start is None and last_doc_id:
+                start = self._resolve_last_doc(last_doc_id)
+            page = self._fetch_jobs_page(filters, start)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to search jobs: {e}",
+            )
+        self._prefetch_next(filters, page, prefetch)
+        return page
 
-            if locations and len(locations) > 0:
-                query = query.where(
-                    "searchable_locations", "array_contains_any", locations
-                )
+    def _resolve_last_doc(self, last_doc_id: str) -> Optional[Tuple[Any, str]]:
+        with self._cache_lock:
+            if last_doc_id in self._sort_keys:
+                return self._sort_keys[last_doc_id], last_doc_id
+        last_doc = self.db.collection("job_postings").document(last_doc_id).get()
+        if not last_doc.exists:
+            return None
+        return (last_doc.to_dict() or {}).get("posting_date"), last_doc_id
 
-            if title:
-                query = query.where("title", "==", title)
+    def _fetch_jobs_page(self, filters: Tuple, start: Optional[Tuple[Any, str]]):
+        locations, title, company, limit = filters
+        query = self.db.collection("job_postings")
 
-            if company:
-                query = query.where("company", "==", company)
+        if locations and len(locations) > 0:
+            query = query.where(
+                "searchable_locations", "array_contains_any", list(locations)
+            )
 
-            # Order by posting_date desc
-            query = query.order_by("posting_date", direction=firestore.Query.DESCENDING)
+        if title:
+            query = query.where("title", "==", title)
 
-            if last_doc_id:
-                last_doc = (
-                    self.db.collection("job_postings").document(last_doc_id).get()
-                )
-                if last_doc.exists:
-                    query = query.start_after(last_doc)
+        if company:
+            query = query.where("company", "==", company)
 
-            query = query.limit(limit)
+        # Order by posting_date desc. The document id tie-break is the order
+        # Firestore applies implicitly; naming it lets cursors carry it.
+        query = query.order_by("posting_date", direction=firestore.Query.DESCENDING)
+        query = query.order_by(
+            firestore.FieldPath.document_id(), direction=firestore.Query.DESCENDING
+        )
 
-            docs = query.stream()
-            return [{**doc.to_dict(), "id": doc.id} for doc in docs]
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to search jobs: {e}",
+        if start is not None:
+            posting_date, doc_id = start
+            query = query.start_after(
+                {"posting_date": posting_date, "__name__": doc_id}
+            )
+
+        query = query.limit(limit)
+
+        docs = query.stream()
+        jobs = [{**doc.to_dict(), "id": doc.id} for doc in docs]
+
+        next_cursor = None
+        if jobs and len(jobs) >= limit:
+            last = jobs[-1]
+            next_cursor = encode_cursor(last.get("posting_date"), last["id"])
+            with self._cache_lock:
+                self._sort_keys[last["id"]] = last.get("posting_date")
+        return JobPage(jobs, next_cursor)
+
+    def _prefetch_next(self, filters: Tuple, page: JobPage, prefetch: Optional[bool]):
+        if not (self.prefetch if prefetch is None else prefetch):
+            return
+        if page.next_cursor is None:
+            return
+        key = (filters, page.next_cursor)
+        with self._cache_lock:
+            if key in self._prefetched:
+                return
+            self._prefetched[key] = _prefetch_executor.submit(
+                self._fetch_jobs_page, filters, decode_cursor(page.next_cursor)
             )
 
     def put_similarity_result(self, task_id: str, similar_job_ids: List[str]):
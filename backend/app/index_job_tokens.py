@@ -0,0 +1,26 @@
+import logging
+
+from backend.app.dynamo_repo import DynamoRepo, description_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def index_job_tokens():
+    """
+    Adds the jobs stored before the token index existed, or whose indexing
+    failed, to the index. Safe to re-run.
+    """
+    repo = DynamoRepo(table_name="NokariData")
+    indexed = 0
+    for job in repo.scan_jobs(unindexed_only=True):
+        job_id = job["PK"].split("#", 1)[1]
+        repo.index_job_tokens(job_id, description_tokens(job.get("description", "")))
+        indexed += 1
+        if indexed % 1000 == 0:
+            logger.info(f"Indexed {indexed} jobs...")
+    logger.info(f"Token index backfill complete: {indexed} jobs indexed.")
+
+
+if __name__ == "__main__":
+    index_job_tokens()
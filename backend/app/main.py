@@ -12,25 +12,30 @@ from fastapi import (
     File,
     HTTPException,
     Request,
+    Response,
     UploadFile,
     status,
     Query,
 )
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from mangum import Mangum
 from pydantic import BaseModel
 
-from backend.app import models
+from backend.app import ml, models
 from backend.app.firestore_repo import FirestoreRepo
 from backend.app.scraper import run_scraper, rescrape_all_jobs
 from backend.app import scraping_logic
 from backend.app import utils
+from shared import export, http_client, resume_text
+from backend.app.response_cache import job_list_cache
 from backend.app.firebase_auth_repo import FirebaseAuthRepo
 from backend.app.firebase_config import db, firebase_storage
 from backend.app.security import get_current_user
 
 app = FastAPI()
 firestore_repo = FirestoreRepo(db_client=db)
+job_list_cache.version_store = firestore_repo
 firebase_auth_repo = FirebaseAuthRepo()
 
 
@@ -158,6 +163,7 @@ def create_job(
     job_id = str(uuid.uuid4())
     job_data = job_request.model_dump()
     firestore_repo.put_job_posting(job_id, job_data)
+    job_list_cache.bump_corpus_version()
     return models.JobPostResponse(job_id=job_id, **job_data)
 
 
@@ -173,6 +179,7 @@ def get_job(job_id: str):
 
 @app.get("/api/jobs/", response_model=List[models.JobPostResponse])
 def search_jobs(
+    response: Response,
     title: Optional[str] = None,
     company: Optional[str] = None,
     location: Optional[str] = None,  # kept for backward compatibility if any
@@ -180,28 +187,77 @@ def search_jobs(
     work_arrangement: Optional[str] = None,
     limit: int = 20,
     last_doc_id: Optional[str] = None,
+    cursor: Optional[str] = None,
 ):
     # Consolidate location params
     search_locations = locations or []
     if location:
         search_locations.append(location)
 
-    jobs = firestore_repo.search_jobs(
-        locations=search_locations,
-        title=title,
-        company=company,
-        limit=limit,
-        last_doc_id=last_doc_id,
+    cache_key = job_list_cache.key(
+        title,
+        company,
+        tuple(search_locations),
+        work_arrangement,
+        limit,
+        last_doc_id,
+        cursor,
     )
+    cached = job_list_cache.get(cache_key)
+    if cached is not None:
+        response_jobs, next_cursor = cached
+    else:
+        page = firestore_repo.search_jobs_page(
+            locations=search_locations,
+            title=title,
+            company=company,
+            limit=limit,
+            cursor=cursor,
+            last_doc_id=last_doc_id,
+        )
+        response_jobs = []
+        for job in page.jobs:
+            utils.enrich_job_with_flags(job)
+            response_jobs.append(
+                models.JobPostResponse(job_id=job.get("id", ""), **job)
+            )
+        next_cursor = page.next_cursor
+        job_list_cache.set(cache_key, (response_jobs, next_cursor))
 
-    response_jobs = []
-    for job in jobs:
-        utils.enrich_job_with_flags(job)
-        response_jobs.append(models.JobPostResponse(job_id=job.get("id", ""), **job))
-
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return response_jobs
 
 
+@app.get("/api/jobs/{job_id}/match/", response_model=models.JobMatchResponse)
+def get_job_match(job_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Scores the user's uploaded resume against a job, using the text
+    extracted when the resume was uploaded.
+    """
+    user_id = current_user.get("uid")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Invalid token: no uid")
+
+    job_data = firestore_repo.get_job_posting(job_id)
+    if not job_data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    digest = (firestore_repo.get_user(user_id) or {}).get("resume_content_hash")
+    text = firestore_repo.get_resume_text(digest) if digest else None
+    if text is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No resume uploaded"
+        )
+    return models.JobMatchResponse(
+        job_id=job_id,
+        confidence_score=ml.get_resume_confidence(
+            job_data.get("description", ""), text
+        ),
+    )
+
+
 @app.post("/api/jobs/{job_id}/find-similar/", status_code=status.HTTP_202_ACCEPTED)
 def find_similar_jobs(job_id: str, current_user: dict = Depends(get_current_user)):
     user_id = current_user.get("uid")  # Use 'uid' from Firebase decoded token
@@ -265,12 +321,25 @@ async def upload_resume(
             status_code=status.HTTP_400_BAD_REQUEST, detail="User ID not found in token"
         )
 
+    data = await file.read()
+    digest = resume_text.content_hash(data)
+    # Text is extracted once per distinct file content, off the event loop.
+    if firestore_repo.get_resume_text(digest) is None:
+        try:
+            text = await run_in_threadpool(
+                resume_text.extract_text, data, file.filename or ""
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        firestore_repo.put_resume_text(digest, text)
+
     try:
         bucket = firebase_storage.bucket()
         file_path = f"resumes/{user_id}/{file.filename}"
         blob = bucket.blob(file_path)
 
         # Upload the file
+        await file.seek(0)
         blob.upload_from_file(file.file, content_type=file.content_type)
 
         # Make the blob publicly accessible (optional, depending on your security needs)
@@ -278,7 +347,7 @@ async def upload_resume(
         blob.make_public()
         firebase_url = blob.public_url
 
-        firestore_repo.update_user_resume(user_id, firebase_url)
+        firestore_repo.update_user_resume(user_id, firebase_url, digest)
 
         return {"message": "Resume uploaded successfully", "firebase_url": firebase_url}
     except Exception as e:
@@ -347,6 +416,43 @@ def get_admin_jobs(
     return response_jobs
 
 
+# Job posting fields included in admin exports.
+JOB_EXPORT_FIELDS = [
+    "id",
+    "title",
+    "company",
+    "link",
+    "description",
+    "posting_date",
+    "updated_at",
+    "work_arrangement",
+    "locations",
+]
+
+
+@app.get("/api/admin/jobs/export/")
+def export_admin_jobs(
+    output: str = "ndjson",
+    gzip: bool = False,
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """
+    Stream every job posting as NDJSON or CSV, optionally gzipped.
+    """
+    rows = firestore_repo.iter_all_jobs(fields=JOB_EXPORT_FIELDS[1:])
+    try:
+        stream, media_type, filename = export.export_stream(
+            rows, JOB_EXPORT_FIELDS, output, gzip, basename="jobs"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @app.delete("/api/admin/jobs/{job_id}/", status_code=status.HTTP_200_OK)
 def delete_admin_job(
     job_id: str,
@@ -356,6 +462,7 @@ def delete_admin_job(
     Delete a job posting.
     """
     firestore_repo.delete_job_posting(job_id)
+    job_list_cache.bump_corpus_version()
     return {"message": "Job deleted successfully."}
 
 
@@ -384,6 +491,7 @@ def rescrape_admin_job(
                 }
             )
             firestore_repo.put_job_posting(job_id, job)
+            job_list_cache.bump_corpus_version()
             return {"message": "Job rescraped and updated."}
         else:
             raise HTTPException(status_code=500, detail="Failed to scrape job details")
@@ -404,6 +512,22 @@ def rescrape_all_jobs_endpoint(
     return {"message": "Rescrape all started in background."}
 
 
+@app.get("/api/admin/http-pool-stats/")
+def get_http_pool_stats(current_user: dict = Depends(get_current_admin_user)):
+    """
+    Connection pool statistics of the shared scraper HTTP client.
+    """
+    return http_client.pool_stats()
+
+
+@app.get("/api/admin/job-list-cache-stats/")
+def get_job_list_cache_stats(current_user: dict = Depends(get_current_admin_user)):
+    """
+    Hit/miss statistics of the job listing response cache.
+    """
+    return job_list_cache.stats()
+
+
 @app.get("/api/admin/job-titles/", response_model=List[models.JobTitle])
 def get_job_titles(current_user: dict = Depends(get_current_admin_user)):
     return firestore_repo.get_job_titles()
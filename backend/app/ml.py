@@ -1,5 +1,5 @@
 import string
-from typing import List
+from typing import AbstractSet, List, Set
 
 
 def extract_keywords(text: str) -> List[str]:
@@ -12,16 +12,37 @@ def extract_keywords(text: str) -> List[str]:
     return [word for word in text.lower().split() if len(word) > 4]
 
 
+# Words too common in job descriptions to tell them apart.
+STOPWORDS = frozenset(
+    """
+    a about all also an and any are as at be but by can do for from has have
+    how if in into is it its may more must not of on or our out so such that
+    the their them there these they this to up us we what when where which
+    who will with within you your
+    """.split()
+)
+
+
+def tokenize(text: str) -> Set[str]:
+    """
+    Returns the set of lowercase words of a text, as compared by
+    calculate_string_similarity.
+    """
+    return set(text.lower().split())
+
+
+def jaccard_similarity(words1: AbstractSet[str], words2: AbstractSet[str]) -> float:
+    intersection = words1 & words2
+    union = words1 | words2
+    return len(intersection) / len(union) if union else 0.0
+
+
 def calculate_string_similarity(text1: str, text2: str) -> float:
     """
     Calculates the similarity between two strings.
     This is a placeholder for a more sophisticated similarity algorithm.
     """
-    words1 = set(text1.lower().split())
-    words2 = set(text2.lower().split())
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
-    return len(intersection) / len(union) if union else 0.0
+    return jaccard_similarity(tokenize(text1), tokenize(text2))
 
 
 def get_resume_confidence(job_description: str, resume_text: str) -> float:
@@ -49,6 +49,11 @@ class JobPostResponse(BaseModel):
     is_pinned: Optional[bool] = False
 
 
+class JobMatchResponse(BaseModel):
+    job_id: str
+    confidence_score: float
+
+
 class ScrapableDomain(BaseModel):
     id: str
     domain: str
@@ -0,0 +1,127 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Protocol
+
+from cachetools import TTLCache
+
+# Cached job listing responses per process, and how long they may be served.
+JOB_LIST_CACHE_SIZE = int(os.environ.get("JOB_LIST_CACHE_SIZE", "1024"))
+JOB_LIST_CACHE_TTL = int(os.environ.get("JOB_LIST_CACHE_TTL", "300"))
+# Seconds between reads of the shared corpus version; bumps made by other
+# processes are picked up within this delay.
+JOB_LIST_VERSION_TTL = float(os.environ.get("JOB_LIST_VERSION_TTL", "5"))
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class VersionStore(Protocol):
+    def get_corpus_version(self) -> int: ...
+
+    def bump_corpus_version(self) -> None: ...
+
+
+class ResponseCache:
+    """
+    A versioned response cache with TTL expiry and LRU eviction.
+
+    Keys embed the current corpus version, so bumping it invalidates every
+    entry built on the old one at once; stale entries simply age out.
+
+    With a `version_store`, the version is shared by every process (API
+    workers, scrapers) and re-read at most every `version_ttl` seconds;
+    without one it is local to the process.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = JOB_LIST_CACHE_SIZE,
+        ttl: int = JOB_LIST_CACHE_TTL,
+        version_store: Optional[VersionStore] = None,
+        version_ttl: float = JOB_LIST_VERSION_TTL,
+    ):
+        self._lock = threading.Lock()
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._corpus_version = 0
+        self._version_checked_at: Optional[float] = None
+        self.version_store = version_store
+        self.version_ttl = version_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh_version(self, force: bool = False) -> None:
+        if self.version_store is None:
+            return
+        now = time.monotonic()
+        if (
+            not force
+            and self._version_checked_at is not None
+            and now - self._version_checked_at < self.version_ttl
+        ):
+            return
+        try:
+            version = self.version_store.get_corpus_version()
+        except Exception as e:
+            logger.warning(f"Failed to read the job corpus version: {e}")
+            return
+        with self._lock:
+            self._corpus_version = version
+            self._version_checked_at = now
+
+    def key(self, *parts: Hashable) -> tuple:
+        self._refresh_version()
+        with self._lock:
+            return (self._corpus_version,) + parts
+
+    def get(self, key: tuple) -> Any:
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+
+    def bump_corpus_version(self) -> None:
+        """
+        Invalidates every cached response, e.g. after new jobs were written.
+        """
+        if self.version_store is None:
+            with self._lock:
+                self._corpus_version += 1
+            return
+        try:
+            self.version_store.bump_corpus_version()
+        except Exception as e:
+            # The write itself succeeded; lists elsewhere stay stale until
+            # their entries expire.
+            logger.warning(f"Failed to bump the job corpus version: {e}")
+            with self._lock:
+                self._corpus_version += 1
+            return
+        self._refresh_version(force=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns hit/miss counters for monitoring.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self._entries.maxsize,
+                "corpus_version": self._corpus_version,
+            }
+
+
+job_list_cache = ResponseCache()
@@ -1,7 +1,7 @@
 import logging
 import time
 from datetime import datetime, timezone
-from backend.app.firestore_repo import FirestoreRepo
+from backend.app.firestore_repo import FIRESTORE_BATCH_LIMIT, FirestoreRepo
 from backend.app.firebase_config import db
 from backend.app import scraping_logic
 
@@ -9,6 +9,14 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def _bump_corpus_version(repo: FirestoreRepo):
+    """Invalidates the job lists cached by every API process."""
+    try:
+        repo.bump_corpus_version()
+    except Exception as e:
+        logger.warning(f"Failed to bump the job corpus version: {e}")
+
+
 def run_scraper(query: str = "Software Engineer", requested_by: str = "System"):
     repo = FirestoreRepo(db_client=db)
     domains = repo.get_scrapable_domains()
@@ -28,6 +36,9 @@ def run_scraper(query: str = "Software Engineer", requested_by: str = "System"):
         status = "failed"
         count = 0
 
+    if count:
+        _bump_corpus_version(repo)
+
     end_time = time.time()
     duration = end_time - start_time
 
@@ -46,6 +57,23 @@ def run_scraper(query: str = "Software Engineer", requested_by: str = "System"):
     return count
 
 
+def _flush_job_updates(repo: FirestoreRepo, pending_updates: dict) -> int:
+    """
+    Writes the pending job updates in batches and clears them.
+    Returns the number of jobs written.
+    """
+    if not pending_updates:
+        return 0
+    written = len(pending_updates)
+    try:
+        repo.put_job_postings(dict(pending_updates))
+    except Exception as e:
+        logger.error(f"Failed to save {written} rescraped jobs: {e}")
+        written = getattr(e, "written", 0)
+    pending_updates.clear()
+    return written
+
+
 def rescrape_all_jobs(requested_by: str = "System"):
     repo = FirestoreRepo(db_client=db)
     logger.info("Starting rescrape of all jobs")
@@ -58,6 +86,8 @@ def rescrape_all_jobs(requested_by: str = "System"):
         return 0
 
     count = 0
+    unchanged_count = 0
+    pending_updates = {}
     for job in jobs:
         link = job.get("link")
         job_id = job.get("id")
@@ -65,28 +95,46 @@ def rescrape_all_jobs(requested_by: str = "System"):
             continue
 
         try:
-            details = scraping_logic.scrape_job_details(link)
-            if details:
+            fetch = scraping_logic.scrape_job_details_if_changed(
+                link, job.get("http_validators")
+            )
+            if fetch is None:
+                logger.warning(f"Failed to scrape details for job {job_id}")
+            elif not fetch.changed:
+                # Page unchanged since the last scrape: nothing to parse or write.
+                unchanged_count += 1
+            elif fetch.details:
+                details = fetch.details
                 job.update(
                     {
                         "title": details.get("title") or job.get("title"),
                         "description": details.get("description")
                         or job.get("description"),
+                        "http_validators": fetch.validators,
                         "updated_at": datetime.utcnow(),
                     }
                 )
-                repo.put_job_posting(job_id, job)
-                count += 1
+                pending_updates[job_id] = job
                 logger.info(f"Rescraped job {job_id}")
             else:
                 logger.warning(f"Failed to scrape details for job {job_id}")
         except Exception as e:
             logger.error(f"Error rescraping job {job_id}: {e}")
 
+        if len(pending_updates) >= FIRESTORE_BATCH_LIMIT:
+            count += _flush_job_updates(repo, pending_updates)
+
+    count += _flush_job_updates(repo, pending_updates)
+    if count:
+        _bump_corpus_version(repo)
+
     end_time = time.time()
     duration = end_time - start_time
 
-    logger.info(f"Rescrape complete. Updated {count} jobs in {duration} seconds.")
+    logger.info(
+        f"Rescrape complete. Updated {count} jobs, {unchanged_count} unchanged, "
+        f"in {duration} seconds."
+    )
     return count
 
 
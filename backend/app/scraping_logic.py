@@ -4,38 +4,33 @@ import logging
 import os
 import uuid
 from datetime import datetime, timezone
+from typing import Any, Dict, NamedTuple, Optional
 from urllib.parse import urlparse
 
 import requests
 from bs4 import BeautifulSoup
 from googleapiclient.discovery import build
 
-from backend.app.firestore_repo import FirestoreRepo
+from backend.app.firestore_repo import FIRESTORE_ARRAY_ANY_LIMIT, FirestoreRepo
+from shared import concurrency, http_client, near_duplicates
+from shared.http_client import get_session
 
 logger = logging.getLogger(__name__)
 
+# Most Firestore queries a scrape makes to find stored near-duplicates. Each
+# query matches up to 30 LSH band buckets, and every new posting has
+# NEAR_DUPLICATE_BANDS of them.
+NEAR_DUPLICATE_MAX_QUERIES = int(os.environ.get("NEAR_DUPLICATE_MAX_QUERIES", "20"))
+
 
 class ScraperException(Exception):
     pass
 
 
-def get_session():
-    """Returns a requests Session with common browser headers."""
-    session = requests.Session()
-    session.headers.update(
-        {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1",
-            "Referer": "https://www.google.com/",
-        }
-    )
-    return session
+class DetailFetch(NamedTuple):
+    details: Optional[Dict[str, Any]]
+    validators: Dict[str, str]
+    changed: bool
 
 
 def scrape_job_details(url):
@@ -47,265 +42,298 @@ def scrape_job_details(url):
     try:
         response = session.get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
+        return parse_job_details(url, response.content, session)
+    except requests.RequestException as e:
+        logger.warning(f"Could not fetch URL {url}: {e}")
+        return None
 
-        details = {}
 
-        # 1. Try JSON-LD (Preferred method for structured data)
-        json_ld_scripts = soup.find_all("script", type="application/ld+json")
-        for script in json_ld_scripts:
-            try:
-                data = json.loads(script.string)
-                # Should be type JobPosting
-                if data.get("@type") == "JobPosting":
-                    details["title"] = data.get("title")
-
-                    if "hiringOrganization" in data:
-                        org = data["hiringOrganization"]
-                        if isinstance(org, dict):
-                            details["company"] = org.get("name")
-                        elif isinstance(org, str):
-                            details["company"] = org
-
-                    if "description" in data:
-                        # Keep description as is (HTML) but maybe normalize whitespace
-                        # to avoid massive spacing issues, but don't strip tags.
-                        details["description"] = data["description"].strip()
-
-                    if "datePosted" in data:
-                        try:
-                            # Handle ISO format
-                            # Example: 2025-10-14T21:34:00+0000
-                            # Python 3.11+ handles this well. Python 3.12 is used.
-                            details["posting_date"] = datetime.fromisoformat(
-                                data["datePosted"]
-                            )
-                        except ValueError:
-                            pass
-
-                    # Locations
-                    if "jobLocation" in data:
-                        locs = data["jobLocation"]
-                        if not isinstance(locs, list):
-                            locs = [locs]
-
-                        parsed_locs = []
-                        first_loc_string = None
+def scrape_job_details_if_changed(url, validators=None):
+    """
+    Scrapes a job posting only if its page changed since it was last fetched.
+
+    The cached validators of the link are sent as If-None-Match /
+    If-Modified-Since. When the server answers 304, or returns a body whose
+    hash matches the cached one, the page is not parsed.
+
+    Args:
+        url (str): The job posting URL.
+        validators (dict, optional): The validators stored with the job.
+
+    Returns:
+        DetailFetch: The parsed details (None if unchanged), the new
+        validators and whether the page changed. None if the fetch failed.
+    """
+    session = get_session()
+    try:
+        result = http_client.conditional_get(url, validators, session=session)
+        if not result.changed:
+            return DetailFetch(None, result.validators, False)
+        details = parse_job_details(url, result.response.content, session)
+        return DetailFetch(details, result.validators, True)
+    except requests.RequestException as e:
+        logger.warning(f"Could not fetch URL {url}: {e}")
+        return None
+
+
+def parse_job_details(url, content, session):
+    """
+    Parses the details of a job posting from the HTML of its page.
+    `session` is used to follow embedded iframes.
+    """
+    soup = BeautifulSoup(content, "html.parser")
+
+    details = {}
+
+    # 1. Try JSON-LD (Preferred method for structured data)
+    json_ld_scripts = soup.find_all("script", type="application/ld+json")
+    for script in json_ld_scripts:
+        try:
+            data = json.loads(script.string)
+            # Should be type JobPosting
+            if data.get("@type") == "JobPosting":
+                details["title"] = data.get("title")
+
+                if "hiringOrganization" in data:
+                    org = data["hiringOrganization"]
+                    if isinstance(org, dict):
+                        details["company"] = org.get("name")
+                    elif isinstance(org, str):
+                        details["company"] = org
+
+                if "description" in data:
+                    # Keep description as is (HTML) but maybe normalize whitespace
+                    # to avoid massive spacing issues, but don't strip tags.
+                    details["description"] = data["description"].strip()
+
+                if "datePosted" in data:
+                    try:
+                        # Handle ISO format
+                        # Example: 2025-10-14T21:34:00+0000
+                        # Python 3.11+ handles this well. Python 3.12 is used.
+                        details["posting_date"] = datetime.fromisoformat(
+                            data["datePosted"]
+                        )
+                    except ValueError:
+                        pass
+
+                # Locations
+                if "jobLocation" in data:
+                    locs = data["jobLocation"]
+                    if not isinstance(locs, list):
+                        locs = [locs]
+
+                    parsed_locs = []
+                    first_loc_string = None
+                    for loc in locs:
+                        if loc.get("@type") == "Place" and "address" in loc:
+                            addr = loc["address"]
+                            parts = []
+                            if isinstance(addr, dict):
+                                if addr.get("streetAddress"):
+                                    parts.append(
+                                        addr["streetAddress"].replace("\n", ", ")
+                                    )
+                                if addr.get("addressLocality"):
+                                    parts.append(addr["addressLocality"])
+                                if addr.get("addressRegion"):
+                                    parts.append(addr["addressRegion"])
+                                if addr.get("addressCountry"):
+                                    country = addr["addressCountry"]
+                                    # addressCountry can be string or object
+                                    if isinstance(country, dict):
+                                        parts.append(country.get("name", ""))
+                                    else:
+                                        parts.append(country)
+
+                            loc_str = ", ".join([p for p in parts if p])
+                            if loc_str:
+                                if not first_loc_string:
+                                    first_loc_string = loc_str
+                                # Infer type
+                                # Default to onsite unless we detect otherwise?
+                                parsed_locs.append(
+                                    {"type": "onsite", "location_string": loc_str}
+                                )
+
+                    if parsed_locs:
+                        details["locations"] = parsed_locs
+
+                        # Extract city, state, country from first valid location
                         for loc in locs:
                             if loc.get("@type") == "Place" and "address" in loc:
                                 addr = loc["address"]
-                                parts = []
                                 if isinstance(addr, dict):
-                                    if addr.get("streetAddress"):
-                                        parts.append(
-                                            addr["streetAddress"].replace("\n", ", ")
-                                        )
                                     if addr.get("addressLocality"):
-                                        parts.append(addr["addressLocality"])
+                                        details["city"] = addr["addressLocality"]
                                     if addr.get("addressRegion"):
-                                        parts.append(addr["addressRegion"])
+                                        details["state"] = addr["addressRegion"]
                                     if addr.get("addressCountry"):
                                         country = addr["addressCountry"]
-                                        # addressCountry can be string or object
                                         if isinstance(country, dict):
-                                            parts.append(country.get("name", ""))
+                                            details["country"] = country.get("name", "")
                                         else:
-                                            parts.append(country)
-
-                                loc_str = ", ".join([p for p in parts if p])
-                                if loc_str:
-                                    if not first_loc_string:
-                                        first_loc_string = loc_str
-                                    # Infer type
-                                    # Default to onsite unless we detect otherwise?
-                                    parsed_locs.append(
-                                        {"type": "onsite", "location_string": loc_str}
-                                    )
+                                            details["country"] = country
+                                    # Use the first one found
+                                    break
+
+                # If we found valid data, we can return or merge.
+                if details.get("title"):
+                    # Clean title
+                    if " | " in details["title"]:
+                        details["title"] = details["title"].split(" | ")[0]
+                    if " - " in details["title"]:
+                        # Often companies append " - Company Name"
+                        details["title"] = details["title"].split(" - ")[0]
+
+                    # Clean company
+                    if details.get("company") and details["company"].lower() in [
+                        "careers",
+                        "job",
+                    ]:
+                        # Try to fallback to something better if possible, or leave it blank
+                        pass
+
+                    return details
+        except json.JSONDecodeError:
+            continue
+
+    # Check for iCIMS iframe (Fallback / Legacy logic)
+    iframe = soup.find("iframe", id="icims_content_iframe") or soup.find(
+        "iframe", id="noscript_icims_content_iframe"
+    )
+    if iframe:
+        src = iframe.get("src")
+        if src:
+            from urllib.parse import urljoin
 
-                        if parsed_locs:
-                            details["locations"] = parsed_locs
-
-                            # Extract city, state, country from first valid location
-                            for loc in locs:
-                                if loc.get("@type") == "Place" and "address" in loc:
-                                    addr = loc["address"]
-                                    if isinstance(addr, dict):
-                                        if addr.get("addressLocality"):
-                                            details["city"] = addr["addressLocality"]
-                                        if addr.get("addressRegion"):
-                                            details["state"] = addr["addressRegion"]
-                                        if addr.get("addressCountry"):
-                                            country = addr["addressCountry"]
-                                            if isinstance(country, dict):
-                                                details["country"] = country.get(
-                                                    "name", ""
-                                                )
-                                            else:
-                                                details["country"] = country
-                                        # Use the first one found
-                                        break
-
-                    # If we found valid data, we can return or merge.
-                    if details.get("title"):
-                        # Clean title
-                        if " | " in details["title"]:
-                            details["title"] = details["title"].split(" | ")[0]
-                        if " - " in details["title"]:
-                            # Often companies append " - Company Name"
-                            details["title"] = details["title"].split(" - ")[0]
-
-                        # Clean company
-                        if details.get("company") and details["company"].lower() in [
-                            "careers",
-                            "job",
-                        ]:
-                            # Try to fallback to something better if possible, or leave it blank
-                            pass
-
-                        return details
-            except json.JSONDecodeError:
+            iframe_url = urljoin(url, src)
+            try:
+                logger.info(f"Following iframe to {iframe_url}")
+                iframe_response = session.get(iframe_url, timeout=10)
+                iframe_response.raise_for_status()
+                soup = BeautifulSoup(iframe_response.content, "html.parser")
+            except Exception as e:
+                logger.warning(f"Failed to follow iframe: {e}")
+
+    # Title - Try h1 first
+    h1 = soup.find("h1")
+    if h1:
+        details["title"] = h1.get_text(strip=True)
+    else:
+        details["title"] = soup.title.string if soup.title else ""
+
+    # Clean title (remove common suffixes)
+    if details.get("title"):
+        separators = [" | ", " - ", " : "]
+        for sep in separators:
+            if sep in details["title"]:
+                parts = details["title"].split(sep)
+                # Heuristic: Job title is usually the first part
+                details["title"] = parts[0]
+
+    parsed_url = urlparse(url)
+    # Check for Lever specific logic
+    if "lever.co" in parsed_url.netloc:
+        # Company from path
+        path_parts = parsed_url.path.strip("/").split("/")
+        if len(path_parts) > 0:
+            # e.g. "palantir" -> "Palantir"
+            # If there are dashes or special formatting, we might want to be careful,
+            # but capitalizing is a good start.
+            details["company"] = path_parts[0].capitalize()
+
+        # Title from h2
+        # Lever usually puts the job title in an h2 tag (often with 'posting-headline' class parent,
+        # but h2 is distinctive enough in the top section)
+        h2 = soup.find("h2")
+        if h2:
+            details["title"] = h2.get_text(strip=True)
+
+        # Locations and Type
+        # Inspecting Lever pages, we see classes like:
+        # location -> class="location" or class="sort-by-time posting-category ... location"
+        # workplace type -> class="workplaceTypes"
+        # commitment -> class="commitment"
+        # department -> class="department"
+
+        lever_locations = []
+
+        # Location
+        loc_div = soup.find("div", class_="location")
+        location_str = loc_div.get_text(strip=True) if loc_div else None
+
+        # Workplace Type (Hybrid, Remote, Onsite)
+        type_div = soup.find("div", class_="workplaceTypes")
+        workplace_type_str = type_div.get_text(strip=True) if type_div else None
+
+        if location_str or workplace_type_str:
+            # Determine type
+            loc_type = "onsite"  # Default
+            if workplace_type_str:
+                w_type_lower = workplace_type_str.lower()
+                if "hybrid" in w_type_lower:
+                    loc_type = "hybrid"
+                elif "remote" in w_type_lower:
+                    loc_type = "remote"
+            elif location_str:
+                if "remote" in location_str.lower():
+                    loc_type = "remote"
+                elif "hybrid" in location_str.lower():
+                    loc_type = "hybrid"
+
+            # Construct location object
+            # If we have both strings, we can combine or just use location_str as the string
+            final_loc_str = location_str or workplace_type_str
+
+            lever_locations.append({"type": loc_type, "location_string": final_loc_str})
+
+            details["locations"] = lever_locations
+
+    # Fallback Locations if Lever logic didn't find anything or for non-Lever sites
+    if "locations" not in details:
+        locations = []
+        # Look for "Job Locations"
+        for element in soup.find_all(
+            string=lambda text: text and "Job Locations" in text
+        ):
+            # Check parent text
+            parent = element.parent
+            if not parent:
                 continue
-
-        # Check for iCIMS iframe (Fallback / Legacy logic)
-        iframe = soup.find("iframe", id="icims_content_iframe") or soup.find(
-            "iframe", id="noscript_icims_content_iframe"
-        )
-        if iframe:
-            src = iframe.get("src")
-            if src:
-                from urllib.parse import urljoin
-
-                iframe_url = urljoin(url, src)
-                try:
-                    logger.info(f"Following iframe to {iframe_url}")
-                    iframe_response = session.get(iframe_url, timeout=10)
-                    iframe_response.raise_for_status()
-                    soup = BeautifulSoup(iframe_response.content, "html.parser")
-                except Exception as e:
-                    logger.warning(f"Failed to follow iframe: {e}")
-
-        # Title - Try h1 first
-        h1 = soup.find("h1")
-        if h1:
-            details["title"] = h1.get_text(strip=True)
-        else:
-            details["title"] = soup.title.string if soup.title else ""
-
-        # Clean title (remove common suffixes)
-        if details.get("title"):
-            separators = [" | ", " - ", " : "]
-            for sep in separators:
-                if sep in details["title"]:
-                    parts = details["title"].split(sep)
-                    # Heuristic: Job title is usually the first part
-                    details["title"] = parts[0]
-
-        parsed_url = urlparse(url)
-        # Check for Lever specific logic
-        if "lever.co" in parsed_url.netloc:
-            # Company from path
-            path_parts = parsed_url.path.strip("/").split("/")
-            if len(path_parts) > 0:
-                # e.g. "palantir" -> "Palantir"
-                # If there are dashes or special formatting, we might want to be careful,
-                # but capitalizing is a good start.
-                details["company"] = path_parts[0].capitalize()
-
-            # Title from h2
-            # Lever usually puts the job title in an h2 tag (often with 'posting-headline' class parent,
-            # but h2 is distinctive enough in the top section)
-            h2 = soup.find("h2")
-            if h2:
-                details["title"] = h2.get_text(strip=True)
-
-            # Locations and Type
-            # Inspecting Lever pages, we see classes like:
-            # location -> class="location" or class="sort-by-time posting-category ... location"
-            # workplace type -> class="workplaceTypes"
-            # commitment -> class="commitment"
-            # department -> class="department"
-
-            lever_locations = []
-
-            # Location
-            loc_div = soup.find("div", class_="location")
-            location_str = loc_div.get_text(strip=True) if loc_div else None
-
-            # Workplace Type (Hybrid, Remote, Onsite)
-            type_div = soup.find("div", class_="workplaceTypes")
-            workplace_type_str = type_div.get_text(strip=True) if type_div else None
-
-            if location_str or workplace_type_str:
-                # Determine type
-                loc_type = "onsite"  # Default
-                if workplace_type_str:
-                    w_type_lower = workplace_type_str.lower()
-                    if "hybrid" in w_type_lower:
-                        loc_type = "hybrid"
-                    elif "remote" in w_type_lower:
-                        loc_type = "remote"
-                elif location_str:
-                    if "remote" in location_str.lower():
-                        loc_type = "remote"
-                    elif "hybrid" in location_str.lower():
-                        loc_type = "hybrid"
-
-                # Construct location object
-                # If we have both strings, we can combine or just use location_str as the string
-                final_loc_str = location_str or workplace_type_str
-
-                lever_locations.append(
-                    {"type": loc_type, "location_string": final_loc_str}
-                )
-
-                details["locations"] = lever_locations
-
-        # Fallback Locations if Lever logic didn't find anything or for non-Lever sites
-        if "locations" not in details:
-            locations = []
-            # Look for "Job Locations"
-            for element in soup.find_all(
-                string=lambda text: text and "Job Locations" in text
-            ):
-                # Check parent text
-                parent = element.parent
-                if not parent:
-                    continue
-                text = parent.get_text(strip=True)
-                # If the text is just "Job Locations", check siblings
-                if text == "Job Locations":
-                    # Next sibling element?
-                    next_elem = parent.find_next_sibling()
-                    if next_elem:
-                        loc = next_elem.get_text(strip=True)
-                        if loc:
-                            locations.append({"type": "onsite", "location_string": loc})
-                elif text.startswith("Job Locations"):
-                    loc = text.replace("Job Locations", "").strip()
+            text = parent.get_text(strip=True)
+            # If the text is just "Job Locations", check siblings
+            if text == "Job Locations":
+                # Next sibling element?
+                next_elem = parent.find_next_sibling()
+                if next_elem:
+                    loc = next_elem.get_text(strip=True)
                     if loc:
                         locations.append({"type": "onsite", "location_string": loc})
+            elif text.startswith("Job Locations"):
+                loc = text.replace("Job Locations", "").strip()
+                if loc:
+                    locations.append({"type": "onsite", "location_string": loc})
 
-            if locations:
-                details["locations"] = locations
+        if locations:
+            details["locations"] = locations
 
-        # Description
-        # This is a generic attempt to get the main content.
-        # A more robust solution would have parsers for specific site structures.
-        main_content = soup.find("main") or soup.find("article") or soup.find("body")
-        if main_content:
-            details["description"] = " ".join(main_content.get_text().split())
-        else:
-            details["description"] = ""
+    # Description
+    # This is a generic attempt to get the main content.
+    # A more robust solution would have parsers for specific site structures.
+    main_content = soup.find("main") or soup.find("article") or soup.find("body")
+    if main_content:
+        details["description"] = " ".join(main_content.get_text().split())
+    else:
+        details["description"] = ""
 
-        return details
-    except requests.RequestException as e:
-        logger.warning(f"Could not fetch URL {url}: {e}")
-        return None
+    return details
 
 
-def scrape_jobs(query, domain, days=None, blocked_patterns=None):
+def search_domain_jobs(query, domain, days=None, blocked_patterns=None):
     """
-    Scrapes job postings from a given domain using the Google Custom Search API.
+    Searches a domain for job postings using the Google Custom Search API.
+    Only the search results are returned; job pages are not fetched.
 
     Args:
         query (str): The search query for job titles.
@@ -411,40 +439,87 @@ def scrape_jobs(query, domain, days=None, blocked_patterns=None):
                 "posting_date": posting_date,
             }
 
-            # Scrape the actual job page for more details
-            if job_data["link"]:
-                scraped_details = scrape_job_details(job_data["link"])
-                if scraped_details:
-                    # Override the initial data with more accurate scraped data
-                    job_data["title"] = (
-                        scraped_details.get("title") or job_data["title"]
-                    )
-                    job_data["description"] = (
-                        scraped_details.get("description") or job_data["description"]
-                    )
-                    if scraped_details.get("locations"):
-                        job_data["locations"] = scraped_details["locations"]
-
-                    if scraped_details.get("city"):
-                        job_data["city"] = scraped_details["city"]
-                    if scraped_details.get("state"):
-                        job_data["state"] = scraped_details["state"]
-                    if scraped_details.get("country"):
-                        job_data["country"] = scraped_details["country"]
-
-                    # Update company if scraped_details found a better one
-                    if scraped_details.get("company"):
-                        if scraped_details["company"].lower() not in [
-                            "careers",
-                            "home",
-                            "index",
-                        ]:
-                            job_data["company"] = scraped_details["company"]
-
             jobs.append(job_data)
     return jobs
 
 
+def fetch_job_details(links, max_workers=None, per_host_limit=None):
+    """
+    Scrapes many job pages concurrently.
+
+    Args:
+        links (iterable): Job posting URLs. Duplicates are fetched once.
+        max_workers (int, optional): Global cap on concurrent fetches.
+        per_host_limit (int, optional): Cap on concurrent fetches per host.
+
+    Returns:
+        dict: A mapping of link to the result of `scrape_job_details`.
+    """
+    return concurrency.fetch_all(
+        scrape_job_details,
+        links,
+        max_workers=max_workers,
+        per_host_limit=per_host_limit,
+    )
+
+
+def merge_job_details(job_data, scraped_details):
+    """
+    Overrides the search result data with the more accurate data scraped from
+    the job page. Modifies `job_data` in place.
+    """
+    if not scraped_details:
+        return job_data
+
+    job_data["title"] = scraped_details.get("title") or job_data["title"]
+    job_data["description"] = (
+        scraped_details.get("description") or job_data["description"]
+    )
+    if scraped_details.get("locations"):
+        job_data["locations"] = scraped_details["locations"]
+
+    if scraped_details.get("city"):
+        job_data["city"] = scraped_details["city"]
+    if scraped_details.get("state"):
+        job_data["state"] = scraped_details["state"]
+    if scraped_details.get("country"):
+        job_data["country"] = scraped_details["country"]
+
+    # Update company if scraped_details found a better one
+    if scraped_details.get("company"):
+        if scraped_details["company"].lower() not in [
+            "careers",
+            "home",
+            "index",
+        ]:
+            job_data["company"] = scraped_details["company"]
+    return job_data
+
+
+def scrape_jobs(query, domain, days=None, blocked_patterns=None):
+    """
+    Scrapes job postings from a given domain using the Google Custom Search API.
+
+    Args:
+        query (str): The search query for job titles.
+        domain (str): The domain to search within (e.g., "lever.co").
+        days (int, optional): The number of past days to restrict the search to.
+        blocked_patterns (list, optional): List of URL patterns to block.
+
+    Returns:
+        list: A list of dictionaries, where each dictionary represents a job posting.
+    """
+    jobs = search_domain_jobs(
+        query, domain, days=days, blocked_patterns=blocked_patterns
+    )
+
+    # Scrape the actual job pages for more details
+    details_by_link = fetch_job_details(job["link"] for job in jobs)
+    for job_data in jobs:
+        merge_job_details(job_data, details_by_link.get(job_data["link"]))
+    return jobs
+
+
 def scrape_and_save_jobs(repo: FirestoreRepo, query_term: str, domains, days=None):
     """
     Scrapes jobs from a list of domains and saves new jobs to the database.
@@ -466,7 +541,10 @@ def scrape_and_save_jobs(repo: FirestoreRepo, query_term: str, domains, days=Non
         logger.warning(f"Failed to fetch blocked patterns: {e}")
         blocked_patterns = []
 
-    scraped_count = 0
+    # Stage 1: search every domain. This is one cheap API call per domain.
+    # Hits are keyed by their deterministic job ID (uuid5 of the link), which
+    # also dedupes links found under several domains.
+    candidates = {}
     for domain_obj in domains:
         domain_name = (
             domain_obj["domain"]
@@ -475,57 +553,136 @@ def scrape_and_save_jobs(repo: FirestoreRepo, query_term: str, domains, days=Non
         )
         try:
             logger.info(f"Scraping {domain_name} for {query_term}...")
-            jobs = scrape_jobs(
+            jobs = search_domain_jobs(
                 query_term, domain_name, days=days, blocked_patterns=blocked_patterns
             )
-            for job_data in jobs:
-                title = job_data["title"]
-                if "Job Application for" in title:
-                    title = title.replace("Job Application for", "").strip()
-
-                # Generate a job ID based on the link (deterministic)
-                # Or query if it exists by link.
-                # Firestore query for link?
-                # The repo doesn't support get_by_link easily without index/loop.
-                # But we can use URL as ID (encoded) or hash.
-                # Let's use uuid5 with namespace_url
+        except Exception as e:
+            logger.error(f"Error scraping {domain_name}: {e}")
+            continue
+        for job_data in jobs:
+            if job_data["link"]:
                 job_id = str(uuid.uuid5(uuid.NAMESPACE_URL, job_data["link"]))
+                candidates.setdefault(job_id, job_data)
 
-                # Check if exists
-                existing_job = repo.get_job_posting(job_id)
-
-                if not existing_job:
-                    # Flatten locations for searching
-                    searchable_locations = []
-                    for loc in job_data["locations"]:
-                        if loc.get("type"):
-                            searchable_locations.append(loc["type"])
-                        if loc.get("location_string"):
-                            searchable_locations.append(loc["location_string"])
-
-                    # Default location string for display
-                    # loc_str logic removed as it was unused and flagged by linter
-
-                    final_job_data = {
-                        "title": title,
-                        "company": job_data["company"],
-                        "description": job_data["description"],
-                        "posting_date": job_data["posting_date"],
-                        "locations": job_data["locations"],
-                        "searchable_locations": searchable_locations,
-                        "city": job_data.get("city"),
-                        "state": job_data.get("state"),
-                        "country": job_data.get("country"),
-                        "work_arrangement": "Unknown",
-                        "link": job_data["link"],
-                        "created_at": datetime.now(timezone.utc),
-                        "updated_at": datetime.now(timezone.utc),
-                    }
-
-                    repo.put_job_posting(job_id, final_job_data)
-                    scraped_count += 1
+    # Stage 2: batched reads to drop the postings we already have, and the
+    # links known to be near-duplicates of one, so their pages are not
+    # fetched again.
+    try:
+        existing_jobs = repo.get_job_postings(list(candidates))
+        existing_jobs.update(repo.get_job_aliases(list(candidates)))
+    except Exception as e:
+        logger.error(f"Error checking for existing jobs: {e}")
+        return 0
+    candidates = {
+        job_id: job_data
+        for job_id, job_data in candidates.items()
+        if job_id not in existing_jobs
+    }
+
+    # Stage 3: fetch the detail pages of every new hit, across all domains, at once.
+    details_by_link = fetch_job_details(job["link"] for job in candidates.values())
+
+    # Stage 4: drop near-duplicates of stored postings and of each other
+    # (the same posting under another URL), using MinHash signatures and
+    # LSH band lookups. Firestore matches at most 30 band buckets per query,
+    # so only postings without a near-duplicate earlier in the batch are
+    # looked up, within NEAR_DUPLICATE_MAX_QUERIES queries.
+    signatures = {}
+    for job_id, job_data in candidates.items():
+        merge_job_details(job_data, details_by_link.get(job_data["link"]))
+        title = job_data["title"]
+        if "Job Application for" in title:
+            title = title.replace("Job Application for", "").strip()
+        job_data["title"] = title
+        signatures[job_id] = near_duplicates.minhash(
+            near_duplicates.document_text(
+                title, job_data["company"], job_data["description"]
+            )
+        )
+    batch_index = near_duplicates.LSHIndex()
+    buckets = {}
+    max_buckets = NEAR_DUPLICATE_MAX_QUERIES * FIRESTORE_ARRAY_ANY_LIMIT
+    unchecked = 0
+    for job_id, signature in signatures.items():
+        if batch_index.find(signature) is not None:
+            continue
+        batch_index.add(job_id, signature)
+        new_buckets = [
+            bucket
+            for bucket in near_duplicates.band_hashes(signature)
+            if bucket not in buckets
+        ]
+        if len(buckets) + len(new_buckets) > max_buckets:
+            unchecked += 1
+            continue
+        buckets.update(dict.fromkeys(new_buckets))
+    if unchecked:
+        logger.warning(
+            f"Checked {unchecked} new postings against this batch only: "
+            f"looking them up would exceed {NEAR_DUPLICATE_MAX_QUERIES} queries."
+        )
+    try:
+        stored_signatures = repo.get_jobs_by_minhash_bands(list(buckets))
+    except Exception as e:
+        logger.warning(f"Near-duplicate lookup failed: {e}")
+        stored_signatures = {}
+    index = near_duplicates.LSHIndex()
+    for stored_id, signature in stored_signatures.items():
+        if signature:
+            index.add(stored_id, signature)
+
+    # Stage 5: build the new postings and save them with batched writes.
+    # Near-duplicates are saved as aliases of the posting they duplicate.
+    new_jobs = {}
+    aliases = {}
+    for job_id, job_data in candidates.items():
+        signature = signatures[job_id]
+        duplicate_of = index.find(signature)
+        if duplicate_of is not None:
+            logger.info(
+                f"Skipping {job_data['link']}: near-duplicate of job {duplicate_of}."
+            )
+            aliases[job_id] = {"link": job_data["link"], "job_id": duplicate_of}
+            continue
+        index.add(job_id, signature)
+        title = job_data["title"]
+
+        # Flatten locations for searching
+        searchable_locations = []
+        for loc in job_data["locations"]:
+            if loc.get("type"):
+                searchable_locations.append(loc["type"])
+            if loc.get("location_string"):
+                searchable_locations.append(loc["location_string"])
+
+        new_jobs[job_id] = {
+            "title": title,
+            "company": job_data["company"],
+            "description": job_data["description"],
+            "posting_date": job_data["posting_date"],
+            "locations": job_data["locations"],
+            "searchable_locations": searchable_locations,
+            "city": job_data.get("city"),
+            "state": job_data.get("state"),
+            "country": job_data.get("country"),
+            "work_arrangement": "Unknown",
+            "link": job_data["link"],
+            "minhash": signature.tolist(),
+            "minhash_bands": near_duplicates.band_hashes(signature),
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc),
+        }
 
+    if new_jobs:
+        try:
+            repo.put_job_postings(new_jobs)
         except Exception as e:
-            logger.error(f"Error scraping {domain_name}: {e}")
+            logger.error(f"Error saving scraped jobs: {e}")
+            return getattr(e, "written", 0)
+    if aliases:
+        try:
+            repo.put_job_aliases(aliases)
+        except Exception as e:
+            logger.warning(f"Failed to save near-duplicate aliases: {e}")
 
-    return scraped_count
+    return len(new_jobs)
@@ -1,7 +1,17 @@
 import json
+import os
 
-from backend.app.dynamo_repo import DynamoRepo
-from backend.app.ml import calculate_string_similarity
+from backend.app.dynamo_repo import SIMILARITY_MAX_TERM_FREQUENCY, DynamoRepo
+from backend.app.ml import calculate_string_similarity, jaccard_similarity
+from shared import ann_index
+
+# The ANN index of DynamoDB job ids, built by `python -m
+# backend.app.build_ann_index` onto storage the Lambda mounts (such as EFS).
+# Left empty, similar jobs are found through the token index.
+SIMILARITY_ANN_INDEX_PATH = os.environ.get("SIMILARITY_ANN_INDEX_PATH", "")
+# The rarest words of the source description used to look up candidates.
+SIMILARITY_QUERY_TERMS = int(os.environ.get("SIMILARITY_QUERY_TERMS", "10"))
+SIMILARITY_THRESHOLD = 0.1
 
 
 def find_similar_jobs_logic(job_id: str, all_jobs: list):
@@ -19,13 +29,72 @@ def find_similar_jobs_logic(job_id: str, all_jobs: list):
             similarity = calculate_string_similarity(
                 source_job.get("description", ""), job.get("description", "")
             )
-            if similarity > 0.1:  # Arbitrary threshold
+            if similarity > SIMILARITY_THRESHOLD:
                 similarities.append((job["PK"].split("#")[1], similarity))
 
     similarities.sort(key=lambda x: x[1], reverse=True)
     return [job_id for job_id, score in similarities[:5]]  # Return top 5
 
 
+def find_similar_jobs_indexed(dynamo_repo: DynamoRepo, job_id: str):
+    """
+    Finds similar jobs through the token index: only jobs sharing one of
+    the source description's rarest words are scored, using the tokens
+    stored with each job.
+
+    Returns:
+        list: The similar job ids, or None if the job hasn't been indexed.
+    """
+    source_job = dynamo_repo.get_job_posting(job_id)
+    if not source_job or "tokens" not in source_job:
+        return None
+    source_tokens = set(source_job["tokens"])
+
+    frequencies = dynamo_repo.get_token_frequencies(source_tokens)
+    # Words only the source job contains can't match anything.
+    rare_terms = sorted(
+        (df, token)
+        for token, df in frequencies.items()
+        if 1 < df <= SIMILARITY_MAX_TERM_FREQUENCY
+    )[:SIMILARITY_QUERY_TERMS]
+    candidates = set()
+    for df, token in rare_terms:
+        candidates.update(dynamo_repo.get_jobs_for_token(token))
+    candidates.discard(job_id)
+    if not candidates:
+        return []
+
+    similarities = []
+    for candidate_id, tokens in dynamo_repo.get_job_tokens(candidates).items():
+        similarity = jaccard_similarity(source_tokens, set(tokens))
+        if similarity > SIMILARITY_THRESHOLD:
+            similarities.append((candidate_id, similarity))
+
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return [job_id for job_id, score in similarities[:5]]
+
+
+def find_similar_jobs_ann(dynamo_repo: DynamoRepo, job_id: str):
+    """
+    Looks up similar jobs in the persisted ANN index, which avoids scanning
+    the whole table.
+
+    Returns:
+        list: The similar job ids, or None if the index or the job's
+        embedding is unavailable.
+    """
+    if not SIMILARITY_ANN_INDEX_PATH:
+        return None
+    index = ann_index.get_index(SIMILARITY_ANN_INDEX_PATH)
+    if index is None:
+        return None
+    source_job = dynamo_repo.get_job_posting(job_id)
+    if not source_job or not source_job.get("embedding"):
+        return None
+    matches = index.search(source_job["embedding"], k=5, exclude={job_id})
+    return [match_id for match_id, score in matches]
+
+
 def handler(event, context):
     """
     The AWS Lambda handler for the "find similar jobs" task.
@@ -37,11 +106,13 @@ def handler(event, context):
         job_id = message["job_id"]
         task_id = message["task_id"]
 
-        # In a real app, you might query for jobs with similar titles/locations first
-        # to narrow down the search space.
-        all_jobs = dynamo_repo.search_jobs()
-
-        similar_job_ids = find_similar_jobs_logic(job_id, all_jobs)
+        similar_job_ids = find_similar_jobs_ann(dynamo_repo, job_id)
+        if similar_job_ids is None:
+            similar_job_ids = find_similar_jobs_indexed(dynamo_repo, job_id)
+        if similar_job_ids is None:
+            # Jobs stored before the token index existed need a full scan.
+            all_jobs = dynamo_repo.search_jobs()
+            similar_job_ids = find_similar_jobs_logic(job_id, all_jobs)
 
         dynamo_repo.put_similarity_result(task_id, similar_job_ids)
         print(f"Stored similarity results for task {task_id}")
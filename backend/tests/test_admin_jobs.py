@@ -1,3 +1,8 @@
+import csv
+import gzip
+import io
+import json
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 from backend.app.main import app
@@ -116,3 +121,42 @@ async def test_rescrape_admin_job(
     assert args[1]["title"] == "New Title"
 
     app.dependency_overrides = {}
+
+
+@pytest.mark.asyncio
+async def test_export_admin_jobs_streams_ndjson_and_gzipped_csv(
+    mock_firebase_auth, mock_firestore
+):
+    jobs = [
+        {"id": "job1", "title": "Engineer", "locations": [{"type": "remote"}]},
+        {"id": "job2", "title": "Designer, Senior", "company": "Tech Corp"},
+    ]
+    mock_firestore.iter_all_jobs.side_effect = lambda fields=None: iter(jobs)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        from backend.app.security import get_current_user
+
+        app.dependency_overrides[get_current_user] = lambda: {
+            "uid": "test_admin_uid",
+            "email": "admin@example.com",
+        }
+
+        response = await ac.get("/api/admin/jobs/export/")
+        csv_response = await ac.get("/api/admin/jobs/export/?output=csv&gzip=true")
+        bad_response = await ac.get("/api/admin/jobs/export/?output=xml")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ["job1", "job2"]
+    assert lines[0]["locations"] == [{"type": "remote"}]
+
+    assert csv_response.headers["content-type"] == "application/gzip"
+    rows = list(csv.reader(io.StringIO(gzip.decompress(csv_response.content).decode())))
+    assert rows[0][:3] == ["id", "title", "company"]
+    assert rows[2][:3] == ["job2", "Designer, Senior", "Tech Corp"]
+
+    assert bad_response.status_code == 400
+    app.dependency_overrides = {}
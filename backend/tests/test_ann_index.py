@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+from unittest.mock import patch
+
+import numpy as np
+
+from backend.app import similarity
+from shared import ann_index
+from shared.ann_index import IVFIndex
+
+
+def _corpus(n=500, dim=16, seed=1):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    ids = [f"job{i}" for i in range(n)]
+    return ids, vectors
+
+
+def test_search_matches_exact_when_probing_every_list():
+    ids, vectors = _corpus()
+    index = IVFIndex.build(ids, vectors, nlist=10)
+
+    query = vectors[0]
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+
+    found = index.search(query, k=5, nprobe=index.nlist)
+    assert [job_id for job_id, score in found] == [ids[i] for i in exact]
+    assert found[0] == ("job0", found[0][1])
+    assert abs(found[0][1] - 1.0) < 1e-5
+
+
+def test_search_applies_exclusions_and_threshold():
+    ids, vectors = _corpus()
+    index = IVFIndex.build(ids, vectors, nlist=10)
+
+    found = index.search(vectors[0], k=5, nprobe=10, exclude={"job0"}, min_score=0.99)
+    assert found == []
+
+
+def test_add_replaces_and_remove_drops_vectors():
+    ids, vectors = _corpus()
+    index = IVFIndex.build(ids, vectors, nlist=10)
+
+    index.add(["job0", "new"], np.stack([-vectors[0], vectors[0]]))
+    assert len(index) == 501
+
+    found = index.search(vectors[0], k=1, nprobe=10)
+    assert found[0][0] == "new"
+
+    index.remove(["new"])
+    assert "new" not in index
+    assert index.search(vectors[0], k=1, nprobe=10)[0][0] != "new"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    ids, vectors = _corpus()
+    index = IVFIndex.build(ids, vectors, nlist=10, nprobe=3)
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = IVFIndex.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.nprobe == 3
+    assert loaded.search(vectors[7], k=5) == index.search(vectors[7], k=5)
+
+
+def test_add_to_index_appends_to_the_delta_log(tmp_path):
+    path = str(tmp_path / "index.npz")
+    assert ann_index.add_to_index({"job": [1.0, 0.0]}, path=path) is False
+
+    ids, vectors = _corpus()
+    IVFIndex.build(ids, vectors, nlist=10).save(path)
+    saved_at = os.stat(path).st_mtime_ns
+    cached = ann_index.get_index(path)
+
+    assert ann_index.add_to_index({"new": vectors[3].tolist()}, path=path)
+    assert ann_index.remove_from_index({ids[0]}, path=path)
+
+    # The index file itself isn't rewritten; readers replay the log.
+    assert os.stat(path).st_mtime_ns == saved_at
+    assert "new" not in IVFIndex.load(path)
+    assert ann_index.get_index(path) is cached
+    assert "new" in cached
+    assert ids[0] not in cached
+
+    assert ann_index.remove_from_index({"new"}, path=path)
+    assert "new" not in ann_index.get_index(path)
+
+
+def test_get_index_stops_at_a_partially_written_record(tmp_path):
+    path = str(tmp_path / "index.npz")
+    ids, vectors = _corpus()
+    IVFIndex.build(ids, vectors, nlist=10).save(path)
+    ann_index.add_to_index({"new0": vectors[0].tolist()}, path=path)
+    with open(f"{path}.delta", "rb") as f:
+        record = f.read()
+    with open(f"{path}.delta", "ab") as f:
+        f.write(record[: len(record) // 2])
+
+    index = ann_index.get_index(path)
+    assert "new0" in index
+
+    with open(f"{path}.delta", "ab") as f:
+        f.write(record[len(record) // 2 :])
+    ann_index.add_to_index({"new1": vectors[1].tolist()}, path=path)
+    assert "new1" in ann_index.get_index(path)
+
+
+def test_replace_index_keeps_updates_made_during_the_rebuild(tmp_path):
+    path = str(tmp_path / "index.npz")
+    ids, vectors = _corpus()
+    IVFIndex.build(ids, vectors, nlist=10).save(path)
+    ann_index.add_to_index({"before": vectors[0].tolist()}, path=path)
+
+    since = ann_index.delta_position(path)
+    ann_index.add_to_index({"during": vectors[1].tolist()}, path=path)
+    ann_index.replace_index(IVFIndex.build(ids, vectors, nlist=5), path, since=since)
+
+    index = ann_index.get_index(path)
+    assert index.nlist == 5
+    assert "during" in index
+    assert "before" not in index
+
+
+def test_concurrent_additions_are_all_kept(tmp_path):
+    path = str(tmp_path / "index.npz")
+    ids, vectors = _corpus()
+    IVFIndex.build(ids, vectors, nlist=10).save(path)
+
+    threads = [
+        threading.Thread(
+            target=ann_index.add_to_index,
+            args=({f"new{i}": vectors[i].tolist()},),
+            kwargs={"path": path},
+        )
+        for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    index = ann_index.get_index(path)
+    assert all(f"new{i}" in index for i in range(8))
+
+
+@patch("backend.app.similarity.DynamoRepo")
+def test_similarity_handler_uses_ann_index(MockDynamoRepo):
+    ids, vectors = _corpus()
+    index = IVFIndex.build(ids, vectors, nlist=10, nprobe=10)
+
+    mock_repo_instance = MockDynamoRepo.return_value
+    mock_repo_instance.get_job_posting.return_value = {
+        "PK": "JOB#job0",
+        "embedding": vectors[0].tolist(),
+    }
+
+    event = {"Records": [{"body": json.dumps({"job_id": "job0", "task_id": "t1"})}]}
+    with (
+        patch("backend.app.similarity.SIMILARITY_ANN_INDEX_PATH", "/mnt/index.npz"),
+        patch("backend.app.similarity.ann_index.get_index", return_value=index),
+    ):
+        similarity.handler(event, {})
+
+    mock_repo_instance.search_jobs.assert_not_called()
+    task_id, similar_job_ids = mock_repo_instance.put_similarity_result.call_args[0]
+    assert task_id == "t1"
+    assert len(similar_job_ids) == 5
+    assert "job0" not in similar_job_ids
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from shared import concurrency
+
+
+def test_interleave_by_host_round_robins_and_dedupes():
+    urls = [
+        "https://a.com/1",
+        "https://a.com/2",
+        "https://a.com/1",
+        "https://b.com/1",
+        "",
+        "https://a.com/3",
+    ]
+    assert concurrency.interleave_by_host(urls) == [
+        "https://a.com/1",
+        "https://b.com/1",
+        "https://a.com/2",
+        "https://a.com/3",
+    ]
+
+
+def test_fetch_all_maps_results_and_swallows_errors():
+    def fetch(url):
+        if url.endswith("bad"):
+            raise ValueError("boom")
+        return url.upper()
+
+    results = concurrency.fetch_all(
+        fetch, ["https://a.com/ok", "https://b.com/bad"], max_workers=2
+    )
+    assert results == {
+        "https://a.com/ok": "HTTPS://A.COM/OK",
+        "https://b.com/bad": None,
+    }
+
+
+def test_fetch_all_respects_per_host_limit():
+    lock = threading.Lock()
+    in_flight = {}
+    peak = {}
+
+    def fetch(url):
+        host = url.split("/")[2]
+        with lock:
+            in_flight[host] = in_flight.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), in_flight[host])
+        time.sleep(0.01)
+        with lock:
+            in_flight[host] -= 1
+        return url
+
+    urls = [f"https://a.com/{i}" for i in range(10)] + [
+        f"https://b.com/{i}" for i in range(10)
+    ]
+    results = concurrency.fetch_all(fetch, urls, max_workers=8, per_host_limit=2)
+
+    assert len(results) == 20
+    assert peak["a.com"] <= 2
+    assert peak["b.com"] <= 2
+
+
+def test_host_rate_limiter_spaces_requests_per_host():
+    limiter = concurrency.HostRateLimiter(rate=20)
+    started = {}
+
+    def fetch(url):
+        started[url] = time.monotonic()
+        return url
+
+    concurrency.fetch_all(
+        fetch,
+        [f"https://a.com/{i}" for i in range(4)] + ["https://b.com/1"],
+        max_workers=5,
+        rate_limiter=limiter,
+    )
+    a_times = sorted(t for url, t in started.items() if url.startswith("https://a"))
+    gaps = [later - earlier for earlier, later in zip(a_times, a_times[1:])]
+    assert min(gaps) >= 0.04
+    # Other hosts don't wait behind a.com.
+    assert started["https://b.com/1"] - a_times[0] < 0.04
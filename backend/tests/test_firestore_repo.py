@@ -0,0 +1,192 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from backend.app.firestore_repo import (
+    FIRESTORE_BATCH_LIMIT,
+    FirestoreRepo,
+    PartialWriteError,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def make_doc(doc_id, exists=True, data=None):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.exists = exists
+    doc.to_dict.return_value = data or {}
+    return doc
+
+
+def test_put_job_postings_commits_one_batch_per_500_documents():
+    db = MagicMock()
+    repo = FirestoreRepo(db_client=db)
+    jobs = {
+        f"job{i}": {"title": f"Job {i}"} for i in range(FIRESTORE_BATCH_LIMIT * 2 + 1)
+    }
+
+    assert repo.put_job_postings(jobs) == len(jobs)
+
+    assert db.batch.call_count == 3
+    batch = db.batch.return_value
+    assert batch.set.call_count == len(jobs)
+    assert batch.commit.call_count == 3
+
+
+def test_put_job_postings_reports_batches_committed_before_a_failure():
+    db = MagicMock()
+    db.batch.return_value.commit.side_effect = [None, RuntimeError("quota"), None]
+    repo = FirestoreRepo(db_client=db)
+    jobs = {
+        f"job{i}": {"title": f"Job {i}"} for i in range(FIRESTORE_BATCH_LIMIT * 2 + 1)
+    }
+
+    with pytest.raises(PartialWriteError) as excinfo:
+        repo.put_job_postings(jobs)
+
+    assert excinfo.value.written == FIRESTORE_BATCH_LIMIT
+    assert excinfo.value.status_code == 500
+    assert f"{FIRESTORE_BATCH_LIMIT} of {len(jobs)}" in excinfo.value.detail
+
+
+def test_get_job_postings_returns_existing_documents_only():
+    db = MagicMock()
+    db.get_all.return_value = [
+        make_doc("job1", data={"title": "Job 1"}),
+        make_doc("job2", exists=False),
+    ]
+    repo = FirestoreRepo(db_client=db)
+
+    jobs = repo.get_job_postings(["job1", "job2", "job1"])
+
+    db.get_all.assert_called_once()
+    assert len(db.get_all.call_args[0][0]) == 2
+    assert jobs == {"job1": {"title": "Job 1", "id": "job1"}}
+
+
+def test_corpus_version_defaults_to_zero_and_is_incremented_atomically():
+    db = MagicMock()
+    version_doc = db.collection.return_value.document.return_value
+    version_doc.get.return_value = make_doc("job_corpus", exists=False)
+    repo = FirestoreRepo(db_client=db)
+
+    assert repo.get_corpus_version() == 0
+
+    with patch("backend.app.firestore_repo.firestore") as firestore:
+        repo.bump_corpus_version()
+    db.collection.assert_called_with("metadata")
+    db.collection.return_value.document.assert_called_with("job_corpus")
+    firestore.Increment.assert_called_once_with(1)
+    version_doc.set.assert_called_once_with(
+        {"version": firestore.Increment.return_value}, merge=True
+    )
+
+
+def make_query_db(pages):
+    """
+    Returns a db mock whose job query streams the given pages in turn.
+    """
+    db = MagicMock()
+    query = MagicMock()
+    db.collection.return_value = query
+    for method in ("where", "order_by", "start_after", "limit", "select"):
+        getattr(query, method).return_value = query
+    query.stream.side_effect = [
+        [make_doc(doc_id, data=data) for doc_id, data in page] for page in pages
+    ]
+    return db, query
+
+
+def test_iter_all_jobs_reads_pages_lazily():
+    db, query = make_query_db(
+        [
+            [("job1", {"title": "Job 1"}), ("job2", {"title": "Job 2"})],
+            [("job3", {"title": "Job 3"})],
+        ]
+    )
+    repo = FirestoreRepo(db_client=db)
+
+    jobs = repo.iter_all_jobs(fields=["title"], page_size=2)
+    assert next(jobs) == {"id": "job1", "title": "Job 1"}
+    assert query.stream.call_count == 1
+
+    assert [job["id"] for job in jobs] == ["job2", "job3"]
+    assert query.stream.call_count == 2
+    query.select.assert_called_with(["title"])
+    assert query.start_after.call_args[0][0].id == "job2"
+
+
+def test_cursor_round_trip():
+    posting_date = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    cursor = encode_cursor(posting_date, "job9")
+    assert decode_cursor(cursor) == (posting_date, "job9")
+    assert decode_cursor(encode_cursor(None, "job1")) == (None, "job1")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_search_jobs_page_starts_after_cursor_values_without_extra_read():
+    posting_date = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    db, query = make_query_db(
+        [
+            [
+                ("job1", {"posting_date": posting_date}),
+                ("job2", {"posting_date": posting_date}),
+            ],
+            [("job3", {"posting_date": posting_date})],
+        ]
+    )
+    repo = FirestoreRepo(db_client=db, prefetch=False)
+
+    page = repo.search_jobs_page(limit=2)
+    assert [job["id"] for job in page.jobs] == ["job1", "job2"]
+    assert page.next_cursor is not None
+
+    next_page = repo.search_jobs_page(limit=2, cursor=page.next_cursor)
+    assert [job["id"] for job in next_page.jobs] == ["job3"]
+    assert next_page.next_cursor is None
+    query.start_after.assert_called_once_with(
+        {"posting_date": posting_date, "__name__": "job2"}
+    )
+    query.document.assert_not_called()
+
+
+def test_search_jobs_last_doc_id_uses_cached_sort_key():
+    db, query = make_query_db(
+        [[("job1", {"posting_date": "2024-05-02"})], [("job2", {})]]
+    )
+    repo = FirestoreRepo(db_client=db, prefetch=False)
+
+    repo.search_jobs(limit=1)
+    repo.search_jobs(limit=1, last_doc_id="job1")
+
+    query.document.assert_not_called()
+    query.start_after.assert_called_once_with(
+        {"posting_date": "2024-05-02", "__name__": "job1"}
+    )
+
+
+def test_search_jobs_page_invalid_cursor_is_a_client_error():
+    repo = FirestoreRepo(db_client=MagicMock(), prefetch=False)
+    with pytest.raises(HTTPException) as exc_info:
+        repo.search_jobs_page(cursor="garbage")
+    assert exc_info.value.status_code == 400
+
+
+def test_search_jobs_page_prefetches_next_page():
+    db, query = make_query_db(
+        [
+            [("job1", {"posting_date": "2024-05-02"})],
+            [("job2", {"posting_date": "2024-05-01"})],
+        ]
+    )
+    repo = FirestoreRepo(db_client=db, prefetch=True)
+
+    page = repo.search_jobs_page(limit=1, prefetch=True)
+    next_page = repo.search_jobs_page(limit=1, cursor=page.next_cursor, prefetch=False)
+
+    assert [job["id"] for job in next_page.jobs] == ["job2"]
+    assert query.stream.call_count == 2
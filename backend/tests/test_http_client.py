@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+
+from shared import http_client
+
+
+def make_response(status_code=200, content=b"<html></html>", headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    response.headers = headers or {}
+    return response
+
+
+def test_conditional_get_sends_validators_and_handles_304():
+    session = MagicMock()
+    session.get.return_value = make_response(status_code=304)
+    validators = {
+        "etag": '"abc"',
+        "last_modified": "Wed, 01 Oct 2025 00:00:00 GMT",
+        "content_hash": "123",
+    }
+
+    result = http_client.conditional_get(
+        "https://example.com/job", validators, session=session
+    )
+
+    _, kwargs = session.get.call_args
+    assert kwargs["headers"] == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 01 Oct 2025 00:00:00 GMT",
+    }
+    assert result.changed is False
+    assert result.response is None
+    assert result.validators == validators
+
+
+def test_conditional_get_records_new_validators():
+    session = MagicMock()
+    session.get.return_value = make_response(
+        content=b"<html>v1</html>",
+        headers={"ETag": '"v1"', "Last-Modified": "Thu, 02 Oct 2025 00:00:00 GMT"},
+    )
+
+    result = http_client.conditional_get("https://example.com/job", session=session)
+
+    assert result.changed is True
+    assert result.validators == {
+        "etag": '"v1"',
+        "last_modified": "Thu, 02 Oct 2025 00:00:00 GMT",
+        "content_hash": http_client.content_hash(b"<html>v1</html>"),
+    }
+
+
+def test_conditional_get_short_circuits_on_matching_hash():
+    session = MagicMock()
+    session.get.return_value = make_response(content=b"<html>same</html>")
+    validators = {"content_hash": http_client.content_hash(b"<html>same</html>")}
+
+    result = http_client.conditional_get(
+        "https://example.com/job", validators, session=session
+    )
+
+    _, kwargs = session.get.call_args
+    assert kwargs["headers"] == {}
+    assert result.changed is False
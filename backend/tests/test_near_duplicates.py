@@ -0,0 +1,43 @@
+import numpy as np
+
+from shared import near_duplicates
+from shared.near_duplicates import (
+    LSHIndex,
+    band_hashes,
+    estimated_similarity,
+    minhash,
+    shingles,
+)
+
+POSTING = (
+    "Senior Python Engineer at Acme. We are looking for a senior python "
+    "engineer to build data pipelines and APIs in a remote friendly team."
+)
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("Python, Django & REST!") == {"python django rest"}
+    assert shingles("a b c d") == {"a b c", "b c d"}
+    assert shingles("") == set()
+
+
+def test_minhash_is_deterministic_and_estimates_similarity():
+    signature = minhash(POSTING)
+    assert signature.dtype == np.uint32
+    assert len(signature) == near_duplicates.NUM_PERMUTATIONS
+    np.testing.assert_array_equal(signature, minhash(POSTING.upper()))
+
+    near = minhash(POSTING + " Apply now!")
+    other = minhash("Java developer at Initech, building payment systems on Spring.")
+    assert estimated_similarity(signature, near) >= 0.8
+    assert estimated_similarity(signature, other) < 0.2
+
+
+def test_lsh_index_finds_near_duplicates_only():
+    index = LSHIndex()
+    index.add("job1", minhash(POSTING))
+    index.add("job2", minhash("Java developer at Initech, building payments."))
+
+    assert len(band_hashes(minhash(POSTING))) == near_duplicates.NEAR_DUPLICATE_BANDS
+    assert index.find(minhash(POSTING + " Apply now!")) == "job1"
+    assert index.find(minhash("Staff designer at Globex, owning our brand.")) is None
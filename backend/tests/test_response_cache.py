@@ -0,0 +1,72 @@
+import time
+from unittest.mock import MagicMock
+
+from backend.app.response_cache import ResponseCache
+
+
+def test_get_counts_hits_and_misses():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    key = cache.key("engineer", 20)
+    assert cache.get(key) is None
+    cache.set(key, ["job1"])
+    assert cache.get(key) == ["job1"]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_bumping_the_corpus_version_invalidates_entries():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    cache.set(cache.key("engineer"), ["job1"])
+    cache.bump_corpus_version()
+    assert cache.get(cache.key("engineer")) is None
+
+
+def test_corpus_version_is_shared_through_the_version_store():
+    store = MagicMock()
+    store.get_corpus_version.return_value = 1
+    writer = ResponseCache(maxsize=10, ttl=60, version_store=store, version_ttl=0)
+    reader = ResponseCache(maxsize=10, ttl=60, version_store=store, version_ttl=0)
+    reader.set(reader.key("engineer"), ["job1"])
+
+    # Another process bumps the shared version.
+    store.get_corpus_version.return_value = 2
+    writer.bump_corpus_version()
+
+    store.bump_corpus_version.assert_called_once_with()
+    assert reader.get(reader.key("engineer")) is None
+
+
+def test_corpus_version_is_reread_at_most_once_per_version_ttl():
+    store = MagicMock()
+    store.get_corpus_version.return_value = 1
+    cache = ResponseCache(maxsize=10, ttl=60, version_store=store, version_ttl=60)
+    cache.key("a")
+    cache.key("b")
+    assert store.get_corpus_version.call_count == 1
+
+
+def test_version_store_failures_keep_the_cache_working():
+    store = MagicMock()
+    store.get_corpus_version.side_effect = RuntimeError("unavailable")
+    store.bump_corpus_version.side_effect = RuntimeError("unavailable")
+    cache = ResponseCache(maxsize=10, ttl=60, version_store=store, version_ttl=0)
+    cache.set(cache.key("engineer"), ["job1"])
+    assert cache.get(cache.key("engineer")) == ["job1"]
+
+    cache.bump_corpus_version()
+    assert cache.get(cache.key("engineer")) is None
+
+
+def test_entries_expire_and_least_recently_used_are_evicted():
+    cache = ResponseCache(maxsize=2, ttl=0.05)
+    cache.set(cache.key("a"), 1)
+    cache.set(cache.key("b"), 2)
+    cache.get(cache.key("a"))
+    cache.set(cache.key("c"), 3)
+    assert cache.get(cache.key("b")) is None
+    assert cache.get(cache.key("a")) == 1
+
+    time.sleep(0.1)
+    assert cache.get(cache.key("a")) is None
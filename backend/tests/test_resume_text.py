@@ -0,0 +1,93 @@
+import io
+import zipfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from backend.app.main import app
+from backend.app.security import get_current_user
+from shared.resume_text import extract_text, normalize_text
+
+
+def make_docx(paragraphs):
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    document = f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+def test_normalize_text_collapses_whitespace():
+    text = "  Jane   Doe \r\n\tPython developer\n\n\n\nExperience  "
+    assert normalize_text(text) == "Jane Doe\nPython developer\n\nExperience"
+
+
+def test_extract_text_reads_plain_text_and_docx():
+    assert extract_text(b"Jane  Doe\nPython", "resume.txt") == "Jane Doe\nPython"
+    docx = make_docx(["Jane Doe", "Senior  Python developer"])
+    assert extract_text(docx, "resume.docx") == "Jane Doe\nSenior Python developer"
+
+
+def test_extract_text_rejects_corrupt_files():
+    with pytest.raises(ValueError):
+        extract_text(b"not a zip", "resume.docx")
+
+
+@pytest.mark.asyncio
+async def test_upload_resume_extracts_text_once_per_content():
+    app.dependency_overrides[get_current_user] = lambda: {"uid": "user1"}
+    with (
+        patch("backend.app.main.firestore_repo") as mock_repo,
+        patch("backend.app.main.firebase_storage") as mock_storage,
+    ):
+        mock_repo.get_resume_text.side_effect = [None, "Jane Doe"]
+        blob = MagicMock(public_url="https://storage.example.com/resume.txt")
+        uploaded = []
+        blob.upload_from_file.side_effect = lambda f, **kwargs: uploaded.append(
+            f.read()
+        )
+        mock_storage.bucket.return_value.blob.return_value = blob
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            for _ in range(2):
+                response = await ac.post(
+                    "/api/resumes/upload/",
+                    files={"file": ("resume.txt", b"Jane   Doe", "text/plain")},
+                    headers={"Authorization": "Bearer token"},
+                )
+                assert response.status_code == 200
+    app.dependency_overrides.clear()
+
+    mock_repo.put_resume_text.assert_called_once()
+    digest, text = mock_repo.put_resume_text.call_args.args
+    assert text == "Jane Doe"
+    mock_repo.update_user_resume.assert_called_with(
+        "user1", "https://storage.example.com/resume.txt", digest
+    )
+    assert uploaded == [b"Jane   Doe", b"Jane   Doe"]
+
+
+@pytest.mark.asyncio
+async def test_job_match_scores_the_stored_resume_text():
+    app.dependency_overrides[get_current_user] = lambda: {"uid": "user1"}
+    with patch("backend.app.main.firestore_repo") as mock_repo:
+        mock_repo.get_job_posting.return_value = {"description": "python developer"}
+        mock_repo.get_user.return_value = {"resume_content_hash": "abc"}
+        mock_repo.get_resume_text.return_value = "senior python developer"
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            response = await ac.get(
+                "/api/jobs/job1/match/", headers={"Authorization": "Bearer token"}
+            )
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json() == {"job_id": "job1", "confidence_score": 2 / 3}
+    mock_repo.get_resume_text.assert_called_once_with("abc")
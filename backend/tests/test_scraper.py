@@ -1,4 +1,4 @@
-from unittest.mock import patch
+from unittest.mock import MagicMock, call, patch
 
 from backend.app import scraper
 
@@ -23,3 +23,64 @@ def test_handler(mock_db, mock_scrape, MockRepo):
     assert result["statusCode"] == 200
     assert "5 new jobs" in result["body"]
     mock_scrape.assert_called_once()
+
+
+@patch("backend.app.scraper.FirestoreRepo")
+@patch("backend.app.scraping_logic.scrape_job_details_if_changed")
+@patch("backend.app.scraper.db")
+def test_rescrape_all_jobs_skips_unchanged_pages(mock_db, mock_fetch, MockRepo):
+    from backend.app.scraping_logic import DetailFetch
+
+    mock_repo_instance = MockRepo.return_value
+    mock_repo_instance.get_all_jobs.return_value = [
+        {"id": "1", "link": "http://a.com/1", "http_validators": {"etag": '"x"'}},
+        {"id": "2", "link": "http://a.com/2", "title": "Old"},
+    ]
+    mock_fetch.side_effect = [
+        DetailFetch(None, {"etag": '"x"'}, False),
+        DetailFetch({"title": "New", "description": "D"}, {"content_hash": "h"}, True),
+    ]
+
+    count = scraper.rescrape_all_jobs()
+
+    assert count == 1
+    mock_fetch.assert_any_call("http://a.com/1", {"etag": '"x"'})
+    mock_repo_instance.put_job_postings.assert_called_once()
+    (updates,) = mock_repo_instance.put_job_postings.call_args[0]
+    assert list(updates) == ["2"]
+    job = updates["2"]
+    assert job["title"] == "New"
+    assert job["http_validators"] == {"content_hash": "h"}
+
+
+def test_flush_job_updates_counts_jobs_committed_before_a_failure():
+    from backend.app.firestore_repo import PartialWriteError
+
+    repo = MagicMock()
+    repo.put_job_postings.side_effect = PartialWriteError(2, "quota")
+    pending = {"1": {}, "2": {}, "3": {}}
+
+    assert scraper._flush_job_updates(repo, pending) == 2
+    assert pending == {}
+
+
+@patch("backend.app.scraper.FIRESTORE_BATCH_LIMIT", 1)
+@patch("backend.app.scraper.FirestoreRepo")
+@patch("backend.app.scraping_logic.scrape_job_details_if_changed")
+@patch("backend.app.scraper.db")
+def test_rescrape_all_jobs_bumps_corpus_version_after_last_batch(
+    mock_db, mock_fetch, MockRepo
+):
+    from backend.app.scraping_logic import DetailFetch
+
+    mock_repo_instance = MockRepo.return_value
+    mock_repo_instance.get_all_jobs.return_value = [
+        {"id": "1", "link": "http://a.com/1"},
+        {"id": "2", "link": "http://a.com/2"},
+    ]
+    mock_fetch.return_value = DetailFetch({"title": "New"}, {}, True)
+
+    assert scraper.rescrape_all_jobs() == 2
+
+    mock_repo_instance.bump_corpus_version.assert_called_once_with()
+    assert mock_repo_instance.method_calls[-1] == call.bump_corpus_version()
@@ -1,5 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
+from shared.http_client import get_adapter, pool_stats
 from backend.app.scraping_logic import scrape_job_details, get_session
 
 
@@ -10,9 +11,15 @@ class TestScrapingLogic(unittest.TestCase):
         self.assertIn("Accept-Language", session.headers)
         self.assertIn("Mozilla", session.headers["User-Agent"])
 
-    @patch("backend.app.scraping_logic.requests.Session")
-    def test_scrape_job_details_uses_session(self, mock_session_cls):
-        mock_session = mock_session_cls.return_value
+    def test_get_session_is_reused_with_shared_pool(self):
+        session = get_session()
+        self.assertIs(session, get_session())
+        self.assertIs(session.get_adapter("https://jobs.lever.co"), get_adapter())
+        self.assertIs(session.get_adapter("http://example.com"), get_adapter())
+
+    @patch("backend.app.scraping_logic.get_session")
+    def test_scrape_job_details_uses_session(self, mock_get_session):
+        mock_session = mock_get_session.return_value
         mock_response = MagicMock()
         mock_response.content = b"<html><title>Test Job</title></html>"
         mock_response.status_code = 200
@@ -25,9 +32,9 @@ class TestScrapingLogic(unittest.TestCase):
         self.assertEqual(result["title"], "Test Job")
         # Ensure headers were set (implied by using get_session inside)
 
-    @patch("backend.app.scraping_logic.requests.Session")
-    def test_scrape_job_details_follows_iframe(self, mock_session_cls):
-        mock_session = mock_session_cls.return_value
+    @patch("backend.app.scraping_logic.get_session")
+    def test_scrape_job_details_follows_iframe(self, mock_get_session):
+        mock_session = mock_get_session.return_value
 
         # First response has iframe
         mock_response_1 = MagicMock()
@@ -49,6 +56,13 @@ class TestScrapingLogic(unittest.TestCase):
         self.assertEqual(args[0], "https://example.com/iframe_content")
         self.assertEqual(result["title"], "Iframe Job Title")
 
+    def test_pool_stats_shape(self):
+        get_session()
+        stats = pool_stats()
+        self.assertIn("hosts", stats)
+        self.assertIn("connections_opened", stats)
+        self.assertGreaterEqual(stats["pool_maxsize"], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,9 @@
+import uuid
 from unittest.mock import MagicMock, patch
 
 from backend.app import scraping_logic
 from backend.app.scraping_logic import scrape_job_details
+from shared import near_duplicates
 
 
 @patch("backend.app.scraping_logic.build")
@@ -37,10 +39,14 @@ def test_scrape_jobs(mock_details, mock_build):
 
 def test_scrape_and_save_jobs():
     repo = MagicMock()
-    repo.get_job_posting.return_value = None  # Job does not exist
+    repo.get_job_postings.return_value = {}  # Job does not exist
 
-    # Mock scrape_jobs to return one job
-    with patch("backend.app.scraping_logic.scrape_jobs") as mock_scrape:
+    # Mock the search stage to return one job and the fetch stage to find nothing
+    with (
+        patch("backend.app.scraping_logic.search_domain_jobs") as mock_scrape,
+        patch("backend.app.scraping_logic.fetch_job_details") as mock_fetch,
+    ):
+        mock_fetch.return_value = {}
         mock_scrape.return_value = [
             {
                 "title": "Job 1",
@@ -56,9 +62,9 @@ def test_scrape_and_save_jobs():
         count = scraping_logic.scrape_and_save_jobs(repo, "query", domains)
 
         assert count == 1
-        repo.put_job_posting.assert_called_once()
-        args, _ = repo.put_job_posting.call_args
-        saved_job = args[1]
+        repo.put_job_postings.assert_called_once()
+        args, _ = repo.put_job_postings.call_args
+        (saved_job,) = args[0].values()
         assert "searchable_locations" in saved_job
         assert "remote" in saved_job["searchable_locations"]
         assert "NY" in saved_job["searchable_locations"]
@@ -165,3 +171,156 @@ class TestScrapingLogic:
 
         assert details is not None
         assert "locations" not in details
+
+
+def test_scrape_and_save_jobs_fetches_all_domains_in_one_stage():
+    repo = MagicMock()
+
+    def search(query, domain, days=None, blocked_patterns=None):
+        return [
+            {
+                "title": f"Job at {domain}",
+                "company": domain,
+                "description": "Snippet",
+                "link": f"http://{domain}/job",
+                "locations": [{"type": "remote"}],
+                "posting_date": None,
+            },
+            {
+                "title": "Cross-posted job",
+                "company": domain,
+                "description": "Snippet",
+                "link": "http://shared.com/job",
+                "locations": [{"type": "remote"}],
+                "posting_date": None,
+            },
+        ]
+
+    existing_id = str(uuid.uuid5(uuid.NAMESPACE_URL, "http://c.com/job"))
+    repo.get_job_postings.return_value = {existing_id: {"id": existing_id}}
+
+    with (
+        patch("backend.app.scraping_logic.search_domain_jobs", side_effect=search),
+        patch("backend.app.scraping_logic.fetch_job_details") as mock_fetch,
+    ):
+        mock_fetch.return_value = {
+            "http://a.com/job": {"title": "Better Title", "description": "Full"}
+        }
+        count = scraping_logic.scrape_and_save_jobs(
+            repo, "query", [{"domain": "a.com"}, {"domain": "b.com"}, "c.com"]
+        )
+
+    # Existing postings are looked up in a single batched read...
+    repo.get_job_postings.assert_called_once()
+    assert len(repo.get_job_postings.call_args[0][0]) == 4
+    # ...and only new postings have their pages fetched, in one stage.
+    mock_fetch.assert_called_once()
+    assert list(mock_fetch.call_args[0][0]) == [
+        "http://a.com/job",
+        "http://shared.com/job",
+        "http://b.com/job",
+    ]
+    assert count == 3
+    repo.put_job_postings.assert_called_once()
+    saved = repo.put_job_postings.call_args[0][0]
+    assert {job["title"] for job in saved.values()} == {
+        "Better Title",
+        "Cross-posted job",
+        "Job at b.com",
+    }
+
+
+def test_scrape_and_save_jobs_skips_near_duplicates():
+    description = (
+        "We are hiring a senior backend engineer to design and build the "
+        "APIs behind our scheduling product, working with Python, Postgres "
+        "and Kubernetes in a small remote team."
+    )
+
+    def job(link, title="Senior Backend Engineer", company="Acme", text=description):
+        return {
+            "title": title,
+            "company": company,
+            "description": text,
+            "link": link,
+            "locations": [],
+            "posting_date": None,
+        }
+
+    initech = (
+        "Initech is looking for a staff data engineer to own our warehouse, "
+        "batch pipelines and reporting, partnering with finance and product."
+    )
+    stored = near_duplicates.minhash(
+        near_duplicates.document_text("Staff Data Engineer", "Initech", initech)
+    )
+    alias_id = str(uuid.uuid5(uuid.NAMESPACE_URL, "https://initech.com/jobs/8"))
+    repo = MagicMock()
+    repo.get_job_postings.return_value = {}
+    repo.get_job_aliases.return_value = {alias_id: {"job_id": "stored"}}
+    repo.get_jobs_by_minhash_bands.return_value = {"stored": stored.tolist()}
+    jobs = [
+        job("https://boards.greenhouse.io/acme/jobs/1"),
+        # The same posting mirrored on the company site.
+        job("https://acme.com/careers/1?utm_source=google", text=description + " "),
+        # Already stored under another URL.
+        job("https://initech.com/jobs/9", "Staff Data Engineer", "Initech", initech),
+        # Found to be a duplicate by an earlier scrape.
+        job("https://initech.com/jobs/8", "Staff Data Engineer", "Initech", initech),
+    ]
+
+    with (
+        patch("backend.app.scraping_logic.search_domain_jobs", return_value=jobs),
+        patch("backend.app.scraping_logic.fetch_job_details", return_value={}),
+    ):
+        count = scraping_logic.scrape_and_save_jobs(repo, "query", ["a.com"])
+
+    assert count == 1
+    repo.get_jobs_by_minhash_bands.assert_called_once()
+    # The mirrored posting matched within the batch, so only the two
+    # distinct postings' buckets are looked up.
+    (buckets,) = repo.get_jobs_by_minhash_bands.call_args[0]
+    assert len(buckets) == 2 * near_duplicates.NEAR_DUPLICATE_BANDS
+    saved = list(repo.put_job_postings.call_args[0][0].values())
+    assert [job["link"] for job in saved] == [
+        "https://boards.greenhouse.io/acme/jobs/1"
+    ]
+    assert len(saved[0]["minhash_bands"]) == near_duplicates.NEAR_DUPLICATE_BANDS
+    canonical_id = next(iter(repo.put_job_postings.call_args[0][0]))
+    aliases = repo.put_job_aliases.call_args[0][0]
+    assert sorted(aliases.values(), key=lambda alias: alias["link"]) == [
+        {
+            "link": "https://acme.com/careers/1?utm_source=google",
+            "job_id": canonical_id,
+        },
+        {"link": "https://initech.com/jobs/9", "job_id": "stored"},
+    ]
+
+
+def test_scrape_and_save_jobs_caps_near_duplicate_queries():
+    jobs = [
+        {
+            "title": f"Engineer {i}",
+            "company": f"Company {i}",
+            "description": f"Posting number {i} about an unrelated role {i * 7}.",
+            "link": f"https://example.com/jobs/{i}",
+            "locations": [],
+            "posting_date": None,
+        }
+        for i in range(3)
+    ]
+    repo = MagicMock()
+    repo.get_job_postings.return_value = {}
+    repo.get_job_aliases.return_value = {}
+    repo.get_jobs_by_minhash_bands.return_value = {}
+
+    with (
+        patch("backend.app.scraping_logic.NEAR_DUPLICATE_MAX_QUERIES", 1),
+        patch("backend.app.scraping_logic.search_domain_jobs", return_value=jobs),
+        patch("backend.app.scraping_logic.fetch_job_details", return_value={}),
+    ):
+        count = scraping_logic.scrape_and_save_jobs(repo, "query", ["a.com"])
+
+    assert count == 3
+    (buckets,) = repo.get_jobs_by_minhash_bands.call_args[0]
+    assert len(buckets) == near_duplicates.NEAR_DUPLICATE_BANDS
@@ -10,6 +10,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..",
 @patch("backend.app.similarity.DynamoRepo")
 def test_similarity_handler(MockDynamoRepo):
     mock_repo_instance = MockDynamoRepo.return_value
+    # Stored before the token index existed, so the table is scanned.
+    mock_repo_instance.get_job_posting.return_value = {
+        "PK": "JOB#job1",
+        "description": "python developer",
+    }
     mock_repo_instance.search_jobs.return_value = [
         {"PK": "JOB#job1", "description": "python developer"},
         {"PK": "JOB#job2", "description": "java developer"},
@@ -29,3 +34,125 @@ def test_similarity_handler(MockDynamoRepo):
     mock_repo_instance.put_similarity_result.assert_called_once_with(
         "task123", ["job2", "job3"]
     )
+
+
+@patch("backend.app.similarity.DynamoRepo")
+def test_similarity_handler_uses_token_index(MockDynamoRepo):
+    mock_repo_instance = MockDynamoRepo.return_value
+    mock_repo_instance.get_job_posting.return_value = {
+        "PK": "JOB#job1",
+        "description": "python developer",
+        "tokens": ["developer", "python"],
+    }
+    mock_repo_instance.get_token_frequencies.return_value = {
+        "developer": 3,
+        "python": 2,
+    }
+    postings = {"python": ["job1", "job3"], "developer": ["job1", "job2", "job4"]}
+    mock_repo_instance.get_jobs_for_token.side_effect = postings.get
+    job_tokens = {
+        "job2": ["developer", "java"],
+        "job3": ["engineer", "python", "senior"],
+        "job4": ["developer", "go", "rust", "senior", "staff", "web"],
+    }
+    mock_repo_instance.get_job_tokens.side_effect = lambda ids: {
+        job_id: job_tokens[job_id] for job_id in ids
+    }
+
+    with patch("backend.app.similarity.SIMILARITY_QUERY_TERMS", 1):
+        similarity.handler(
+            {"Records": [{"body": json.dumps({"job_id": "job1", "task_id": "t1"})}]},
+            {},
+        )
+
+    # Only the rarest word ("python") was looked up.
+    mock_repo_instance.get_jobs_for_token.assert_called_once_with("python")
+    mock_repo_instance.get_job_tokens.assert_called_once_with({"job3"})
+    mock_repo_instance.search_jobs.assert_not_called()
+    mock_repo_instance.put_similarity_result.assert_called_once_with("t1", ["job3"])
+
+
+@patch("backend.app.dynamo_repo.boto3")
+def test_put_job_posting_indexes_description_tokens(mock_boto3):
+    from backend.app.dynamo_repo import SIMILARITY_MAX_TERM_FREQUENCY, DynamoRepo
+
+    repo = DynamoRepo(table_name="NokariData")
+    table = repo.table
+    repo.dynamodb.batch_get_item.return_value = {
+        "Responses": {
+            "NokariData": [
+                {"PK": "TOKEN#developer", "df": 3},
+                {"PK": "TOKEN#engineer", "df": SIMILARITY_MAX_TERM_FREQUENCY + 1},
+            ]
+        }
+    }
+
+    assert repo.put_job_posting(
+        "job1", {"description": "The Python  python developer and engineer"}
+    )
+
+    # The job is stored without tokens until its postings are written.
+    assert "tokens" not in table.put_item.call_args.kwargs["Item"]
+    actions = repo.dynamodb.meta.client.transact_write_items.call_args.kwargs[
+        "TransactItems"
+    ]
+    assert [action["Put"]["Item"] for action in actions if "Put" in action] == [
+        {"PK": "TOKEN#developer", "SK": "JOB#job1"},
+        {"PK": "TOKEN#python", "SK": "JOB#job1"},
+    ]
+    assert [action["Update"]["Key"] for action in actions if "Update" in action] == [
+        {"PK": "TOKEN#developer", "SK": "STATS"},
+        {"PK": "TOKEN#python", "SK": "STATS"},
+    ]
+    table.update_item.assert_called_once()
+    assert table.update_item.call_args.kwargs["ExpressionAttributeValues"] == {
+        ":tokens": ["and", "developer", "engineer", "python", "the"]
+    }
+
+
+@patch("backend.app.dynamo_repo.boto3")
+def test_index_job_tokens_skips_postings_written_by_an_earlier_attempt(mock_boto3):
+    from botocore.exceptions import ClientError
+
+    from backend.app.dynamo_repo import DynamoRepo
+
+    repo = DynamoRepo(table_name="NokariData")
+    repo.dynamodb.batch_get_item.return_value = {"Responses": {}}
+    transact = repo.dynamodb.meta.client.transact_write_items
+    transact.side_effect = [
+        ClientError(
+            {
+                "Error": {"Code": "TransactionCanceledException", "Message": ""},
+                "CancellationReasons": [
+                    {"Code": "ConditionalCheckFailed"},
+                    {"Code": "None"},
+                    {"Code": "None"},
+                    {"Code": "None"},
+                ],
+            },
+            "TransactWriteItems",
+        ),
+        None,
+    ]
+
+    repo.index_job_tokens("job1", ["developer", "python"])
+
+    retried = transact.call_args.kwargs["TransactItems"]
+    assert [action["Put"]["Item"] for action in retried if "Put" in action] == [
+        {"PK": "TOKEN#python", "SK": "JOB#job1"}
+    ]
+    repo.table.update_item.assert_called_once()
+
+
+@patch("backend.app.dynamo_repo.boto3")
+def test_search_jobs_scans_every_page(mock_boto3):
+    from backend.app.dynamo_repo import DynamoRepo
+
+    repo = DynamoRepo(table_name="NokariData")
+    repo.table.scan.side_effect = [
+        {"Items": [{"PK": "JOB#job1"}], "LastEvaluatedKey": {"PK": "TOKEN#x"}},
+        {"Items": [{"PK": "JOB#job2"}]},
+    ]
+
+    assert [job["PK"] for job in repo.search_jobs()] == ["JOB#job1", "JOB#job2"]
+    assert repo.table.scan.call_args.kwargs["ExclusiveStartKey"] == {"PK": "TOKEN#x"}
@@ -24,6 +24,7 @@ const Jobs = ({ preferences, user }) => {
   });
 
   const [lastDocId, setLastDocId] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [hasMore, setHasMore] = useState(true);
   const [loading, setLoading] = useState(false);
   const [resetKey, setResetKey] = useState(0);
@@ -43,8 +44,12 @@ const Jobs = ({ preferences, user }) => {
      try {
          const params = {
              limit: JOBS_PER_PAGE,
-             last_doc_id: isLoadMore ? lastDocId : undefined,
          };
+         if (isLoadMore && nextCursor) {
+             params.cursor = nextCursor;
+         } else if (isLoadMore) {
+             params.last_doc_id = lastDocId;
+         }
 
          if (debouncedTitle) params.title = debouncedTitle;
          if (debouncedCompany) params.company = debouncedCompany;
@@ -52,6 +57,7 @@ const Jobs = ({ preferences, user }) => {
 
          const response = await api.get('/jobs', { params });
          const fetchedJobs = response.data;
+         setNextCursor(response.headers?.['x-next-cursor'] || null);
 
          if (isLoadMore) {
              setJobs(prevJobs => [...prevJobs, ...fetchedJobs]);
@@ -76,7 +82,7 @@ const Jobs = ({ preferences, user }) => {
      } finally {
          setLoading(false);
      }
-  }, [debouncedTitle, debouncedCompany, preferences, lastDocId, loading]);
+  }, [debouncedTitle, debouncedCompany, preferences, lastDocId, nextCursor, loading]);
 
 
   // Effect for initial load and filter changes
@@ -100,6 +106,7 @@ const Jobs = ({ preferences, user }) => {
 
             const response = await api.get('/jobs', { params });
             const fetchedJobs = response.data;
+            setNextCursor(response.headers?.['x-next-cursor'] || null);
 
             setJobs(fetchedJobs);
 
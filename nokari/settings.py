@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "app.core",
     "rest_framework",
     "rest_framework_simplejwt",
@@ -103,11 +104,36 @@ DATABASES = {
     }
 }
 
+# Shared by all web and Celery processes (per-user list exclusions, the
+# embedding change log). Redis is already there as the Celery broker.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_CACHE_URL", "redis://redis:6379/1"),
+    }
+}
+
+# Where the approximate nearest-neighbour index over job embeddings is kept
+# (rebuilt with `python manage.py build_ann_index`). Web and Celery workers
+# must see the same file, so point it at a shared volume when they run in
+# separate containers.
+ANN_INDEX_PATH = os.environ.get(
+    "ANN_INDEX_PATH", str(BASE_DIR / "var" / "job_embeddings.ann.npz")
+)
+
 if "test" in sys.argv:
-    DATABASES["default"] = {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": ":memory:",
+    # TEST_DATABASE=postgres keeps the Postgres database, for the tests of
+    # Postgres-only features such as ranked full-text search.
+    if os.environ.get("TEST_DATABASE") != "postgres":
+        DATABASES["default"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        }
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
+    # Tests run in one process, so the local cache is enough.
+    SILENCED_SYSTEM_CHECKS = ["core.W001"]
     CELERY_TASK_ALWAYS_EAGER = True
 
 
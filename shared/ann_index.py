@@ -0,0 +1,426 @@
+import contextlib
+import fcntl
+import io
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of inverted lists; 0 picks roughly sqrt(N) at build time.
+ANN_NLIST = int(os.environ.get("ANN_NLIST", "0"))
+# Number of lists scanned per query. Higher means better recall, slower queries.
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", "8"))
+
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_SIZE = 50000
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class IVFIndex:
+    """
+    An inverted-file (IVF) approximate nearest-neighbour index over unit
+    vectors, scored by cosine similarity.
+
+    Vectors are clustered around `nlist` centroids with spherical k-means.
+    A query only scans the `nprobe` lists whose centroids are closest to it,
+    trading recall for latency. New vectors can be added without retraining;
+    rebuild periodically so the centroids keep up with the corpus.
+    """
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = ANN_NPROBE):
+        self.centroids = _normalize(centroids)
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._ids: List[List[str]] = [[] for _ in range(len(self.centroids))]
+        self._vectors: List[np.ndarray] = [
+            np.zeros((0, self.dimension), dtype=np.float32)
+            for _ in range(len(self.centroids))
+        ]
+        self._list_of: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._list_of)
+
+    def __contains__(self, item_id):
+        return item_id in self._list_of
+
+    @property
+    def dimension(self) -> int:
+        return self.centroids.shape[1]
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        vectors,
+        nlist: Optional[int] = None,
+        nprobe: int = ANN_NPROBE,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """
+        Trains the centroids on `vectors` and indexes all of them.
+
+        Args:
+            ids (list): The identifier of each vector.
+            vectors (array): One embedding per row.
+            nlist (int, optional): Number of inverted lists. Defaults to
+                ANN_NLIST, or about sqrt(N) when that is 0.
+            nprobe (int): Default number of lists scanned per query.
+            seed (int): Seed for the k-means initialisation.
+        """
+        vectors = _normalize(vectors)
+        if len(vectors) == 0:
+            raise ValueError("Cannot build an index without vectors.")
+        nlist = nlist or ANN_NLIST or int(np.sqrt(len(vectors)))
+        nlist = max(1, min(nlist, len(vectors)))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if len(sample) > KMEANS_SAMPLE_SIZE:
+            sample = sample[rng.choice(len(sample), KMEANS_SAMPLE_SIZE, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for i in range(nlist):
+                members = sample[assignment == i]
+                if len(members):
+                    centroids[i] = members.sum(axis=0)
+            centroids = _normalize(centroids)
+
+        index = cls(centroids, nprobe=nprobe)
+        index.add(ids, vectors)
+        return index
+
+    def add(self, ids: Sequence[str], vectors) -> None:
+        """
+        Adds or replaces vectors. Rows with the wrong dimension are skipped.
+        """
+        if len(ids) == 0:
+            return
+        vectors = _normalize(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            logger.warning(
+                f"Skipping {len(ids)} vectors: expected dimension {self.dimension}."
+            )
+            return
+
+        with self._lock:
+            self.remove(ids)
+            assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+            for list_no in np.unique(assignment):
+                rows = np.flatnonzero(assignment == list_no)
+                self._vectors[list_no] = np.vstack(
+                    [self._vectors[list_no], vectors[rows]]
+                )
+                for row in rows:
+                    self._ids[list_no].append(ids[row])
+                    self._list_of[ids[row]] = int(list_no)
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            by_list: Dict[int, set] = {}
+            for item_id in ids:
+                list_no = self._list_of.pop(item_id, None)
+                if list_no is not None:
+                    by_list.setdefault(list_no, set()).add(item_id)
+            for list_no, removed in by_list.items():
+                keep = [
+                    i
+                    for i, item_id in enumerate(self._ids[list_no])
+                    if item_id not in removed
+                ]
+                self._ids[list_no] = [self._ids[list_no][i] for i in keep]
+                self._vectors[list_no] = self._vectors[list_no][keep]
+
+    def search(
+        self,
+        query,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        min_score: Optional[float] = None,
+        exclude: Iterable[str] = (),
+    ) -> List[Tuple[str, float]]:
+        """
+        Finds approximately the `k` vectors most similar to `query`.
+
+        Args:
+            query (list): The query vector.
+            k (int): The maximum number of results.
+            nprobe (int, optional): Lists to scan; overrides the index default.
+            min_score (float, optional): Drop results scoring at or below this.
+            exclude (iterable, optional): Identifiers to leave out.
+
+        Returns:
+            list: (id, score) tuples, best first.
+        """
+        query = _normalize(query)
+        if query.shape[-1] != self.dimension:
+            return []
+        nprobe = max(1, min(nprobe or self.nprobe, self.nlist))
+        exclude = set(exclude)
+
+        with self._lock:
+            probe = np.argsort(-(self.centroids @ query))[:nprobe]
+            candidate_ids: List[str] = []
+            candidate_scores = []
+            for list_no in probe:
+                if not self._ids[list_no]:
+                    continue
+                candidate_ids.extend(self._ids[list_no])
+                candidate_scores.append(self._vectors[list_no] @ query)
+
+        if not candidate_ids:
+            return []
+        scores = np.concatenate(candidate_scores)
+        if exclude:
+            for i, item_id in enumerate(candidate_ids):
+                if item_id in exclude:
+                    scores[i] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (candidate_ids[i], float(scores[i]))
+            for i in top
+            if np.isfinite(scores[i]) and (min_score is None or scores[i] > min_score)
+        ]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to `path` atomically, so readers never see a
+        partially written file.
+        """
+        with self._lock:
+            ids = [item_id for list_ids in self._ids for item_id in list_ids]
+            offsets = np.cumsum([0] + [len(list_ids) for list_ids in self._ids])
+            vectors = np.vstack(self._vectors)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                vectors=vectors,
+                ids=np.array(ids, dtype=str),
+                offsets=offsets,
+                nprobe=np.array(self.nprobe),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(data["centroids"], nprobe=int(data["nprobe"]))
+            ids = data["ids"].tolist()
+            offsets = data["offsets"]
+            vectors = data["vectors"]
+        for list_no in range(index.nlist):
+            start, end = offsets[list_no], offsets[list_no + 1]
+            index._ids[list_no] = ids[start:end]
+            index._vectors[list_no] = vectors[start:end]
+            for item_id in index._ids[list_no]:
+                index._list_of[item_id] = list_no
+        return index
+
+
+def _delta_path(path: str) -> str:
+    return f"{path}.delta"
+
+
+def _append_delta(path: str, op: str, ids: Sequence[str], vectors) -> None:
+    # One record is three arrays written in a single call, so a reader
+    # racing the append sees either the whole record or a truncated tail.
+    buffer = io.BytesIO()
+    np.save(buffer, np.array(op))
+    np.save(buffer, np.array(ids, dtype=str))
+    np.save(buffer, np.asarray(vectors, dtype=np.float32))
+    with open(_delta_path(path), "ab") as f:
+        f.write(buffer.getvalue())
+
+
+def _replay_delta(index: IVFIndex, path: str, offset: int, inode: Optional[int]) -> int:
+    """
+    Applies the records of the delta log `inode` written after `offset` to
+    `index`. Nothing is applied if a rebuild has replaced the log since.
+
+    Returns:
+        int: The offset just past the last complete record.
+    """
+    try:
+        f = open(_delta_path(path), "rb")
+    except FileNotFoundError:
+        return offset
+    with f:
+        if os.fstat(f.fileno()).st_ino != inode:
+            return offset
+        f.seek(offset)
+        while True:
+            try:
+                op = str(np.load(f, allow_pickle=False))
+                ids = np.load(f, allow_pickle=False).tolist()
+                vectors = np.load(f, allow_pickle=False)
+            except (EOFError, ValueError):
+                # End of the log, or a record still being appended.
+                return offset
+            if op == "add":
+                index.add(ids, vectors)
+            else:
+                index.remove(ids)
+            offset = f.tell()
+
+
+def _delta_inode(path: str) -> Optional[int]:
+    try:
+        return os.stat(_delta_path(path)).st_ino
+    except FileNotFoundError:
+        return None
+
+
+_cache_lock = threading.Lock()
+_cached_index: Optional[IVFIndex] = None
+_cached_key: Optional[Tuple[str, int, Optional[int]]] = None
+_cached_offset = 0
+
+
+def get_index(path: str) -> Optional[IVFIndex]:
+    """
+    Returns the index persisted at `path` with its delta log applied, or None
+    if there is none yet. The loaded index is cached: records appended to the
+    log since the last call are replayed onto it, and it is reloaded when a
+    rebuild replaces the file.
+    """
+    global _cached_index, _cached_key, _cached_offset
+    try:
+        key = (path, os.stat(path).st_mtime_ns, _delta_inode(path))
+    except OSError:
+        return None
+
+    with _cache_lock:
+        try:
+            if (
+                _cached_key is not None
+                and _cached_key[2] is None
+                and key[:2] == _cached_key[:2]
+            ):
+                # The first update since the build created the log.
+                _cached_key = key
+            if _cached_index is None or key != _cached_key:
+                _cached_index = IVFIndex.load(path)
+                _cached_key = key
+                _cached_offset = 0
+            _cached_offset = _replay_delta(_cached_index, path, _cached_offset, key[2])
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to load ANN index from {path}: {e}")
+            _cached_index = None
+            return None
+        return _cached_index
+
+
+@contextlib.contextmanager
+def locked(path: str) -> Iterator[None]:
+    """
+    Holds an exclusive lock on the index file across processes, so that
+    appends to the delta log and rebuilds don't interleave.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def delta_position(path: str) -> int:
+    """
+    Returns the current end of the delta log. Pass it to `replace_index` to
+    keep the updates made while a rebuild was reading the corpus.
+    """
+    try:
+        return os.path.getsize(_delta_path(path))
+    except FileNotFoundError:
+        return 0
+
+
+def replace_index(index: IVFIndex, path: str, since: Optional[int] = None) -> None:
+    """
+    Saves a rebuilt index over the one at `path` and folds the delta log into
+    it: records written before `since` are dropped, later ones are kept to be
+    replayed onto the new index.
+    """
+    delta_path = _delta_path(path)
+    with locked(path):
+        kept = b""
+        if since is not None:
+            try:
+                with open(delta_path, "rb") as f:
+                    f.seek(since)
+                    kept = f.read()
+            except FileNotFoundError:
+                pass
+        index.save(path)
+        tmp_path = f"{delta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(kept)
+        os.replace(tmp_path, delta_path)
+
+
+def _index_dimension(path: str) -> int:
+    # Only the centroids member of the archive is read.
+    with np.load(path, allow_pickle=False) as data:
+        return data["centroids"].shape[1]
+
+
+def add_to_index(items: Dict[str, Sequence[float]], path: str) -> bool:
+    """
+    Appends new embeddings to the index's delta log. The cost is
+    proportional to the number of items, not to the size of the index.
+
+    Returns:
+        bool: False if there is no index yet (run a rebuild first).
+    """
+    if not items:
+        return True
+    if not os.path.exists(path):
+        return False
+    ids = list(items)
+    vectors = np.asarray([items[item_id] for item_id in ids], dtype=np.float32)
+    dimension = _index_dimension(path)
+    if vectors.ndim != 2 or vectors.shape[1] != dimension:
+        logger.warning(f"Skipping {len(ids)} vectors: expected dimension {dimension}.")
+        return True
+    with locked(path):
+        _append_delta(path, "add", ids, vectors)
+    return True
+
+
+def remove_from_index(ids: Iterable[str], path: str) -> bool:
+    """
+    Records deleted items in the index's delta log.
+
+    Returns:
+        bool: False if there is no index yet.
+    """
+    ids = list(set(ids))
+    if not ids:
+        return True
+    if not os.path.exists(path):
+        return False
+    with locked(path):
+        _append_delta(path, "remove", ids, np.zeros((0, 0), dtype=np.float32))
+    return True
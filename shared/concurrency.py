@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Global cap on in-flight fetches across every domain in a scrape run.
+DEFAULT_MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", "16"))
+# Cap on in-flight fetches against any single host (e.g. jobs.lever.co).
+DEFAULT_PER_HOST_LIMIT = int(os.environ.get("SCRAPER_PER_HOST_LIMIT", "4"))
+
+
+class HostLimiter:
+    """
+    Limits the number of concurrent requests issued against each host.
+    Semaphores are created lazily, one per host, and shared by all threads.
+    """
+
+    def __init__(self, per_host_limit: int):
+        self.per_host_limit = max(1, per_host_limit)
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _semaphore_for(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def limit(self, url: str):
+        semaphore = self._semaphore_for(urlparse(url).netloc.lower())
+        with semaphore:
+            yield
+
+
+class HostRateLimiter:
+    """
+    Spaces out the requests issued against each host to at most `rate` per
+    second. Callers reserve the next free slot for their host and sleep
+    until it comes up, so the limit holds across threads.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def interleave_by_host(urls: Iterable[str]) -> List[str]:
+    """
+    Returns the unique URLs ordered round-robin by host, so that workers are
+    spread across hosts instead of queueing behind one host's limit.
+    """
+    by_host: "OrderedDict[str, List[str]]" = OrderedDict()
+    seen = set()
+    for url in urls:
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        by_host.setdefault(urlparse(url).netloc.lower(), []).append(url)
+
+    ordered = []
+    queues = [deque(host_urls) for host_urls in by_host.values()]
+    while queues:
+        for queue in queues:
+            ordered.append(queue.popleft())
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+def fetch_all(
+    fetch: Callable[[str], Any],
+    urls: Iterable[str],
+    max_workers: Optional[int] = None,
+    per_host_limit: Optional[int] = None,
+    rate_limiter: Optional[HostRateLimiter] = None,
+) -> Dict[str, Any]:
+    """
+    Calls `fetch(url)` for every unique URL on a bounded thread pool.
+
+    Args:
+        fetch (callable): Blocking function taking a URL.
+        urls (iterable): URLs to fetch. Duplicates and empty values are skipped.
+        max_workers (int, optional): Global concurrency cap.
+        per_host_limit (int, optional): Concurrency cap per host.
+        rate_limiter (HostRateLimiter, optional): Per-host request rate cap.
+            Pass the same limiter to consecutive calls to keep the rate
+            across them.
+
+    Returns:
+        dict: A mapping of URL to the value returned by `fetch`, or None if
+        the call raised.
+    """
+    ordered = interleave_by_host(urls)
+    if not ordered:
+        return {}
+
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    limiter = HostLimiter(per_host_limit or DEFAULT_PER_HOST_LIMIT)
+
+    def run(url):
+        if rate_limiter is not None:
+            rate_limiter.wait(url)
+        with limiter.limit(url):
+            try:
+                return fetch(url)
+            except Exception as e:
+                logger.warning(f"Fetch failed for {url}: {e}")
+                return None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(ordered))) as executor:
+        results = executor.map(run, ordered)
+        return dict(zip(ordered, results))
@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# Rows encoded per chunk handed to the web server.
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    """
+    Encodes rows as newline-delimited JSON, one chunk of rows at a time.
+    """
+    lines = []
+    for row in rows:
+        record = {field: row.get(field) for field in fields}
+        lines.append(json.dumps(record, default=_json_default) + "\n")
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    """
+    Encodes rows as CSV with a header line, one chunk of rows at a time.
+    Lists and dicts are written as JSON.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(row.get(field)) for field in fields])
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    """
+    Gzip-compresses a stream of text chunks as they are produced.
+    """
+    # wbits=31 selects the gzip container.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(
+    rows: Iterable[Dict[str, Any]],
+    fields: List[str],
+    output: str = "ndjson",
+    compress: bool = False,
+    basename: str = "export",
+) -> Tuple[Iterator[Any], str, str]:
+    """
+    Builds a lazily encoded export of `rows`.
+
+    Args:
+        rows: Dicts to export, typically a server-side cursor.
+        fields: The keys to export, in column order.
+        output: "ndjson" or "csv".
+        compress: Whether to gzip the stream.
+        basename: The download file name without extension.
+
+    Returns:
+        tuple: (chunk iterator, content type, file name).
+
+    Raises:
+        ValueError: If `output` is not a supported format.
+    """
+    if output not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unsupported export format {output!r}; "
+            f"use one of: {', '.join(EXPORT_FORMATS)}."
+        )
+    content_type, extension = EXPORT_FORMATS[output]
+    encode = iter_ndjson if output == "ndjson" else iter_csv
+    stream = encode(rows, fields)
+    filename = f"{basename}.{extension}"
+    if compress:
+        return gzip_stream(stream), "application/gzip", f"{filename}.gz"
+    return stream, content_type, filename
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Number of per-host connection pools kept alive at once.
+POOL_CONNECTIONS = int(os.environ.get("SCRAPER_POOL_CONNECTIONS", "32"))
+# Number of keep-alive connections kept per host.
+POOL_MAXSIZE = int(os.environ.get("SCRAPER_POOL_MAXSIZE", "8"))
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Referer": "https://www.google.com/",
+}
+
+_adapter_lock = threading.Lock()
+_adapter = None
+_local = threading.local()
+
+
+def get_adapter() -> HTTPAdapter:
+    """
+    Returns the process-wide HTTP adapter. It owns the connection pools, so
+    every session mounting it reuses the same keep-alive connections.
+    """
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                _adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+                )
+    return _adapter
+
+
+def get_session() -> requests.Session:
+    """
+    Returns a requests Session with common browser headers.
+
+    Sessions are cached per thread (requests.Session is not thread-safe), but
+    they all share the pooled adapter from `get_adapter`.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        adapter = get_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
+
+
+class ConditionalResponse(NamedTuple):
+    response: Optional[requests.Response]
+    validators: Dict[str, str]
+    changed: bool
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def conditional_get(
+    url: str,
+    validators: Optional[Dict[str, str]] = None,
+    session: Optional[requests.Session] = None,
+    timeout: int = 10,
+) -> ConditionalResponse:
+    """
+    Performs a conditional GET using the validators cached for a URL.
+
+    `validators` may hold an "etag", a "last_modified" date and the
+    "content_hash" of the last body. The page counts as unchanged when the
+    server answers 304 Not Modified or, for servers that ignore validators,
+    when the body hashes to the cached value.
+
+    Raises:
+        requests.RequestException: If the request fails.
+    """
+    validators = validators or {}
+    session = session or get_session()
+
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return ConditionalResponse(None, dict(validators), False)
+    response.raise_for_status()
+
+    new_validators = {"content_hash": content_hash(response.content)}
+    if response.headers.get("ETag"):
+        new_validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        new_validators["last_modified"] = response.headers["Last-Modified"]
+
+    changed = new_validators["content_hash"] != validators.get("content_hash")
+    return ConditionalResponse(response, new_validators, changed)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Returns connection pool statistics for monitoring.
+    """
+    hosts = []
+    if _adapter is not None:
+        pools = _adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            # The pool queue is padded with None placeholders for free slots.
+            queued = list(pool.pool.queue) if pool.pool is not None else []
+            idle = sum(1 for conn in queued if conn is not None)
+            hosts.append(
+                {
+                    "host": pool.host,
+                    "scheme": pool.scheme,
+                    "port": pool.port,
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle_connections": idle,
+                }
+            )
+
+    return {
+        "pool_connections": POOL_CONNECTIONS,
+        "pool_maxsize": POOL_MAXSIZE,
+        "connections_opened": sum(h["connections_opened"] for h in hosts),
+        "requests": sum(h["requests"] for h in hosts),
+        "hosts": hosts,
+    }
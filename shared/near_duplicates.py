@@ -0,0 +1,143 @@
+import hashlib
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+import numpy as np
+
+# MinHash signature length, split into NEAR_DUPLICATE_BANDS bands for LSH.
+# With 16 bands of 4 rows, pairs with a Jaccard similarity of ~0.5 have even
+# odds of sharing a band; at 0.8 they almost always do.
+NUM_PERMUTATIONS = 64
+NEAR_DUPLICATE_BANDS = 16
+# Estimated shingle Jaccard similarity above which two postings are the same.
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+# Words per shingle.
+SHINGLE_SIZE = 3
+
+_WORDS = re.compile(r"\w+")
+_rng = np.random.default_rng(20240611)
+# Per-permutation seeds and odd multipliers of the xor-multiply hashes.
+_SEEDS = _rng.integers(0, 2**63, NUM_PERMUTATIONS, dtype=np.uint64)
+_MULTIPLIERS = _rng.integers(0, 2**63, NUM_PERMUTATIONS, dtype=np.uint64) * 2 + 1
+
+
+def document_text(title: str, company: str, description: str) -> str:
+    return f"{title or ''} {company or ''} {description or ''}"
+
+
+def shingles(text: str) -> Set[str]:
+    """
+    Returns the word SHINGLE_SIZE-grams of the lowercased text, ignoring
+    punctuation and markup spacing.
+    """
+    words = _WORDS.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(text: str) -> np.ndarray:
+    """
+    Computes the MinHash signature of a text's shingles.
+
+    Returns:
+        np.ndarray: NUM_PERMUTATIONS uint32 values.
+    """
+    hashes = np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(),
+                "little",
+            )
+            for shingle in shingles(text) or {""}
+        ),
+        dtype=np.uint64,
+    )
+    with np.errstate(over="ignore"):
+        mixed = (hashes[None, :] ^ _SEEDS[:, None]) * _MULTIPLIERS[:, None]
+    return (mixed >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+def estimated_similarity(signature1: np.ndarray, signature2: np.ndarray) -> float:
+    """
+    Estimates the Jaccard similarity of two texts from their signatures.
+    """
+    return float(np.mean(np.asarray(signature1) == np.asarray(signature2)))
+
+
+def band_hashes(signature: np.ndarray) -> List[int]:
+    """
+    Returns one signed 64-bit bucket per LSH band. Bucket values include the
+    band number, so they can share one index column.
+    """
+    rows = NUM_PERMUTATIONS // NEAR_DUPLICATE_BANDS
+    signature = np.asarray(signature, dtype=np.uint32)
+    buckets = []
+    for band in range(NEAR_DUPLICATE_BANDS):
+        data = (
+            band.to_bytes(2, "little")
+            + signature[band * rows : (band + 1) * rows].tobytes()
+        )
+        digest = hashlib.blake2b(data, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def find_near_duplicate(
+    signature: np.ndarray,
+    candidates: Dict[Hashable, np.ndarray],
+    threshold: Optional[float] = None,
+) -> Optional[Hashable]:
+    """
+    Returns the key of the candidate most similar to `signature`, if any
+    reaches `threshold` (NEAR_DUPLICATE_THRESHOLD by default).
+    """
+    threshold = NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    best_key, best_score = None, threshold
+    for key, candidate in candidates.items():
+        score = estimated_similarity(signature, candidate)
+        if score >= best_score:
+            best_key, best_score = key, score
+    return best_key
+
+
+class LSHIndex:
+    """
+    An in-memory LSH band index over MinHash signatures.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[int, Set[Hashable]] = defaultdict(set)
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        self._signatures[key] = np.asarray(signature, dtype=np.uint32)
+        for bucket in band_hashes(signature):
+            self._buckets[bucket].add(key)
+
+    def candidates(self, buckets: Iterable[int]) -> Dict[Hashable, np.ndarray]:
+        """
+        Returns the signatures of the entries sharing at least one bucket.
+        """
+        keys = set()
+        for bucket in buckets:
+            keys.update(self._buckets.get(bucket, ()))
+        return {key: self._signatures[key] for key in keys}
+
+    def find(
+        self, signature: np.ndarray, threshold: Optional[float] = None
+    ) -> Optional[Hashable]:
+        """
+        Returns the key of the closest near-duplicate of `signature`, or None.
+        """
+        return find_near_duplicate(
+            signature, self.candidates(band_hashes(signature)), threshold
+        )
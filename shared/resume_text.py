@@ -0,0 +1,87 @@
+import hashlib
+import io
+import re
+import zipfile
+from xml.etree import ElementTree
+
+# WordprocessingML namespace of the elements read from DOCX files.
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_SPACES = re.compile(r"[ \t\f\v\u00a0]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Returns the SHA-256 of a resume file, under which its extracted text is
+    kept.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapses runs of spaces, trims every line and keeps at most one blank
+    line between paragraphs.
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [_SPACES.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _pdf_text(data: bytes) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ValueError("Reading PDF resumes requires the pypdf package.")
+    reader = PdfReader(io.BytesIO(data))
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _docx_text(data: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    paragraphs = []
+    for paragraph in root.iter(f"{_W}p"):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f"{_W}t":
+                parts.append(node.text or "")
+            elif node.tag == f"{_W}tab":
+                parts.append("\t")
+            elif node.tag in (f"{_W}br", f"{_W}cr"):
+                parts.append("\n")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+
+def extract_text(data: bytes, filename: str = "") -> str:
+    """
+    Extracts the normalized text of a resume file.
+
+    PDF and DOCX files are recognized by their content (falling back to the
+    file extension); anything else is decoded as UTF-8 text.
+
+    Args:
+        data: The raw file content.
+        filename: The uploaded file name.
+
+    Returns:
+        str: The normalized text.
+
+    Raises:
+        ValueError: If the file is a PDF and pypdf is not installed, or the
+            file is corrupt.
+    """
+    extension = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
+    try:
+        if data.startswith(b"%PDF") or extension == "pdf":
+            text = _pdf_text(data)
+        elif zipfile.is_zipfile(io.BytesIO(data)) or extension == "docx":
+            text = _docx_text(data)
+        else:
+            text = data.decode("utf-8", errors="replace")
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Could not read resume file: {e}")
+    return normalize_text(text)